@@ -1,15 +1,18 @@
 from flask import Flask, request, jsonify, send_from_directory, render_template, redirect
 from flask_cors import CORS
+from werkzeug.middleware.proxy_fix import ProxyFix
 import os
 import logging
-from db import Base, engine
+from db import engine, SessionLocal, create_local_schema, check_schema_version, get_pool_status
 from config import config as app_config
 from routes.auth import auth_bp
 from routes.admin import admin_bp
-try:
-    from mailersend.emails import NewEmail as Email
-except ImportError:
-    from mailersend import Email
+from utils.mail import render_email
+from utils.mail_queue import enqueue_email, start_worker as start_mail_worker
+from utils.rate_limit import limiter, rate_limit_exceeded
+from utils.assets import asset_url, StaticAssetMiddleware, SECURITY_HEADERS
+from utils.images import image_srcset
+from utils import request_timing, metrics, query_budget
 from dotenv import load_dotenv
 from flask import session
 
@@ -20,6 +23,16 @@ app = Flask(__name__, static_folder='static', template_folder='templates')
 app.secret_key = app_config.SECRET_KEY  # ensure session works
 app.config.setdefault('SESSION_COOKIE_SAMESITE', 'Lax')
 app.config.setdefault('SESSION_COOKIE_HTTPONLY', True)
+# Behind Render's proxy the client address is in X-Forwarded-For; rate
+# limits are keyed on it, so only trust as many hops as there are proxies
+if app_config.TRUSTED_PROXY_COUNT:
+    app.wsgi_app = ProxyFix(app.wsgi_app, x_for=app_config.TRUSTED_PROXY_COUNT, x_proto=app_config.TRUSTED_PROXY_COUNT)
+# Static files are answered from memory before Flask routing (precompressed,
+# ETag/304, immutable for fingerprinted URLs); see build_assets.py
+if app_config.STATIC_INDEX_ENABLED:
+    app.wsgi_app = StaticAssetMiddleware(app.wsgi_app, app.static_folder)
+app.jinja_env.globals['asset_url'] = asset_url
+app.jinja_env.globals['image_srcset'] = image_srcset
 
 # Logging configuration (idempotent if gunicorn already sets handlers)
 if not logging.getLogger().handlers:
@@ -35,41 +48,47 @@ allowed_origins = [
 ]
 CORS(app, resources={r"/send-email": {"origins": allowed_origins}})
 
+# Server-Timing header, one timing log line per request and the Prometheus
+# metrics behind /metrics; installed first so the rate limiter and other
+# hooks count towards the total
+if app_config.REQUEST_TIMING_ENABLED or app_config.METRICS_ENABLED:
+    request_timing.init_app(app, engine)
+if app_config.METRICS_ENABLED:
+    metrics.init_app(app)
+# Development / tests: per-route query budgets and N+1 warnings
+query_budget.init_app(app, engine)
+
 # Register blueprints
 app.register_blueprint(auth_bp)
 app.register_blueprint(admin_bp)
 
-# Ensure tables exist (for early dev; later replace with Alembic migrations)
-with engine.begin() as conn:
-    Base.metadata.create_all(conn)
-
-# One-time migration: move rutinas.user_id data to rutina_users table
-from sqlalchemy import inspect as sa_inspect, text
-with engine.begin() as conn:
-    inspector = sa_inspect(engine)
-    columns = [col['name'] for col in inspector.get_columns('rutinas')]
-    if 'user_id' in columns:
-        # Migrate existing assignments that don't already exist in rutina_users
-        existing = conn.execute(text("SELECT rutina_id, user_id FROM rutina_users")).fetchall()
-        existing_pairs = {(r[0], r[1]) for r in existing}
-        rows = conn.execute(text(
-            "SELECT id, user_id, created_at FROM rutinas WHERE user_id IS NOT NULL"
-        )).fetchall()
-        for row in rows:
-            if (row[0], row[1]) not in existing_pairs:
-                conn.execute(text(
-                    "INSERT INTO rutina_users (rutina_id, user_id, is_active, assigned_at) "
-                    "VALUES (:rid, :uid, 1, :at)"
-                ), {"rid": row[0], "uid": row[1], "at": row[2]})
-        logger.info("Migrated rutinas.user_id data to rutina_users table (%d rows checked)", len(rows))
+# Rate limiting: RATE_LIMIT_GLOBAL everywhere, tighter budgets on the
+# login / password reset / contact endpoints (see utils.rate_limit)
+limiter.init_app(app)
+app.register_error_handler(429, rate_limit_exceeded)
+
+# Schema changes (including the old rutinas.user_id -> rutina_users move) are
+# applied with `alembic upgrade head`, not on import. Local SQLite databases
+# are still bootstrapped with create_all (DB_AUTO_CREATE), and brand-new ones
+# stamped at the head; startup otherwise only compares the database revision
+# with the migration head.
+if app_config.DB_AUTO_CREATE:
+    create_local_schema()
+if not app_config.SKIP_SCHEMA_CHECK:
+    check_schema_version()
+
+# Delivery thread for the email outbox (one per worker process)
+if app_config.MAIL_WORKER_ENABLED:
+    start_mail_worker()
+
+CONTACT_RECIPIENT = {
+    "name": "Danilo Orrego",
+    "email": "urbanmoodfitness@gmail.com",
+}
 
 @app.route('/send-email', methods=['POST'])
+@limiter.limit(app_config.RATE_LIMIT_CONTACT)
 def send_email():
-    # Get API key from environment variable
-    mailer_api_key = os.getenv("MAILERSEND_API_KEY")
-    if not mailer_api_key:
-        return jsonify({"success": False, "message": "MailerSend API key is not configured."}), 500
-
     # Get JSON data from the request
     data = request.get_json()
     if not data:
@@ -83,142 +102,49 @@ def send_email():
     if not all([name, email, message]):
         return jsonify({"success": False, "message": "Missing required form fields."}), 400
 
-    # Initialize MailerSend
-    mailer = Email(mailer_api_key)
-
     # Define email parameters
-    mail_body = {}
-    mail_from = {
-        "name": "Contacto UrbanMood",
-        "email": "noreply@urbanmood.net",
-    }
-    recipients = [
-        {
-            "name": "Danilo Orrego",
-            "email": "urbanmoodfitness@gmail.com",
-        }
-    ]
-    
     reply_to = {
         "name": name,
         "email": email,
     }
 
     subject = f"Nuevo Contacto UrbanMood de {name}"
-    html_content = f"""
-<!DOCTYPE html>
-<html lang="es">
-<head>
-    <meta charset="UTF-8">
-    <meta name="viewport" content="width=device-width, initial-scale=1.0">
-    <title>Nuevo Envío de Formulario de Contacto</title>
-    <style>
-        body {{
-            margin: 0;
-            padding: 0;
-            background-color: #1a1a1a;
-            font-family: Arial, sans-serif;
-        }}
-        .container {{
-            width: 100%;
-            max-width: 600px;
-            margin: 0 auto;
-            padding: 20px;
-            background-color: #0D0D0D;
-            color: #F2F2F2;
-        }}
-        .header {{
-            background-color: #a8b720;
-            padding: 20px;
-            text-align: center;
-            color: #0D0D0D;
-        }}
-        .header h1 {{
-            margin: 0;
-            font-size: 24px;
-        }}
-        .content {{
-            padding: 30px 20px;
-            border-top: 5px solid #a8b720;
-        }}
-        .content p {{
-            font-size: 16px;
-            line-height: 1.5;
-            margin: 0 0 10px;
-        }}
-        .content strong {{
-            color: #a8b720;
-        }}
-        .message-box {{
-            background-color: #1a1a1a;
-            border-left: 3px solid #a8b720;
-            padding: 15px;
-            margin-top: 20px;
-        }}
-        .footer {{
-            text-align: center;
-            padding: 20px;
-            font-size: 12px;
-            color: #3f484e;
-        }}
-    </style>
-</head>
-<body>
-    <div class="container">
-        <div class="header">
-            <h1>UrbanMood</h1>
-        </div>
-        <div class="content">
-            <p><strong>Nuevo envío de formulario de contacto</strong></p>
-            <hr style="border-color: #3f484e;">
-            <p><strong>Nombre:</strong> {name}</p>
-            <p><strong>Correo Electrónico:</strong> <a href="mailto:{email}" style="color: #a8b720;">{email}</a></p>
-            <p><strong>Teléfono:</strong> {phone or 'No proporcionado'}</p>
-            <div class="message-box">
-                <p><strong>Mensaje:</strong></p>
-                <p>{message}</p>
-            </div>
-        </div>
-        <div class="footer">
-            <p>&copy; 2024 UrbanMood. Todos los derechos reservados.</p>
-        </div>
-    </div>
-</body>
-</html>
-    """
+    html_content = render_email('contact.html', name=name, email=email, phone=phone, message=message)
 
+    # Queue the message; the background worker (utils.mail_queue) delivers it
     try:
-        # The setters populate the mail_body dictionary
-        mailer.set_mail_from(mail_from, mail_body)
-        mailer.set_mail_to(recipients, mail_body)
-        mailer.set_subject(subject, mail_body)
-        mailer.set_html_content(html_content, mail_body)
-        mailer.set_reply_to(reply_to, mail_body)
-
-        # Send the email. The library returns the response body as a string.
-        # On success, the body is empty or contains a 202 status code. On failure, it contains an error message.
-        api_response_body = mailer.send(mail_body)
-
-        # The mailersend library returns different types on success (dict, empty string) vs failure (string with error).
-        # A 202 status code is also a success indicator, which might be returned as a string or int.
-        response_str = str(api_response_body).strip()
-
-        if not response_str or response_str == '202' or isinstance(api_response_body, dict):
-            return jsonify({"success": True, "message": "Email sent successfully!"})
-        else:
-            # If there's a different response body, it's an error from the API
-            print(f"Failed to send email. MailerSend API response: {api_response_body}")
-            return jsonify({"success": False, "message": "Failed to send email."}), 500
-
+        with SessionLocal() as db:
+            enqueue_email(
+                db, CONTACT_RECIPIENT["email"], subject, html_content,
+                to_name=CONTACT_RECIPIENT["name"], reply_to=reply_to,
+                from_name="Contacto UrbanMood", kind='contact'
+            )
+            db.commit()
+        return jsonify({"success": True, "message": "Email sent successfully!"})
     except Exception as e:
-        logger.exception("Error while sending email")
+        logger.exception("Error while queueing email")
         return jsonify({"success": False, "message": "An error occurred while sending the email."}), 500
 
 @app.route('/health')
+@limiter.exempt
 def health():
     """Simple healthcheck for uptime monitoring."""
     return jsonify({"status": "ok"})
 
+@app.route('/health/db')
+@limiter.exempt
+def health_db():
+    """Connection pool occupancy and checkout wait/hold times for this worker."""
+    return jsonify({"status": "ok", "pool": get_pool_status()})
+
+@app.route('/metrics')
+@limiter.exempt
+def metrics_endpoint():
+    """Prometheus exposition for all workers (loopback or METRICS_TOKEN only)."""
+    if not app_config.METRICS_ENABLED:
+        return jsonify({"success": False, "message": "No encontrado"}), 404
+    return metrics.metrics_response()
+
 @app.route('/')
 def index():
     if session.get('uid'):
@@ -237,18 +163,20 @@ def inject_session_flags():
     }
 
 @app.route('/<path:filename>')
+@limiter.exempt
 def static_files(filename):
     return send_from_directory(app.static_folder, filename)
 
 @app.after_request
 def add_security_headers(response):
     # Basic security & caching headers for static assets
-    response.headers.setdefault('X-Content-Type-Options', 'nosniff')
-    response.headers.setdefault('X-Frame-Options', 'SAMEORIGIN')
-    response.headers.setdefault('Referrer-Policy', 'strict-origin-when-cross-origin')
-    # Light caching: cache static assets (not root HTML) for 1 day
-    if request.path.startswith('/static/'):
-        response.headers.setdefault('Cache-Control', 'public, max-age=86400, immutable')
+    for name, value in SECURITY_HEADERS:
+        response.headers.setdefault(name, value)
+    # Fingerprinted assets never change; plain /static/ URLs revalidate
+    if request.path.startswith(('/static/dist/', '/static/variants/')):
+        response.headers.setdefault('Cache-Control', 'public, max-age=31536000, immutable')
+    elif request.path.startswith('/static/'):
+        response.headers.setdefault('Cache-Control', f'public, max-age={app_config.STATIC_MAX_AGE}')
     return response
 
 if __name__ == '__main__':
@@ -3,14 +3,23 @@ Scan static/images/exercises/ subdirectories and auto-match images to exercises.
 Maps directory names to BodySection values, fuzzy-matches filenames to exercise names,
 and creates new Ejercicio entries for unmatched images.
 
-Run with: python assign_exercise_images.py
+Matching uses a trigram inverted index (utils.name_matcher), so each file is
+only scored against exercises that share n-grams with it; large batches are
+matched in a process pool. All changes are written in one bulk UPDATE plus
+one bulk INSERT at the end.
+
+Run with: python assign_exercise_images.py [--dry-run] [--jobs N]
 """
+import argparse
 import os
 import re
 import unicodedata
-from difflib import SequenceMatcher
+from datetime import datetime
+from concurrent.futures import ProcessPoolExecutor
+from sqlalchemy import insert, update
 from db import SessionLocal
 from models import Ejercicio, BodySection, ExerciseType
+from utils.name_matcher import NameIndex
 
 # Map directory names to BodySection enum values
 DIR_TO_SECTION = {
@@ -32,6 +41,9 @@ DIR_TO_SECTION = {
 }
 
 IMAGE_EXTENSIONS = {'.jpg', '.jpeg', '.png', '.gif', '.webp'}
+MATCH_THRESHOLD = 0.45   # minimum similarity to reuse an existing exercise
+SECTION_THRESHOLD = 0.5  # below this, also look outside the image's section
+PARALLEL_MIN_FILES = 200  # smaller batches are matched in-process
 
 def normalize(text):
     """Normalize text for comparison: lowercase, strip accents, remove special chars."""
@@ -60,7 +72,161 @@ def filename_to_name(filename):
     # Title case
     return name.title()
 
-def run():
+def scan_images(base_dir):
+    """Return ``[(dirname, filename, section)]`` in processing order."""
+    images = []
+    for dirname in sorted(os.listdir(base_dir)):
+        dirpath = os.path.join(base_dir, dirname)
+        if not os.path.isdir(dirpath):
+            continue
+        section = DIR_TO_SECTION.get(dirname)
+        if not section:
+            print(f"  WARN: Unknown directory '{dirname}', skipping")
+            continue
+        images.extend((dirname, f, section) for f in sorted(os.listdir(dirpath))
+                      if os.path.splitext(f)[1].lower() in IMAGE_EXTENSIONS)
+    return images
+
+# ----------------------------------------------------------------------------
+# Matching (runs in worker processes for large batches)
+# ----------------------------------------------------------------------------
+
+_index = None
+
+def _init_matcher(entries):
+    global _index
+    _index = NameIndex(entries)
+
+def _match(item):
+    """Best ``(exercise_id, score)`` for one file: its section first, then the whole catalog."""
+    norm_file, section = item
+    if not norm_file:
+        return None, 0.0
+    best_id, best_score = _index.best(norm_file, section)
+    if best_score < SECTION_THRESHOLD:
+        global_id, global_score = _index.best(norm_file)
+        if global_score > best_score:
+            best_id, best_score = global_id, global_score
+    return best_id, best_score
+
+def match_all(entries, items, jobs=None):
+    """Match every ``(normalized filename, section)`` against the catalog entries."""
+    if len(items) < PARALLEL_MIN_FILES or jobs == 1:
+        _init_matcher(entries)
+        return [_match(item) for item in items]
+    with ProcessPoolExecutor(max_workers=jobs, initializer=_init_matcher, initargs=(entries,)) as pool:
+        return list(pool.map(_match, items, chunksize=64))
+
+# ----------------------------------------------------------------------------
+# Planning (in memory) and writing
+# ----------------------------------------------------------------------------
+
+class Catalog:
+    """In-memory view of the exercises while the run decides what to change."""
+
+    def __init__(self, rows):
+        self.by_id = {}
+        self.by_name = {}
+        self.unassigned = {}  # section -> ids without image, in catalog order
+        for row in rows:
+            rec = {'id': row.id, 'name': row.name, 'section': row.body_section, 'image_url': row.image_url}
+            self.by_id[row.id] = rec
+            self.by_name[row.name] = rec
+            if not row.image_url:
+                self.unassigned.setdefault(row.body_section, []).append(row.id)
+        self.updates = {}  # id -> image_url
+        self.created = []
+
+    def first_unassigned(self, section):
+        ids = self.unassigned.get(section, [])
+        while ids and self.by_id[ids[0]]['image_url']:
+            ids.pop(0)
+        return self.by_id[ids[0]] if ids else None
+
+    def assign(self, rec, image_url):
+        rec['image_url'] = image_url
+        if rec['id'] is not None:
+            self.updates[rec['id']] = image_url
+
+    def create(self, name, dirname, section, image_url):
+        rec = {'id': None, 'name': name, 'section': section, 'image_url': image_url,
+               'description': f'Ejercicio de {dirname.replace("_", " ")}'}
+        self.by_name[name] = rec
+        self.created.append(rec)
+        print(f"  CREATED: {name} <- {image_url.rsplit('/', 1)[-1]}")
+
+    def place(self, name, dirname, section, image_url, fallback_name=None):
+        """Give the image to the exercise called ``name`` (creating it if needed).
+
+        If that exercise already has an image, try ``fallback_name`` once and
+        otherwise skip. Returns 'matched', 'created' or 'skipped'.
+        """
+        rec = self.by_name.get(name)
+        if rec is None:
+            self.create(name, dirname, section, image_url)
+            return 'created'
+        if not rec['image_url']:
+            self.assign(rec, image_url)
+            return 'matched'
+        if fallback_name:
+            return self.place(fallback_name, dirname, section, image_url)
+        return 'skipped'
+
+    def without_image(self):
+        return sum(1 for rec in self.by_name.values() if not rec['image_url'])
+
+    def write(self, db):
+        """Persist every planned change: one bulk UPDATE, one bulk INSERT."""
+        if self.updates:
+            # updated_at set explicitly; models.catalog_version bumps the catalog version for this statement
+            now = datetime.utcnow()
+            db.execute(update(Ejercicio), [
+                {'id': ex_id, 'image_url': url, 'updated_at': now} for ex_id, url in self.updates.items()
+            ])
+        if self.created:
+            db.execute(insert(Ejercicio), [
+                {'name': rec['name'], 'description': rec['description'], 'image_url': rec['image_url'],
+                 'body_section': rec['section'], 'exercise_type': ExerciseType.fuerza}
+                for rec in self.created
+            ])
+        db.commit()
+
+def plan(catalog, images, matches):
+    """Decide, in file order, what each image does to the catalog."""
+    counts = {'matched': 0, 'created': 0, 'skipped': 0}
+    for (dirname, filename, section), (match_id, score) in zip(images, matches):
+        image_url = f'/static/images/exercises/{dirname}/{filename}'
+        section_title = dirname.replace('_', ' ').title()
+
+        # Generic file names ("descarga (1).jpg") normalize to nothing
+        if not normalize(filename):
+            ex = catalog.first_unassigned(section)
+            if ex:
+                catalog.assign(ex, image_url)
+                counts['matched'] += 1
+                print(f"  ASSIGNED (section fill): {filename} -> {ex['name']}")
+            else:
+                counts[catalog.place(f"{section_title} - {filename_to_name(filename)}", dirname, section, image_url)] += 1
+            continue
+
+        best = catalog.by_id.get(match_id)
+        if best and score >= MATCH_THRESHOLD and not best['image_url']:
+            catalog.assign(best, image_url)
+            counts['matched'] += 1
+            print(f"  MATCHED ({score:.0%}): {filename} -> {best['name']}")
+        elif best and score >= MATCH_THRESHOLD:
+            # Exercise already has an image, create a new one
+            counts[catalog.place(filename_to_name(filename), dirname, section, image_url)] += 1
+        else:
+            # No good match - create new exercise (prefix the section if the name is taken)
+            display_name = filename_to_name(filename)
+            if len(display_name) < 3:
+                display_name = f"{section_title} - Ejercicio"
+            counts[catalog.place(display_name, dirname, section, image_url,
+                                 fallback_name=f"{section_title} - {display_name}")] += 1
+    return counts
+
+def run(dry_run=False, jobs=None):
     base_dir = os.path.join(os.path.dirname(__file__), 'static', 'images', 'exercises')
     if not os.path.isdir(base_dir):
         print("ERROR: static/images/exercises/ not found. Copy images first.")
@@ -68,170 +234,28 @@ def run():
 
     db = SessionLocal()
     try:
-        exercises = db.query(Ejercicio).all()
-        # Build lookup: normalized name -> Ejercicio
-        ex_lookup = {}
-        for ex in exercises:
-            ex_lookup[normalize(ex.name)] = ex
-
-        matched = 0
-        created = 0
-        skipped = 0
-        unmatched_files = []
-
-        for dirname in sorted(os.listdir(base_dir)):
-            dirpath = os.path.join(base_dir, dirname)
-            if not os.path.isdir(dirpath):
-                continue
-
-            section = DIR_TO_SECTION.get(dirname)
-            if not section:
-                print(f"  WARN: Unknown directory '{dirname}', skipping")
-                continue
-
-            # Get exercises for this section
-            section_exercises = [e for e in exercises if e.body_section == section]
-            section_names = {normalize(e.name): e for e in section_exercises}
-
-            files = sorted(f for f in os.listdir(dirpath)
-                          if os.path.splitext(f)[1].lower() in IMAGE_EXTENSIONS)
-
-            for filename in files:
-                image_url = f'/static/images/exercises/{dirname}/{filename}'
-                norm_file = normalize(filename)
-
-                # Skip if empty normalized name (generic files like "descarga (1).jpg")
-                if not norm_file:
-                    # Assign to an exercise in this section that has no image
-                    unassigned = [e for e in section_exercises if not e.image_url]
-                    if unassigned:
-                        ex = unassigned[0]
-                        ex.image_url = image_url
-                        section_exercises = [e for e in section_exercises if e.id != ex.id or e.image_url]
-                        matched += 1
-                        print(f"  ASSIGNED (section fill): {filename} -> {ex.name}")
-                    else:
-                        # Create new exercise from filename
-                        display_name = f"{dirname.replace('_', ' ').title()} - {filename_to_name(filename)}"
-                        if not display_name or len(display_name) < 3:
-                            display_name = f"{dirname.replace('_', ' ').title()} - Ejercicio {created + 1}"
-                        # Check if name already exists
-                        existing = db.query(Ejercicio).filter(Ejercicio.name == display_name).first()
-                        if existing:
-                            if not existing.image_url:
-                                existing.image_url = image_url
-                                matched += 1
-                            else:
-                                skipped += 1
-                            continue
-                        new_ej = Ejercicio(
-                            name=display_name,
-                            description=f'Ejercicio de {dirname.replace("_", " ")}',
-                            image_url=image_url,
-                            body_section=section,
-                            exercise_type=ExerciseType.fuerza
-                        )
-                        db.add(new_ej)
-                        created += 1
-                        print(f"  CREATED: {display_name} <- {filename}")
-                    continue
-
-                # Try fuzzy match against all exercises (section first, then global)
-                best_score = 0
-                best_match = None
-
-                # Check section exercises first
-                for norm_name, ex in section_names.items():
-                    score = SequenceMatcher(None, norm_file, norm_name).ratio()
-                    if score > best_score:
-                        best_score = score
-                        best_match = ex
-
-                # Check global if section match is poor
-                if best_score < 0.5:
-                    for norm_name, ex in ex_lookup.items():
-                        score = SequenceMatcher(None, norm_file, norm_name).ratio()
-                        if score > best_score:
-                            best_score = score
-                            best_match = ex
-
-                if best_match and best_score >= 0.45 and not best_match.image_url:
-                    best_match.image_url = image_url
-                    matched += 1
-                    print(f"  MATCHED ({best_score:.0%}): {filename} -> {best_match.name}")
-                elif best_match and best_score >= 0.45 and best_match.image_url:
-                    # Exercise already has an image, create a new one
-                    display_name = filename_to_name(filename)
-                    existing = db.query(Ejercicio).filter(Ejercicio.name == display_name).first()
-                    if existing:
-                        if not existing.image_url:
-                            existing.image_url = image_url
-                            matched += 1
-                        else:
-                            skipped += 1
-                        continue
-                    new_ej = Ejercicio(
-                        name=display_name,
-                        description=f'Ejercicio de {dirname.replace("_", " ")}',
-                        image_url=image_url,
-                        body_section=section,
-                        exercise_type=ExerciseType.fuerza
-                    )
-                    db.add(new_ej)
-                    created += 1
-                    print(f"  CREATED: {display_name} <- {filename}")
-                else:
-                    # No good match - create new exercise
-                    display_name = filename_to_name(filename)
-                    if not display_name or len(display_name) < 3:
-                        display_name = f"{dirname.replace('_', ' ').title()} - Ejercicio"
-                    # Ensure unique name
-                    existing = db.query(Ejercicio).filter(Ejercicio.name == display_name).first()
-                    if existing:
-                        if not existing.image_url:
-                            existing.image_url = image_url
-                            matched += 1
-                        else:
-                            # Add section prefix to make unique
-                            display_name = f"{dirname.replace('_', ' ').title()} - {display_name}"
-                            existing2 = db.query(Ejercicio).filter(Ejercicio.name == display_name).first()
-                            if existing2:
-                                skipped += 1
-                                continue
-                            new_ej = Ejercicio(
-                                name=display_name,
-                                description=f'Ejercicio de {dirname.replace("_", " ")}',
-                                image_url=image_url,
-                                body_section=section,
-                                exercise_type=ExerciseType.fuerza
-                            )
-                            db.add(new_ej)
-                            created += 1
-                            print(f"  CREATED: {display_name} <- {filename}")
-                        continue
-                    new_ej = Ejercicio(
-                        name=display_name,
-                        description=f'Ejercicio de {dirname.replace("_", " ")}',
-                        image_url=image_url,
-                        body_section=section,
-                        exercise_type=ExerciseType.fuerza
-                    )
-                    db.add(new_ej)
-                    created += 1
-                    print(f"  CREATED: {display_name} <- {filename}")
+        rows = db.query(Ejercicio.id, Ejercicio.name, Ejercicio.body_section, Ejercicio.image_url).order_by(Ejercicio.id).all()
+        catalog = Catalog(rows)
+        images = scan_images(base_dir)
+        matches = match_all(
+            [(row.id, normalize(row.name), row.body_section) for row in rows],
+            [(normalize(filename), section) for _, filename, section in images],
+            jobs
+        )
+        counts = plan(catalog, images, matches)
 
-        db.commit()
+        if dry_run:
+            print("\nDRY RUN: no changes written")
+        else:
+            catalog.write(db)
 
         print(f"\n{'='*50}")
         print(f"REPORT:")
-        print(f"  Matched to existing exercises: {matched}")
-        print(f"  New exercises created: {created}")
-        print(f"  Skipped (duplicate): {skipped}")
-        print(f"  Total images processed: {matched + created + skipped}")
-
-        # Show exercises still without images
-        no_image = db.query(Ejercicio).filter(Ejercicio.image_url == None).count()
-        print(f"  Exercises still without image: {no_image}")
+        print(f"  Matched to existing exercises: {counts['matched']}")
+        print(f"  New exercises created: {counts['created']}")
+        print(f"  Skipped (duplicate): {counts['skipped']}")
+        print(f"  Total images processed: {sum(counts.values())}")
+        print(f"  Exercises still without image: {catalog.without_image()}")
 
     except Exception as e:
         print(f"ERROR: {e}")
@@ -241,4 +265,8 @@ def run():
         db.close()
 
 if __name__ == '__main__':
-    run()
+    parser = argparse.ArgumentParser(description='Match exercise images to the catalog.')
+    parser.add_argument('--dry-run', action='store_true', help='print the report without writing anything')
+    parser.add_argument('--jobs', type=int, default=None, help='matcher processes (default: all cores)')
+    args = parser.parse_args()
+    run(dry_run=args.dry_run, jobs=args.jobs)
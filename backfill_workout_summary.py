@@ -0,0 +1,80 @@
+"""
+Backfill the workout_day_summary rollup from existing workout_logs.
+Only (user, date) pairs without a summary row are inserted, so it is safe
+to re-run. planned_count for past days is approximated with the size of
+the user's current active routine (what the history page used to show).
+
+Run with: python backfill_workout_summary.py [--rebuild]
+  --rebuild  also recount completed_count on existing summary rows
+"""
+import sys
+from datetime import datetime
+from sqlalchemy import select, func, insert, update, and_, exists
+from db import SessionLocal
+from models import User, Rutina, RutinaUser, RutinaEjercicio, WorkoutLog, WorkoutDaySummary
+
+USER_CHUNK = 1000
+
+
+def backfill(rebuild=False):
+    db = SessionLocal()
+    try:
+        max_uid = db.query(func.max(User.id)).scalar() or 0
+        planned = select(
+            RutinaUser.user_id.label('user_id'),
+            func.count(RutinaEjercicio.id).label('planned')
+        ).join(Rutina, Rutina.id == RutinaUser.rutina_id).join(
+            RutinaEjercicio, RutinaEjercicio.rutina_id == Rutina.id
+        ).where(
+            RutinaUser.is_active == True,
+            Rutina.is_active == True
+        ).group_by(RutinaUser.user_id).subquery()
+
+        inserted = 0
+        updated = 0
+        for start in range(0, max_uid + 1, USER_CHUNK):
+            end = start + USER_CHUNK
+            in_range = and_(WorkoutLog.user_id >= start, WorkoutLog.user_id < end)
+            missing = select(
+                WorkoutLog.user_id,
+                WorkoutLog.date,
+                func.count(WorkoutLog.id),
+                func.coalesce(func.max(planned.c.planned), 0),
+                func.max(WorkoutLog.created_at)
+            ).outerjoin(
+                planned, planned.c.user_id == WorkoutLog.user_id
+            ).where(
+                in_range,
+                WorkoutLog.completed == True,
+                ~exists().where(and_(
+                    WorkoutDaySummary.user_id == WorkoutLog.user_id,
+                    WorkoutDaySummary.date == WorkoutLog.date
+                ))
+            ).group_by(WorkoutLog.user_id, WorkoutLog.date)
+            result = db.execute(insert(WorkoutDaySummary).from_select(
+                ['user_id', 'date', 'completed_count', 'planned_count', 'updated_at'], missing))
+            inserted += max(result.rowcount or 0, 0)
+
+            if rebuild:
+                recount = select(func.count(WorkoutLog.id)).where(
+                    WorkoutLog.user_id == WorkoutDaySummary.user_id,
+                    WorkoutLog.date == WorkoutDaySummary.date,
+                    WorkoutLog.completed == True
+                ).scalar_subquery()
+                result = db.execute(update(WorkoutDaySummary).where(
+                    WorkoutDaySummary.user_id >= start, WorkoutDaySummary.user_id < end
+                ).values(completed_count=recount, updated_at=datetime.utcnow()))
+                updated += max(result.rowcount or 0, 0)
+            db.commit()
+            print(f"   users {start}-{end - 1}: done")
+
+        print(f"Backfill complete: {inserted} summary rows inserted" + (f", {updated} recounted" if rebuild else ""))
+    except Exception as e:
+        print(f"Error during backfill: {e}")
+        db.rollback()
+        raise
+    finally:
+        db.close()
+
+if __name__ == '__main__':
+    backfill(rebuild='--rebuild' in sys.argv)
@@ -0,0 +1,392 @@
+"""
+Replay the production request mix against UrbanMood and report latency per endpoint.
+
+Uses a dataset built by generate_dataset.py (same DATABASE_URL). By default
+the app runs in this process behind N client threads (Flask test clients,
+the same code path gunicorn's gthread workers run) with rate limiting off,
+and email leaves through the real mail worker and MailerSend transport to a
+local MailerSend stub started here. With --url the mix is sent over HTTP to
+a running server instead; start that server with MAILERSEND_API_URL set to
+the stub address printed at start-up and RATE_LIMIT_ENABLED=0.
+
+Reports requests/s and p50/p95/p99 per endpoint, and writes the run as JSON
+(bench_results/ by default) so runs can be compared with --compare.
+
+Run with: python benchmark.py [--duration 30] [--concurrency 8] [--warmup 5]
+                              [--url http://127.0.0.1:5001] [--mail-latency 80]
+                              [--output run.json] [--compare bench_results/previous.json]
+"""
+import argparse
+import json
+import os
+import random
+import subprocess
+import threading
+import time
+from datetime import date, datetime, timedelta
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# (name, weight): share of requests per operation, shaped after production traffic
+MIX = [
+    ('mi_rutina', 30),
+    ('toggle', 20),
+    ('history', 10),
+    ('history_detail', 5),
+    ('login', 5),
+    ('admin_users', 5),
+    ('admin_rutinas', 5),
+    ('admin_ejercicios', 5),
+    ('admin_audit', 5),
+    ('admin_audit_filtered', 3),
+    ('forgot_password', 4),
+    ('contact', 3),
+]
+
+RESULTS_DIR = 'bench_results'
+
+
+# ============================================================================
+# MAILERSEND STUB
+# ============================================================================
+
+class MailerSendStub:
+    """Local stand-in for the MailerSend API: accepts /email and /bulk-email after ``latency`` seconds."""
+
+    def __init__(self, port=0, latency=0.0):
+        stub = self
+        self.latency = latency
+        self.requests = 0
+        self.messages = 0
+        self._lock = threading.Lock()
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_POST(self):
+                body = self.rfile.read(int(self.headers.get('Content-Length') or 0))
+                payload = json.loads(body or b'null')
+                with stub._lock:
+                    stub.requests += 1
+                    stub.messages += len(payload) if isinstance(payload, list) else 1
+                if stub.latency:
+                    time.sleep(stub.latency)
+                response = b'{"bulk_email_id": "bench"}' if self.path.endswith('/bulk-email') else b''
+                self.send_response(202)
+                self.send_header('Content-Type', 'application/json')
+                self.send_header('Content-Length', str(len(response)))
+                self.end_headers()
+                self.wfile.write(response)
+
+            def log_message(self, *args):
+                pass
+
+        self.server = ThreadingHTTPServer(('127.0.0.1', port), Handler)
+        self.url = f'http://127.0.0.1:{self.server.server_port}/v1'
+        threading.Thread(target=self.server.serve_forever, name='mailersend-stub', daemon=True).start()
+
+
+# ============================================================================
+# CLIENTS
+# ============================================================================
+
+class InProcessClient:
+    def __init__(self, app):
+        self.client = app.test_client()
+
+    def request(self, method, path, json_body=None):
+        response = self.client.open(path, method=method, json=json_body)
+        response.close()
+        return response.status_code
+
+
+class HttpClient:
+    def __init__(self, base_url):
+        import requests
+        self.base_url = base_url.rstrip('/')
+        self.session = requests.Session()
+
+    def request(self, method, path, json_body=None):
+        response = self.session.request(method, self.base_url + path, json=json_body, allow_redirects=False)
+        return response.status_code
+
+
+# ============================================================================
+# WORKLOAD
+# ============================================================================
+
+def load_fixtures(sample_size, rng):
+    """Members with an active routine (and its exercise ids) plus staff accounts."""
+    from db import SessionLocal
+    from models import User, UserRole, Rutina, RutinaUser, RutinaEjercicio
+    from generate_dataset import ADMIN_EMAIL, BENCH_DOMAIN, BENCH_PASSWORD
+
+    with SessionLocal() as db:
+        rows = db.query(User.id, User.email, RutinaEjercicio.id).join(
+            RutinaUser, (RutinaUser.user_id == User.id) & (RutinaUser.is_active == True)
+        ).join(Rutina, (Rutina.id == RutinaUser.rutina_id) & (Rutina.is_active == True)).join(
+            RutinaEjercicio, RutinaEjercicio.rutina_id == Rutina.id
+        ).filter(
+            User.is_active == True, User.role == UserRole.user, User.email.like(f'%@{BENCH_DOMAIN}')
+        ).limit(sample_size * 20).all()
+        coaches = [row.email for row in db.query(User.email).filter(
+            User.role == UserRole.coach, User.email.like(f'%@{BENCH_DOMAIN}')).limit(50)]
+    members = {}
+    for uid, email, re_id in rows:
+        members.setdefault(email, []).append(re_id)
+    if not members or not coaches:
+        raise SystemExit("❌ No benchmark data found. Run generate_dataset.py against this DATABASE_URL first.")
+    emails = rng.sample(sorted(members), min(sample_size, len(members)))
+    return {
+        'password': BENCH_PASSWORD,
+        'admin': ADMIN_EMAIL,
+        'coaches': coaches,
+        'members': [(email, members[email]) for email in emails],
+    }
+
+
+def login(client, email, password):
+    status = client.request('POST', '/login', {'email': email, 'password': password})
+    if status != 200:
+        raise SystemExit(f"❌ Login failed for {email} ({status})")
+
+
+class VirtualUser:
+    """One client thread: a logged-in member, coach and admin session."""
+
+    def __init__(self, make_client, fixtures, index, rng):
+        self.make_client = make_client
+        self.fixtures = fixtures
+        self.rng = rng
+        self.email, self.re_ids = fixtures['members'][index % len(fixtures['members'])]
+        self.member = make_client()
+        self.coach = make_client()
+        self.admin = make_client()
+        login(self.member, self.email, fixtures['password'])
+        login(self.coach, fixtures['coaches'][index % len(fixtures['coaches'])], fixtures['password'])
+        login(self.admin, fixtures['admin'], fixtures['password'])
+
+    def run(self, op):
+        rng = self.rng
+        if op == 'mi_rutina':
+            return self.member.request('GET', '/mi-rutina')
+        if op == 'toggle':
+            return self.member.request('POST', '/mi-rutina/toggle', {'rutina_ejercicio_id': rng.choice(self.re_ids)})
+        if op == 'history':
+            return self.member.request('GET', '/mi-rutina/history')
+        if op == 'history_detail':
+            day = date.today() - timedelta(days=rng.randrange(30))
+            return self.member.request('GET', f'/mi-rutina/history/{day.isoformat()}')
+        if op == 'login':
+            email, _ = rng.choice(self.fixtures['members'])
+            return self.make_client().request('POST', '/login', {'email': email, 'password': self.fixtures['password']})
+        if op == 'admin_users':
+            return self.admin.request('GET', '/admin/users')
+        if op == 'admin_rutinas':
+            return self.coach.request('GET', '/admin/rutinas')
+        if op == 'admin_ejercicios':
+            return self.coach.request('GET', '/admin/ejercicios')
+        if op == 'admin_audit':
+            return self.admin.request('GET', '/admin/audit')
+        if op == 'admin_audit_filtered':
+            return self.admin.request('GET', '/admin/audit?action=update_user')
+        if op == 'forgot_password':
+            email, _ = rng.choice(self.fixtures['members'])
+            return self.make_client().request('POST', '/forgot-password', {'email': email})
+        if op == 'contact':
+            return self.make_client().request('POST', '/send-email', {
+                'name': 'Bench', 'email': 'bench@example.test', 'message': 'Consulta de prueba'})
+        raise ValueError(op)
+
+
+def run_load(users, duration, warmup, seed):
+    """Drive every VirtualUser from its own thread; returns ``{op: [(seconds, ok)]}``."""
+    ops, weights = zip(*MIX)
+    samples = {op: [] for op in ops}
+    lock = threading.Lock()
+    start = time.perf_counter()
+    record_from = start + warmup
+    deadline = record_from + duration
+
+    def worker(n, user):
+        rng = random.Random(seed + n)
+        local = []
+        while True:
+            now = time.perf_counter()
+            if now >= deadline:
+                break
+            op = rng.choices(ops, weights)[0]
+            t0 = time.perf_counter()
+            try:
+                ok = user.run(op) < 400
+            except Exception:
+                ok = False
+            if t0 >= record_from:
+                local.append((op, time.perf_counter() - t0, ok))
+        with lock:
+            for op, seconds, ok in local:
+                samples[op].append((seconds, ok))
+
+    threads = [threading.Thread(target=worker, args=(n, user), name=f'bench-{n}') for n, user in enumerate(users)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    return samples
+
+
+# ============================================================================
+# REPORTING
+# ============================================================================
+
+def percentile(sorted_values, pct):
+    if not sorted_values:
+        return 0.0
+    index = max(0, -(-len(sorted_values) * pct // 100) - 1)
+    return sorted_values[int(index)]
+
+
+def summarize(samples, duration):
+    endpoints = {}
+    for op, values in samples.items():
+        if not values:
+            continue
+        latencies = sorted(seconds * 1000 for seconds, _ in values)
+        endpoints[op] = {
+            'requests': len(values),
+            'errors': sum(1 for _, ok in values if not ok),
+            'rps': round(len(values) / duration, 2),
+            'mean_ms': round(sum(latencies) / len(latencies), 2),
+            'p50_ms': round(percentile(latencies, 50), 2),
+            'p95_ms': round(percentile(latencies, 95), 2),
+            'p99_ms': round(percentile(latencies, 99), 2),
+            'max_ms': round(latencies[-1], 2),
+        }
+    total = sum(e['requests'] for e in endpoints.values())
+    all_latencies = sorted(seconds * 1000 for values in samples.values() for seconds, _ in values)
+    totals = {
+        'requests': total,
+        'errors': sum(e['errors'] for e in endpoints.values()),
+        'rps': round(total / duration, 2),
+        'p50_ms': round(percentile(all_latencies, 50), 2),
+        'p95_ms': round(percentile(all_latencies, 95), 2),
+        'p99_ms': round(percentile(all_latencies, 99), 2),
+    }
+    return endpoints, totals
+
+
+def print_table(endpoints, totals):
+    print(f"\n{'endpoint':<22}{'req':>8}{'err':>6}{'req/s':>9}{'p50':>9}{'p95':>9}{'p99':>9}{'max':>9}")
+    for op, e in sorted(endpoints.items(), key=lambda item: -item[1]['p95_ms']):
+        print(f"{op:<22}{e['requests']:>8}{e['errors']:>6}{e['rps']:>9}{e['p50_ms']:>9}{e['p95_ms']:>9}{e['p99_ms']:>9}{e['max_ms']:>9}")
+    print(f"{'TOTAL':<22}{totals['requests']:>8}{totals['errors']:>6}{totals['rps']:>9}"
+          f"{totals['p50_ms']:>9}{totals['p95_ms']:>9}{totals['p99_ms']:>9}")
+
+
+def print_comparison(previous_path, endpoints, totals):
+    with open(previous_path, encoding='utf-8') as fh:
+        previous = json.load(fh)
+    print(f"\nCompared with {previous_path} ({previous.get('git_commit') or 'unknown commit'}):")
+    print(f"{'endpoint':<22}{'req/s':>26}{'p50 ms':>26}{'p95 ms':>26}")
+
+    def delta(old, new):
+        change = f"{(new - old) / old * 100:+.0f}%" if old else 'n/a'
+        return f"{old} -> {new} ({change})"
+
+    rows = [('TOTAL', previous.get('totals', {}), totals)] + [
+        (op, previous.get('endpoints', {}).get(op), e) for op, e in sorted(endpoints.items())
+    ]
+    for op, old, new in rows:
+        if not old:
+            continue
+        print(f"{op:<22}{delta(old['rps'], new['rps']):>26}{delta(old['p50_ms'], new['p50_ms']):>26}"
+              f"{delta(old['p95_ms'], new['p95_ms']):>26}")
+
+
+def git_commit():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True,
+                              check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def dataset_counts():
+    from sqlalchemy import func
+    from db import SessionLocal
+    from models import User, Rutina, WorkoutLog
+    from models.audit import AuditLog
+    with SessionLocal() as db:
+        return {name: db.query(func.count(model.id)).scalar()
+                for name, model in (('users', User), ('rutinas', Rutina), ('workout_logs', WorkoutLog),
+                                    ('audit_logs', AuditLog))}
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark UrbanMood with a realistic request mix.')
+    parser.add_argument('--duration', type=float, default=30, help='measured seconds')
+    parser.add_argument('--warmup', type=float, default=5, help='seconds run before measuring')
+    parser.add_argument('--concurrency', type=int, default=8, help='client threads')
+    parser.add_argument('--url', help='benchmark a running server instead of the in-process app')
+    parser.add_argument('--mail-latency', type=float, default=80, help='MailerSend stub response time (ms)')
+    parser.add_argument('--stub-port', type=int, default=0, help='MailerSend stub port (random by default)')
+    parser.add_argument('--seed', type=int, default=1)
+    parser.add_argument('--output', help=f'JSON results file (default {RESULTS_DIR}/<timestamp>.json)')
+    parser.add_argument('--compare', help='previous JSON results to compare with')
+    args = parser.parse_args()
+
+    stub = MailerSendStub(args.stub_port, args.mail_latency / 1000)
+    print(f"📮 MailerSend stub listening on {stub.url}")
+    if not args.url:
+        # Must be set before the app (and config) is imported
+        os.environ.update(MAILERSEND_API_URL=stub.url, MAIL_TRANSPORT='mailersend', MAIL_WORKER_ENABLED='1',
+                          MAIL_QUEUE_POLL_INTERVAL='0.5')
+        os.environ.setdefault('MAILERSEND_API_KEY', 'bench')
+        os.environ.setdefault('RATE_LIMIT_ENABLED', '0')
+        os.environ.setdefault('REQUEST_TIMING_ENABLED', '0')
+        os.environ.setdefault('LOG_LEVEL', 'WARNING')
+
+    rng = random.Random(args.seed)
+    fixtures = load_fixtures(args.concurrency * 4, rng)
+    if args.url:
+        make_client = lambda: HttpClient(args.url)
+        mode = 'http'
+    else:
+        from app import app
+        make_client = lambda: InProcessClient(app)
+        mode = 'in-process'
+
+    print(f"🔐 Logging in {args.concurrency} virtual users...")
+    users = [VirtualUser(make_client, fixtures, n, random.Random(args.seed + n)) for n in range(args.concurrency)]
+    print(f"🏃 Running {mode} for {args.warmup:g}s warm-up + {args.duration:g}s with {args.concurrency} threads...")
+    samples = run_load(users, args.duration, args.warmup, args.seed)
+
+    endpoints, totals = summarize(samples, args.duration)
+    print_table(endpoints, totals)
+    print(f"\n📧 MailerSend stub: {stub.messages} messages in {stub.requests} API calls")
+
+    result = {
+        'started_at': datetime.utcnow().isoformat(timespec='seconds'),
+        'git_commit': git_commit(),
+        'mode': mode,
+        'url': args.url,
+        'concurrency': args.concurrency,
+        'duration': args.duration,
+        'warmup': args.warmup,
+        'mail_latency_ms': args.mail_latency,
+        'database': 'sqlite' if os.getenv('DATABASE_URL', 'sqlite').startswith('sqlite') else 'other',
+        'dataset': dataset_counts(),
+        'mix': dict(MIX),
+        'totals': totals,
+        'endpoints': endpoints,
+        'emails': {'messages': stub.messages, 'api_calls': stub.requests},
+    }
+    output = args.output or os.path.join(RESULTS_DIR, datetime.utcnow().strftime('%Y%m%dT%H%M%S') + '.json')
+    os.makedirs(os.path.dirname(output) or '.', exist_ok=True)
+    with open(output, 'w', encoding='utf-8') as fh:
+        json.dump(result, fh, indent=2)
+    print(f"💾 Results saved to {output}")
+
+    if args.compare:
+        print_comparison(args.compare, endpoints, totals)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,80 @@
+#!/usr/bin/env python3
+"""
+Build fingerprinted static assets into static/dist/.
+
+For style.css, script.js, the top-level icons and everything under
+static/images/ this writes a content-hashed copy (style.<hash>.css), .gz and
+.br variants for compressible types, and static/dist/manifest.json, which
+asset_url() and the static middleware read at startup.
+
+JPEG/PNG/GIF/WebP are already compressed, so they only get the hashed copy.
+Brotli output needs the optional `brotli` package; without it only .gz is
+written.
+
+Usage: python build_assets.py
+"""
+import glob
+import gzip
+import json
+import os
+import shutil
+from utils.assets import STATIC_DIR, DIST_DIR, MANIFEST_NAME, content_hash, hashed_name
+
+try:
+    import brotli
+except ImportError:  # optional
+    brotli = None
+
+ASSET_PATTERNS = ['style.css', 'script.js', '*.png', '*.ico', 'images/**/*']
+COMPRESSIBLE = {'.css', '.js', '.svg', '.ico', '.json', '.txt', '.xml', '.html', '.map'}
+MIN_SAVING = 0.9  # keep a compressed variant only if it is at most 90% of the original
+
+
+def collect(static_dir):
+    paths = set()
+    for pattern in ASSET_PATTERNS:
+        for full in glob.glob(os.path.join(static_dir, pattern), recursive=True):
+            if os.path.isfile(full):
+                paths.add(os.path.relpath(full, static_dir).replace(os.sep, '/'))
+    return sorted(paths)
+
+
+def write(path, data):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, 'wb') as fh:
+        fh.write(data)
+
+
+def build(static_dir=STATIC_DIR):
+    dist_dir = os.path.join(static_dir, DIST_DIR)
+    # Start from scratch so stale hashes never linger
+    shutil.rmtree(dist_dir, ignore_errors=True)
+    manifest = {}
+    written = compressed = 0
+    for rel in collect(static_dir):
+        with open(os.path.join(static_dir, rel), 'rb') as fh:
+            data = fh.read()
+        hashed = hashed_name(rel, content_hash(data))
+        target = os.path.join(dist_dir, hashed)
+        write(target, data)
+        manifest[rel] = hashed
+        written += 1
+        if os.path.splitext(rel)[1].lower() not in COMPRESSIBLE:
+            continue
+        variants = {'.gz': gzip.compress(data, compresslevel=9, mtime=0)}
+        if brotli is not None:
+            variants['.br'] = brotli.compress(data, quality=11)
+        for suffix, packed in variants.items():
+            if len(packed) <= len(data) * MIN_SAVING:
+                write(target + suffix, packed)
+                compressed += 1
+    with open(os.path.join(dist_dir, MANIFEST_NAME), 'w', encoding='utf-8') as fh:
+        json.dump(manifest, fh, indent=1, sort_keys=True)
+    print(f"✅ {written} assets fingerprinted, {compressed} compressed variants written to static/{DIST_DIR}/")
+    if brotli is None:
+        print("ℹ️  brotli not installed; skipped .br variants")
+    return manifest
+
+
+if __name__ == "__main__":
+    build()
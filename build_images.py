@@ -0,0 +1,119 @@
+#!/usr/bin/env python3
+"""
+Build responsive WebP variants of the exercise and carousel images.
+
+Each source under static/images/ is resized to the widths in WIDTHS that are
+smaller than the original, plus one at the original width, and written to
+static/variants/ (file names carry the source hash). static/variants/
+manifest.json records them for image_srcset().
+
+Incremental: sources whose content hash matches the manifest and whose
+variants are still on disk are skipped. Changed sources are processed in
+parallel across all cores.
+
+Usage: python build_images.py [--force] [--jobs N]
+"""
+import argparse
+import glob
+import json
+import os
+import re
+from concurrent.futures import ProcessPoolExecutor
+from PIL import Image, ImageOps
+from utils.assets import STATIC_DIR, content_hash
+from utils.images import VARIANTS_DIR, MANIFEST_NAME, load_image_manifest
+
+SOURCE_PATTERNS = ['images/ejercicios/*', 'images/exercises/**/*', 'images/carousel*.jpg']
+SOURCE_TYPES = {'.jpg', '.jpeg', '.png'}
+WIDTHS = [96, 192, 384, 768]
+QUALITY = 80
+
+
+def collect_sources(static_dir):
+    paths = set()
+    for pattern in SOURCE_PATTERNS:
+        for full in glob.glob(os.path.join(static_dir, pattern), recursive=True):
+            if os.path.isfile(full) and os.path.splitext(full)[1].lower() in SOURCE_TYPES:
+                paths.add(os.path.relpath(full, static_dir).replace(os.sep, '/'))
+    return sorted(paths)
+
+
+def variant_path(rel, digest, width):
+    """images/ejercicios/descarga (1).jpg -> variants/images/ejercicios/descarga-1.<hash>.96w.webp"""
+    folder, name = os.path.split(rel)
+    slug = re.sub(r'[^A-Za-z0-9_.-]+', '-', os.path.splitext(name)[0]).strip('-') or 'img'
+    return f"{VARIANTS_DIR}/{folder}/{slug}.{digest[:8]}.{width}w.webp"
+
+
+def render_variants(static_dir, rel, digest):
+    """Worker: write every variant of one source, return its manifest entry."""
+    with Image.open(os.path.join(static_dir, rel)) as original:
+        image = ImageOps.exif_transpose(original)
+        image = image.convert('RGBA' if 'A' in image.getbands() or 'transparency' in image.info else 'RGB')
+    width, height = image.size
+    widths = [w for w in WIDTHS if w < width] + [width]
+    variants = []
+    for w in widths:
+        resized = image if w == width else image.resize((w, max(1, round(height * w / width))), Image.Resampling.LANCZOS)
+        out = variant_path(rel, digest, w)
+        full = os.path.join(static_dir, out)
+        os.makedirs(os.path.dirname(full), exist_ok=True)
+        resized.save(full, 'WEBP', quality=QUALITY, method=4)
+        variants.append([w, out])
+    return {'hash': digest, 'width': width, 'height': height, 'variants': variants}
+
+
+def _is_current(static_dir, entry, digest):
+    return (entry and entry['hash'] == digest
+            and all(os.path.exists(os.path.join(static_dir, path)) for _, path in entry['variants']))
+
+
+def build(static_dir=STATIC_DIR, force=False, jobs=None):
+    old = load_image_manifest(static_dir)
+    manifest, pending = {}, {}
+    for rel in collect_sources(static_dir):
+        with open(os.path.join(static_dir, rel), 'rb') as fh:
+            digest = content_hash(fh.read())
+        if not force and _is_current(static_dir, old.get(rel), digest):
+            manifest[rel] = old[rel]
+        else:
+            pending[rel] = digest
+
+    failed = []
+    if pending:
+        with ProcessPoolExecutor(max_workers=jobs or os.cpu_count()) as pool:
+            futures = {rel: pool.submit(render_variants, static_dir, rel, digest) for rel, digest in pending.items()}
+            for rel, future in futures.items():
+                try:
+                    manifest[rel] = future.result()
+                except Exception as e:  # unreadable / truncated source
+                    failed.append((rel, e))
+
+    # Drop variants nobody references any more (changed or deleted sources)
+    keep = {path for entry in manifest.values() for _, path in entry['variants']}
+    removed = 0
+    for entry in old.values():
+        for _, path in entry['variants']:
+            if path not in keep and os.path.exists(os.path.join(static_dir, path)):
+                os.remove(os.path.join(static_dir, path))
+                removed += 1
+
+    target = os.path.join(static_dir, VARIANTS_DIR, MANIFEST_NAME)
+    os.makedirs(os.path.dirname(target), exist_ok=True)
+    with open(target + '.tmp', 'w', encoding='utf-8') as fh:
+        json.dump(dict(sorted(manifest.items())), fh, indent=1)
+    os.replace(target + '.tmp', target)
+
+    processed = len(pending) - len(failed)
+    print(f"✅ {processed} images processed, {len(manifest) - processed} unchanged, {removed} stale variants removed")
+    for rel, e in failed:
+        print(f"⚠️  {rel}: {e}")
+    return manifest
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--force', action='store_true', help='rebuild every variant')
+    parser.add_argument('--jobs', type=int, default=None, help='worker processes (default: all cores)')
+    args = parser.parse_args()
+    build(force=args.force, jobs=args.jobs)
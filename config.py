@@ -4,14 +4,74 @@ from datetime import timedelta
 class Config:
     SECRET_KEY = os.getenv('SECRET_KEY', 'dev-insecure-key')
     DATABASE_URL = os.getenv('DATABASE_URL', 'sqlite:///dev.db')
+    # create_all on startup is only meant for local SQLite databases
+    DB_AUTO_CREATE = os.getenv('DB_AUTO_CREATE', '1' if DATABASE_URL.startswith('sqlite') else '0').lower() in ('1', 'true', 'yes')
+    # Connection pool (QueuePool; SQLite :memory: uses a single static connection)
+    DB_POOL_SIZE = int(os.getenv('DB_POOL_SIZE', '5'))
+    DB_MAX_OVERFLOW = int(os.getenv('DB_MAX_OVERFLOW', '5'))
+    DB_POOL_TIMEOUT = int(os.getenv('DB_POOL_TIMEOUT', '10'))  # seconds waiting for a free connection
+    DB_POOL_RECYCLE = int(os.getenv('DB_POOL_RECYCLE', '280'))  # seconds; below MySQL wait_timeout
+    DB_POOL_PRE_PING = os.getenv('DB_POOL_PRE_PING', '1').lower() in ('1', 'true', 'yes')
+    SQLITE_BUSY_TIMEOUT = int(os.getenv('SQLITE_BUSY_TIMEOUT', '5000'))  # milliseconds
+    SKIP_SCHEMA_CHECK = os.getenv('SKIP_SCHEMA_CHECK', '').lower() in ('1', 'true', 'yes')
     SESSION_COOKIE_HTTPONLY = True
     SESSION_COOKIE_SAMESITE = 'Lax'
     REMEMBER_COOKIE_DURATION = timedelta(days=14)
+    BCRYPT_ROUNDS = int(os.getenv('BCRYPT_ROUNDS', '12'))  # existing hashes are upgraded on login
+    PASSWORD_HASH_POOL_SIZE = int(os.getenv('PASSWORD_HASH_POOL_SIZE', '0'))  # >0 offloads bcrypt to processes
+    PASSWORD_HASH_TIMEOUT = float(os.getenv('PASSWORD_HASH_TIMEOUT', '10'))  # seconds
     SECURITY_PASSWORD_SALT = os.getenv('SECURITY_PASSWORD_SALT', 'change-me')
-    RATE_LIMIT_GLOBAL = os.getenv('RATE_LIMIT_GLOBAL', '200 per hour')
-    RATE_LIMIT_LOGIN = os.getenv('RATE_LIMIT_LOGIN', '10 per 5 minute')
+    RATE_LIMIT_GLOBAL = os.getenv('RATE_LIMIT_GLOBAL', '200 per hour')  # anonymous clients, per IP
+    RATE_LIMIT_AUTHENTICATED = os.getenv('RATE_LIMIT_AUTHENTICATED', '3000 per hour')  # logged-in users, per account
+    RATE_LIMIT_LOGIN = os.getenv('RATE_LIMIT_LOGIN', '10 per 5 minute')  # per IP + email
+    RATE_LIMIT_LOGIN_PER_IP = os.getenv('RATE_LIMIT_LOGIN_PER_IP', '300 per 5 minute')
+    RATE_LIMIT_FORGOT_PASSWORD = os.getenv('RATE_LIMIT_FORGOT_PASSWORD', '5 per 15 minute')  # per IP + email
+    RATE_LIMIT_FORGOT_PASSWORD_PER_IP = os.getenv('RATE_LIMIT_FORGOT_PASSWORD_PER_IP', '50 per 15 minute')
+    RATE_LIMIT_CONTACT = os.getenv('RATE_LIMIT_CONTACT', '5 per 10 minute')
+    RATE_LIMIT_ENABLED = os.getenv('RATE_LIMIT_ENABLED', '1').lower() in ('1', 'true', 'yes')
+    # Counter store shared by all workers (sqlite:///file, redis://..., memory://)
+    RATE_LIMIT_STORAGE_URI = os.getenv('RATE_LIMIT_STORAGE_URI', 'sqlite:///ratelimit.db')
+    TRUSTED_PROXY_COUNT = int(os.getenv('TRUSTED_PROXY_COUNT', '0'))  # reverse proxies setting X-Forwarded-For
     MAILERSEND_API_KEY = os.getenv('MAILERSEND_API_KEY')
+    MAILERSEND_API_URL = os.getenv('MAILERSEND_API_URL', 'https://api.mailersend.com/v1')  # benchmark.py points it at a local stub
     MAIL_FROM_NAME = 'UrbanMood'
     MAIL_FROM_EMAIL = 'noreply@urbanmood.net'
+    APP_BASE_URL = os.getenv('APP_BASE_URL', 'https://urbanmood.net')  # used in email links
+    MAIL_HTTP_TIMEOUT = float(os.getenv('MAIL_HTTP_TIMEOUT', '10'))  # seconds per MailerSend call
+    MAIL_HTTP_POOL_SIZE = int(os.getenv('MAIL_HTTP_POOL_SIZE', '4'))
+    # Outbound email queue (utils.mail_queue)
+    MAIL_TRANSPORT = os.getenv('MAIL_TRANSPORT', 'mailersend' if MAILERSEND_API_KEY else 'console')
+    MAIL_WORKER_ENABLED = os.getenv('MAIL_WORKER_ENABLED', '1').lower() in ('1', 'true', 'yes')
+    MAIL_QUEUE_POLL_INTERVAL = float(os.getenv('MAIL_QUEUE_POLL_INTERVAL', '5'))  # seconds
+    MAIL_BATCH_SIZE = int(os.getenv('MAIL_BATCH_SIZE', '50'))  # due messages claimed per worker pass
+    MAIL_MAX_ATTEMPTS = int(os.getenv('MAIL_MAX_ATTEMPTS', '6'))
+    MAIL_RETRY_BASE_DELAY = int(os.getenv('MAIL_RETRY_BASE_DELAY', '30'))  # seconds, doubled per attempt
+    MAIL_RETRY_MAX_DELAY = int(os.getenv('MAIL_RETRY_MAX_DELAY', '3600'))
+    MAIL_STALE_LOCK = int(os.getenv('MAIL_STALE_LOCK', '300'))  # reclaim 'sending' rows after this many seconds
+    MAIL_BULK_POLL_INTERVAL = float(os.getenv('MAIL_BULK_POLL_INTERVAL', '30'))  # seconds between bulk status checks
+    IMPORT_MAX_ROWS = int(os.getenv('IMPORT_MAX_ROWS', '10000'))
+    IMPORT_BATCH_SIZE = int(os.getenv('IMPORT_BATCH_SIZE', '500'))
+    # Static files (utils.assets): in-memory index served before Flask routing
+    STATIC_INDEX_ENABLED = os.getenv('STATIC_INDEX_ENABLED', '1').lower() in ('1', 'true', 'yes')
+    STATIC_INDEX_MAX_BYTES = int(os.getenv('STATIC_INDEX_MAX_BYTES', str(2 * 1024 * 1024)))  # larger files go through Flask
+    STATIC_MAX_AGE = int(os.getenv('STATIC_MAX_AGE', '3600'))  # seconds, for non-fingerprinted URLs
+    CATALOG_VERSION_TTL = float(os.getenv('CATALOG_VERSION_TTL', '5'))  # seconds between exercise catalog version checks
+    # Per-request timing (utils.request_timing): JSON log line and Server-Timing header
+    REQUEST_TIMING_ENABLED = os.getenv('REQUEST_TIMING_ENABLED', '1').lower() in ('1', 'true', 'yes')
+    SERVER_TIMING_HEADER = os.getenv('SERVER_TIMING_HEADER', '1').lower() in ('1', 'true', 'yes')
+    # Prometheus metrics (utils.metrics); /metrics is open to loopback, else needs this bearer token
+    METRICS_ENABLED = os.getenv('METRICS_ENABLED', '1').lower() in ('1', 'true', 'yes')
+    METRICS_TOKEN = os.getenv('METRICS_TOKEN')
+    # Slow-query log (utils.slow_queries); SLOW_QUERY_MS=0 disables it, an empty file name keeps it in memory only
+    SLOW_QUERY_MS = float(os.getenv('SLOW_QUERY_MS', '100'))
+    SLOW_QUERY_BUFFER = int(os.getenv('SLOW_QUERY_BUFFER', '1000'))  # records kept per worker
+    SLOW_QUERY_LOG_FILE = os.getenv('SLOW_QUERY_LOG_FILE', 'slow_queries.log')
+    SLOW_QUERY_LOG_MAX_BYTES = int(os.getenv('SLOW_QUERY_LOG_MAX_BYTES', str(5 * 1024 * 1024)))  # rotated, 3 backups
+    # Query budgets / N+1 detection (utils.query_budget): off, warn (log) or raise (tests)
+    QUERY_BUDGET_MODE = os.getenv('QUERY_BUDGET_MODE', 'off').lower()
+    N_PLUS_ONE_THRESHOLD = int(os.getenv('N_PLUS_ONE_THRESHOLD', '5'))  # same statement shape this often in one request
+    AUDIT_PAGE_SIZE = int(os.getenv('AUDIT_PAGE_SIZE', '50'))
+    AUDIT_COUNT_TTL = int(os.getenv('AUDIT_COUNT_TTL', '300'))  # seconds; 0 disables the total
+    AUDIT_ACTIONS_TTL = int(os.getenv('AUDIT_ACTIONS_TTL', '600'))  # seconds
 
 config = Config()
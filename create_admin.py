@@ -1,9 +1,9 @@
 import os
 from getpass import getpass
-from passlib.hash import bcrypt
 from sqlalchemy import select
 from db import SessionLocal, engine, Base
 from models import User, UserRole
+from utils.passwords import hash_password
 
 # Create tables if not exist
 with engine.begin() as conn:
@@ -18,7 +18,7 @@ def main():
         if existing:
             print('User already exists.')
             return
-        user = User(email=email, name=name, role=UserRole.admin, is_active=True, password_hash=bcrypt.hash(password))
+        user = User(email=email, name=name, role=UserRole.admin, is_active=True, password_hash=hash_password(password))
         db.add(user)
         db.commit()
         print('Admin created.')
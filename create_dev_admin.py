@@ -1,10 +1,10 @@
 #!/usr/bin/env python3
 """Create a dev admin user with known credentials for local development."""
 
-from passlib.hash import bcrypt
 from sqlalchemy import select
 from db import SessionLocal, engine, Base
 from models import User, UserRole
+from utils.passwords import hash_password
 
 # Create tables if not exist
 with engine.begin() as conn:
@@ -20,7 +20,7 @@ def main():
         if existing:
             print(f'Dev admin user already exists: {email}')
             # Update password in case it was changed
-            existing.password_hash = bcrypt.hash(password)
+            existing.password_hash = hash_password(password)
             db.commit()
             print('Password updated.')
         else:
@@ -29,7 +29,7 @@ def main():
                 name=name,
                 role=UserRole.admin,
                 is_active=True,
-                password_hash=bcrypt.hash(password)
+                password_hash=hash_password(password)
             )
             db.add(user)
             db.commit()
@@ -1,14 +1,221 @@
-from sqlalchemy import create_engine
+import os
+import time
+import logging
+import threading
+from sqlalchemy import create_engine, event, exc, inspect, text
+from sqlalchemy.engine import make_url
 from sqlalchemy.orm import sessionmaker, scoped_session, declarative_base
+from sqlalchemy.pool import QueuePool, StaticPool
 from config import config
+from utils.metrics import DB_POOL_WAIT_SECONDS, DB_POOL_TIMEOUTS
+from utils import slow_queries
 
-engine = create_engine(config.DATABASE_URL, echo=False, future=True)
+logger = logging.getLogger("urbanmood.db")
+
+
+class PoolStats:
+    """Thread-safe counters for connection pool checkouts.
+
+    ``wait`` is the time spent obtaining a connection from the pool (queue
+    wait plus any new connect), ``held`` is how long it stayed checked out.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self._lock:
+            self.checkouts = 0
+            self.timeouts = 0
+            self.wait_total = 0.0
+            self.wait_max = 0.0
+            self.held_total = 0.0
+            self.held_max = 0.0
+            self.checkins = 0
+
+    def record_wait(self, seconds):
+        with self._lock:
+            self.checkouts += 1
+            self.wait_total += seconds
+            self.wait_max = max(self.wait_max, seconds)
+
+    def record_timeout(self):
+        with self._lock:
+            self.timeouts += 1
+
+    def record_held(self, seconds):
+        with self._lock:
+            self.checkins += 1
+            self.held_total += seconds
+            self.held_max = max(self.held_max, seconds)
+
+    def snapshot(self):
+        with self._lock:
+            return {
+                'checkouts': self.checkouts,
+                'timeouts': self.timeouts,
+                'wait_avg_ms': round(self.wait_total / self.checkouts * 1000, 3) if self.checkouts else 0.0,
+                'wait_max_ms': round(self.wait_max * 1000, 3),
+                'held_avg_ms': round(self.held_total / self.checkins * 1000, 3) if self.checkins else 0.0,
+                'held_max_ms': round(self.held_max * 1000, 3),
+            }
+
+
+pool_stats = PoolStats()
+
+
+class TimedQueuePool(QueuePool):
+    """QueuePool that records how long each checkout waited for a connection."""
+
+    def _do_get(self):
+        start = time.perf_counter()
+        try:
+            conn = super()._do_get()
+        except exc.TimeoutError:
+            # Only an exhausted pool; a failed connect propagates uncounted
+            pool_stats.record_timeout()
+            DB_POOL_TIMEOUTS.inc()
+            raise
+        waited = time.perf_counter() - start
+        pool_stats.record_wait(waited)
+        DB_POOL_WAIT_SECONDS.observe(waited)
+        return conn
+
+
+def _engine_options(url):
+    """Per-dialect pool settings, driven by Config."""
+    url = make_url(url)
+    options = {'echo': False, 'future': True}
+    if url.get_backend_name() == 'sqlite':
+        options['connect_args'] = {'check_same_thread': False, 'timeout': config.SQLITE_BUSY_TIMEOUT / 1000}
+        if url.database in (None, '', ':memory:'):
+            # A single shared connection, otherwise every checkout sees an empty database
+            options['poolclass'] = StaticPool
+            return options
+    options.update(
+        poolclass=TimedQueuePool,
+        pool_size=config.DB_POOL_SIZE,
+        max_overflow=config.DB_MAX_OVERFLOW,
+        pool_timeout=config.DB_POOL_TIMEOUT,
+        pool_recycle=config.DB_POOL_RECYCLE,
+        pool_pre_ping=config.DB_POOL_PRE_PING,
+    )
+    return options
+
+
+engine = create_engine(config.DATABASE_URL, **_engine_options(config.DATABASE_URL))
 SessionLocal = scoped_session(sessionmaker(bind=engine, autoflush=False, autocommit=False, expire_on_commit=False))
 Base = declarative_base()
 
+
+@event.listens_for(engine, 'connect')
+def _set_sqlite_pragmas(dbapi_conn, connection_record):
+    if engine.dialect.name != 'sqlite':
+        return
+    cursor = dbapi_conn.cursor()
+    if engine.url.database not in (None, '', ':memory:'):
+        # WAL lets readers proceed while a writer holds the lock
+        cursor.execute("PRAGMA journal_mode=WAL")
+    cursor.execute(f"PRAGMA busy_timeout={int(config.SQLITE_BUSY_TIMEOUT)}")
+    cursor.execute("PRAGMA synchronous=NORMAL")
+    cursor.close()
+
+
+@event.listens_for(engine, 'checkout')
+def _on_checkout(dbapi_conn, connection_record, connection_proxy):
+    connection_record.info['checked_out_at'] = time.perf_counter()
+
+
+@event.listens_for(engine, 'checkin')
+def _on_checkin(dbapi_conn, connection_record):
+    started = connection_record.info.pop('checked_out_at', None)
+    if started is not None:
+        pool_stats.record_held(time.perf_counter() - started)
+
+
+@event.listens_for(engine, 'before_cursor_execute')
+def _slow_query_start(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault('slow_query_start', []).append(time.perf_counter())
+
+
+@event.listens_for(engine, 'after_cursor_execute')
+def _slow_query_check(conn, cursor, statement, parameters, context, executemany):
+    stack = conn.info.get('slow_query_start')
+    if not stack:
+        return
+    elapsed = time.perf_counter() - stack.pop()
+    if config.SLOW_QUERY_MS > 0 and elapsed * 1000 >= config.SLOW_QUERY_MS:
+        slow_queries.record(statement, parameters, executemany, elapsed)
+
+
+@event.listens_for(engine, 'handle_error')
+def _slow_query_error(exception_context):
+    # after_cursor_execute does not run for failed statements
+    conn = exception_context.connection
+    if conn is not None and conn.info.get('slow_query_start'):
+        conn.info['slow_query_start'].pop()
+
+
+def get_pool_status():
+    """Current pool occupancy plus cumulative checkout timings, for monitoring."""
+    pool = engine.pool
+    status = {'pool_class': type(pool).__name__}
+    if isinstance(pool, QueuePool):
+        status.update(
+            size=pool.size(),
+            checked_in=pool.checkedin(),
+            checked_out=pool.checkedout(),
+            overflow=pool.overflow(),
+        )
+    status.update(pool_stats.snapshot())
+    return status
+
 def get_db():
     db = SessionLocal()
     try:
         yield db
     finally:
         db.close()
+
+def _migration_scripts():
+    from alembic.config import Config as AlembicConfig
+    from alembic.script import ScriptDirectory
+
+    ini_path = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'alembic.ini')
+    return ScriptDirectory.from_config(AlembicConfig(ini_path))
+
+def create_local_schema():
+    """``create_all`` for local databases (DB_AUTO_CREATE).
+
+    A database that had no tables at all is then stamped at the Alembic head,
+    since create_all just built exactly that schema. Existing databases are
+    left alone: they still need ``alembic upgrade head``.
+    """
+    from alembic.runtime.migration import MigrationContext
+
+    with engine.begin() as conn:
+        fresh = not inspect(conn).get_table_names()
+        Base.metadata.create_all(conn)
+        if fresh:
+            # Stamped on this connection rather than through migrations/env.py, which
+            # would reconfigure logging and open its own engine
+            MigrationContext.configure(conn).stamp(_migration_scripts(), 'head')
+            logger.info("Created a new database schema, stamped at the Alembic head")
+
+def check_schema_version():
+    """Warn if the database is not at the Alembic head revision.
+
+    One SELECT against alembic_version; never modifies the schema.
+    Returns True when the database is up to date.
+    """
+    head = _migration_scripts().get_current_head()
+    try:
+        with engine.connect() as conn:
+            current = conn.execute(text("SELECT version_num FROM alembic_version")).scalar()
+    except Exception:
+        current = None
+    if current != head:
+        logger.warning("Database schema at revision %s, expected %s. Run `alembic upgrade head`.", current, head)
+        return False
+    return True
@@ -0,0 +1,223 @@
+"""
+Build a scaled synthetic dataset for load tests and benchmarks (see benchmark.py).
+
+Creates members, coaches and one admin, routines built from the exercise
+catalog, routine assignments, workout_logs over the last --days days with
+the matching workout_day_summary rollup, and audit_logs. Everything is
+written with chunked executemany INSERTs and explicit ids, so the full
+default size (50k users, 500 coaches, 20k routines, 5M workout logs) is
+practical on SQLite as well as MySQL.
+
+Every generated account uses the password BENCH_PASSWORD and an
+@bench.urbanmood.test email; the admin is admin@bench.urbanmood.test.
+Point DATABASE_URL at a dedicated database before running.
+
+Run with: python generate_dataset.py [--scale 0.01] [--seed 42]
+  --scale     multiply every row count (0.01 for a quick local dataset)
+  --users / --coaches / --rutinas / --logs / --audit / --days  override one size
+"""
+import argparse
+import math
+import random
+import time
+from datetime import date, datetime, timedelta
+from sqlalchemy import func, insert
+from db import SessionLocal, create_local_schema
+from models import (User, UserRole, Rutina, RutinaUser, RutinaEjercicio, Ejercicio, WorkoutLog,
+                    WorkoutDaySummary)
+from models.audit import AuditLog
+from passlib.hash import bcrypt
+from config import config
+from seed_ejercicios import seed_ejercicios
+from utils.ordering import ORDEN_GAP
+
+BENCH_DOMAIN = 'bench.urbanmood.test'
+BENCH_PASSWORD = 'bench-password'
+ADMIN_EMAIL = f'admin@{BENCH_DOMAIN}'
+CHUNK = 20000
+
+DEFAULTS = {'users': 50000, 'coaches': 500, 'rutinas': 20000, 'logs': 5000000, 'audit': 100000, 'days': 180}
+
+AUDIT_ACTIONS = ['create_user', 'update_user', 'delete_user', 'create_rutina', 'update_rutina',
+                 'assign_rutina', 'promote_coach', 'demote_coach', 'import_users']
+
+
+def member_email(i):
+    return f'user{i}@{BENCH_DOMAIN}'
+
+
+def coach_email(i):
+    return f'coach{i}@{BENCH_DOMAIN}'
+
+
+def _bulk(db, table, rows):
+    """Insert ``rows`` (any iterable of dicts) in CHUNK-sized executemany batches."""
+    total = 0
+    batch = []
+    for row in rows:
+        batch.append(row)
+        if len(batch) >= CHUNK:
+            db.execute(insert(table), batch)
+            db.commit()
+            total += len(batch)
+            batch = []
+    if batch:
+        db.execute(insert(table), batch)
+        db.commit()
+        total += len(batch)
+    return total
+
+
+def _next_id(db, model):
+    return (db.query(func.max(model.id)).scalar() or 0) + 1
+
+
+def generate(sizes, seed=42):
+    rng = random.Random(seed)
+    started = time.perf_counter()
+    create_local_schema()
+    seed_ejercicios()
+
+    db = SessionLocal()
+    try:
+        if db.query(User.id).filter(User.email == ADMIN_EMAIL).first():
+            print(f"⚠️  Benchmark data already present ({ADMIN_EMAIL}). Use a fresh DATABASE_URL.")
+            return
+        catalog = [row.id for row in db.query(Ejercicio.id).filter(Ejercicio.is_active == True)]
+        # One hash for every account: bcrypt per row would dominate the run
+        password_hash = bcrypt.using(rounds=config.BCRYPT_ROUNDS).hash(BENCH_PASSWORD)
+        now = datetime.utcnow()
+        today = date.today()
+
+        # --- Users -------------------------------------------------------
+        first_id = _next_id(db, User)
+        admin_id = first_id
+        coach_ids = list(range(admin_id + 1, admin_id + 1 + sizes['coaches']))
+        member_start = admin_id + 1 + sizes['coaches']
+        member_ids = list(range(member_start, member_start + sizes['users']))
+
+        def user_rows():
+            yield dict(id=admin_id, email=ADMIN_EMAIL, name='Bench Admin', role=UserRole.admin,
+                       is_active=True, password_hash=password_hash, created_at=now, updated_at=now)
+            for n, uid in enumerate(coach_ids):
+                yield dict(id=uid, email=coach_email(n), name=f'Coach {n}', role=UserRole.coach,
+                           is_active=True, password_hash=password_hash, created_at=now, updated_at=now)
+            for n, uid in enumerate(member_ids):
+                yield dict(id=uid, email=member_email(n), name=f'Socio {n}', role=UserRole.user,
+                           is_active=rng.random() > 0.05, password_hash=password_hash,
+                           created_by_user_id=admin_id, created_at=now - timedelta(days=rng.randrange(720)),
+                           updated_at=now)
+        n_users = _bulk(db, User, user_rows())
+        print(f"   users: {n_users}")
+
+        # --- Routines and their exercises --------------------------------
+        rutina_ids = list(range(_next_id(db, Rutina), _next_id(db, Rutina) + sizes['rutinas']))
+        routine_exercises = {}
+        re_id = _next_id(db, RutinaEjercicio)
+        re_rows = []
+        for rid in rutina_ids:
+            picked = rng.sample(catalog, min(len(catalog), rng.randint(6, 10)))
+            routine_exercises[rid] = list(range(re_id, re_id + len(picked)))
+            for pos, ejercicio_id in enumerate(picked):
+                re_rows.append(dict(id=re_id, rutina_id=rid, ejercicio_id=ejercicio_id,
+                                    series=rng.choice([3, 3, 4, 5]), repeticiones=rng.choice(['8', '10', '12', '10-12', '15']),
+                                    peso=rng.choice([None, '10kg', '20kg', 'peso corporal']), descanso='60 seg',
+                                    orden=(pos + 1) * ORDEN_GAP, created_at=now))
+                re_id += 1
+        n_rutinas = _bulk(db, Rutina, (
+            dict(id=rid, name=f'Rutina {n}', created_by_coach_id=rng.choice(coach_ids) if coach_ids else admin_id,
+                 is_active=rng.random() > 0.1, created_at=now - timedelta(days=rng.randrange(365)), updated_at=now)
+            for n, rid in enumerate(rutina_ids)
+        ))
+        n_re = _bulk(db, RutinaEjercicio, re_rows)
+        del re_rows
+        print(f"   rutinas: {n_rutinas} ({n_re} exercises)")
+
+        # --- Assignments: one active routine per member, some history ------
+        active_rutina = {}
+        assignment_rows = []
+        for uid in member_ids:
+            if not rutina_ids:
+                break
+            active = rng.choice(rutina_ids)
+            active_rutina[uid] = active
+            assignment_rows.append(dict(rutina_id=active, user_id=uid, is_active=True, assigned_at=now))
+            old = rng.choice(rutina_ids)
+            if old != active and rng.random() < 0.3:
+                assignment_rows.append(dict(rutina_id=old, user_id=uid, is_active=False,
+                                            assigned_at=now - timedelta(days=rng.randrange(30, 365))))
+        n_assign = _bulk(db, RutinaUser, assignment_rows)
+        del assignment_rows
+        print(f"   rutina_users: {n_assign}")
+
+        # --- Workout logs and the daily rollup -----------------------------
+        summaries = []
+        n_summaries = 0
+
+        def flush_summaries():
+            nonlocal n_summaries
+            if summaries:
+                db.execute(insert(WorkoutDaySummary), summaries)
+                n_summaries += len(summaries)
+                summaries.clear()
+
+        def log_rows():
+            remaining = sizes['logs']
+            per_user = sizes['logs'] / max(len(active_rutina), 1)
+            for uid, rid in active_rutina.items():
+                if remaining <= 0:
+                    break
+                re_ids = routine_exercises[rid]
+                per_day = (math.ceil(len(re_ids) / 2) + len(re_ids)) / 2  # mean of the randint below
+                workout_days = max(1, round(per_user / per_day * rng.uniform(0.5, 1.5)))
+                for offset in sorted(rng.sample(range(sizes['days']), min(workout_days, sizes['days']))):
+                    day = today - timedelta(days=offset)
+                    done = rng.sample(re_ids, rng.randint(math.ceil(len(re_ids) / 2), len(re_ids)))
+                    created = datetime.combine(day, datetime.min.time()) + timedelta(hours=rng.randint(7, 21))
+                    summaries.append(dict(user_id=uid, date=day, completed_count=len(done),
+                                          planned_count=len(re_ids), updated_at=created))
+                    if len(summaries) >= CHUNK:
+                        flush_summaries()  # committed with the next batch of logs
+                    for re in done:
+                        yield dict(user_id=uid, rutina_ejercicio_id=re, date=day, completed=True, created_at=created)
+                    remaining -= len(done)
+                    if remaining <= 0:
+                        break
+        n_logs = _bulk(db, WorkoutLog, log_rows())
+        flush_summaries()
+        db.commit()
+        print(f"   workout_logs: {n_logs} ({n_summaries} day summaries)")
+
+        # --- Audit log -----------------------------------------------------
+        actors = [admin_id] + coach_ids
+        n_audit = _bulk(db, AuditLog, (
+            dict(user_id=rng.choice(actors), action=rng.choice(AUDIT_ACTIONS), entity='user',
+                 entity_id=rng.choice(member_ids) if member_ids else None,
+                 created_at=now - timedelta(seconds=rng.randrange(sizes['days'] * 86400)))
+            for _ in range(sizes['audit'])
+        ))
+        print(f"   audit_logs: {n_audit}")
+
+        print(f"✅ Dataset ready in {time.perf_counter() - started:.1f}s (password: {BENCH_PASSWORD})")
+    except Exception as e:
+        print(f"❌ Error generating dataset: {e}")
+        db.rollback()
+        raise
+    finally:
+        db.close()
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Generate a synthetic UrbanMood dataset.')
+    parser.add_argument('--scale', type=float, default=1.0, help='multiply every default size')
+    parser.add_argument('--seed', type=int, default=42)
+    for name, value in DEFAULTS.items():
+        parser.add_argument(f'--{name}', type=int, default=None, help=f'default {value}')
+    args = parser.parse_args()
+    sizes = {}
+    for name, value in DEFAULTS.items():
+        # --days is a time window, not a row count, so it is not scaled
+        scaled = value if name == 'days' else max(1, int(value * args.scale))
+        sizes[name] = getattr(args, name) if getattr(args, name) is not None else scaled
+    print(f"🏋️  Generating dataset: {sizes}")
+    generate(sizes, seed=args.seed)
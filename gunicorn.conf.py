@@ -0,0 +1,28 @@
+"""Gunicorn settings picked up automatically from the working directory.
+
+Command-line flags (see render.yaml) still take precedence. The hooks below
+keep the Prometheus multiprocess directory (utils.metrics) consistent: it is
+emptied when the master starts, each worker reports its thread count, and the
+files of exited workers are dropped from the live gauges.
+"""
+import os
+import shutil
+
+multiproc_dir = os.getenv('PROMETHEUS_MULTIPROC_DIR')
+
+
+def on_starting(server):
+    if multiproc_dir:
+        shutil.rmtree(multiproc_dir, ignore_errors=True)
+        os.makedirs(multiproc_dir, exist_ok=True)
+
+
+def post_worker_init(worker):
+    from utils.metrics import WORKER_THREADS
+    WORKER_THREADS.set(worker.cfg.threads)
+
+
+def child_exit(server, worker):
+    if multiproc_dir:
+        from prometheus_client import multiprocess
+        multiprocess.mark_process_dead(worker.pid)
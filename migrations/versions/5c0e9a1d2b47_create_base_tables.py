@@ -0,0 +1,89 @@
+"""create base tables
+
+Revision ID: 5c0e9a1d2b47
+Revises: 
+Create Date: 2026-10-19 11:02:37.184529
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '5c0e9a1d2b47'
+down_revision: Union[str, Sequence[str], None] = None
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Tables that predate the migration history and only ever came from create_all.
+
+    Each one is created as it was before the first migration (73cdc770e5b9
+    adds the user profile columns, b7e4c1d92a3f the audit action index), so
+    `alembic upgrade head` can build an empty database. Existing databases
+    already have them and skip this.
+    """
+    tables = set(sa.inspect(op.get_bind()).get_table_names())
+
+    if 'users' not in tables:
+        op.create_table(
+            'users',
+            sa.Column('id', sa.Integer(), nullable=False),
+            sa.Column('email', sa.String(length=191), nullable=False),
+            sa.Column('password_hash', sa.String(length=255), nullable=True),
+            sa.Column('name', sa.String(length=120), nullable=False),
+            sa.Column('phone', sa.String(length=40), nullable=True),
+            sa.Column('role', sa.Enum('user', 'coach', 'admin', name='userrole'), nullable=False),
+            sa.Column('preferred_location_id', sa.Integer(), nullable=True),
+            sa.Column('is_active', sa.Boolean(), nullable=False),
+            sa.Column('created_by_user_id', sa.Integer(), nullable=True),
+            sa.Column('created_at', sa.DateTime(), nullable=False),
+            sa.Column('updated_at', sa.DateTime(), nullable=False),
+            sa.ForeignKeyConstraint(['created_by_user_id'], ['users.id'], ),
+            sa.PrimaryKeyConstraint('id')
+        )
+        op.create_index(op.f('ix_users_email'), 'users', ['email'], unique=True)
+        op.create_index(op.f('ix_users_role'), 'users', ['role'], unique=False)
+
+    if 'invitation_tokens' not in tables:
+        op.create_table(
+            'invitation_tokens',
+            sa.Column('id', sa.Integer(), nullable=False),
+            sa.Column('user_id', sa.Integer(), nullable=False),
+            sa.Column('token', sa.String(length=64), nullable=False),
+            sa.Column('purpose', sa.Enum('invite', 'reset', name='invitationpurpose'), nullable=False),
+            sa.Column('expires_at', sa.DateTime(), nullable=False),
+            sa.Column('used_at', sa.DateTime(), nullable=True),
+            sa.Column('created_at', sa.DateTime(), nullable=False),
+            sa.Column('invalidated', sa.Boolean(), nullable=False),
+            sa.ForeignKeyConstraint(['user_id'], ['users.id'], ),
+            sa.PrimaryKeyConstraint('id')
+        )
+        op.create_index(op.f('ix_invitation_tokens_user_id'), 'invitation_tokens', ['user_id'], unique=False)
+        op.create_index(op.f('ix_invitation_tokens_token'), 'invitation_tokens', ['token'], unique=True)
+
+    if 'audit_logs' not in tables:
+        op.create_table(
+            'audit_logs',
+            sa.Column('id', sa.Integer(), nullable=False),
+            sa.Column('user_id', sa.Integer(), nullable=True),
+            sa.Column('action', sa.String(length=64), nullable=False),
+            sa.Column('entity', sa.String(length=64), nullable=True),
+            sa.Column('entity_id', sa.Integer(), nullable=True),
+            sa.Column('meta', sa.Text(), nullable=True),
+            sa.Column('created_at', sa.DateTime(), nullable=False),
+            sa.ForeignKeyConstraint(['user_id'], ['users.id'], ),
+            sa.PrimaryKeyConstraint('id')
+        )
+        op.create_index(op.f('ix_audit_logs_user_id'), 'audit_logs', ['user_id'], unique=False)
+        op.create_index(op.f('ix_audit_logs_created_at'), 'audit_logs', ['created_at'], unique=False)
+
+
+def downgrade() -> None:
+    """Drop the base tables."""
+    op.drop_table('audit_logs')
+    op.drop_table('invitation_tokens')
+    op.drop_table('users')
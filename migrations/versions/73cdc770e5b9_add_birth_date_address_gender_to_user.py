@@ -1,7 +1,7 @@
 """add birth_date address gender to user
 
 Revision ID: 73cdc770e5b9
-Revises: 
+Revises: 5c0e9a1d2b47
 Create Date: 2025-09-15 02:40:27.970760
 
 """
@@ -13,7 +13,7 @@ import sqlalchemy as sa
 
 # revision identifiers, used by Alembic.
 revision: str = '73cdc770e5b9'
-down_revision: Union[str, Sequence[str], None] = None  # This is the first migration; if prior manual tables existed adjust accordingly.
+down_revision: Union[str, Sequence[str], None] = '5c0e9a1d2b47'  # base tables created before the migration history
 branch_labels: Union[str, Sequence[str], None] = None
 depends_on: Union[str, Sequence[str], None] = None
 
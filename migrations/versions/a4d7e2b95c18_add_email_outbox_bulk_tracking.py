@@ -0,0 +1,53 @@
+"""add email_outbox bulk tracking
+
+Revision ID: a4d7e2b95c18
+Revises: f1a9c2d47e30
+Create Date: 2026-10-19 09:14:52.630417
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'a4d7e2b95c18'
+down_revision: Union[str, Sequence[str], None] = 'f1a9c2d47e30'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+OLD_STATUSES = ('pending', 'sending', 'sent', 'failed')
+NEW_STATUSES = ('pending', 'sending', 'accepted', 'sent', 'failed')
+
+
+def upgrade() -> None:
+    """Mark bulk-import rows, keep their MailerSend bulk id and add the 'accepted' status.
+
+    Columns that app startup (DB_AUTO_CREATE) already created are skipped.
+    """
+    columns = {col['name'] for col in sa.inspect(op.get_bind()).get_columns('email_outbox')}
+    if 'bulk' not in columns:
+        op.add_column('email_outbox', sa.Column('bulk', sa.Boolean(), nullable=False, server_default=sa.false()))
+    if 'bulk_email_id' not in columns:
+        op.add_column('email_outbox', sa.Column('bulk_email_id', sa.String(length=64), nullable=True))
+    dialect = op.get_bind().dialect.name
+    if dialect == 'postgresql':
+        op.execute("ALTER TYPE emailstatus ADD VALUE IF NOT EXISTS 'accepted'")
+    elif dialect == 'mysql':
+        op.alter_column('email_outbox', 'status', existing_nullable=False,
+                        existing_type=sa.Enum(*OLD_STATUSES, name='emailstatus'),
+                        type_=sa.Enum(*NEW_STATUSES, name='emailstatus'))
+    # SQLite stores the enum as plain VARCHAR, nothing to change
+
+
+def downgrade() -> None:
+    """Drop bulk tracking; rows still awaiting a bulk status go back to pending."""
+    op.execute("UPDATE email_outbox SET status = 'pending' WHERE status = 'accepted'")
+    if op.get_bind().dialect.name == 'mysql':
+        op.alter_column('email_outbox', 'status', existing_nullable=False,
+                        existing_type=sa.Enum(*NEW_STATUSES, name='emailstatus'),
+                        type_=sa.Enum(*OLD_STATUSES, name='emailstatus'))
+    with op.batch_alter_table('email_outbox') as batch_op:
+        batch_op.drop_column('bulk_email_id')
+        batch_op.drop_column('bulk')
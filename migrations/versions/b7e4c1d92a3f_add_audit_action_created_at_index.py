@@ -0,0 +1,37 @@
+"""add audit_logs (action, created_at) index
+
+Revision ID: b7e4c1d92a3f
+Revises: 96266e33248b
+Create Date: 2026-10-18 10:12:04.118532
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'b7e4c1d92a3f'
+down_revision: Union[str, Sequence[str], None] = '96266e33248b'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Composite index so the audit action filter + keyset ordering stays index-only.
+
+    audit_logs was created via create_all, which already builds the index on
+    fresh databases, so skip it if present (or if there is no audit table yet).
+    """
+    inspector = sa.inspect(op.get_bind())
+    if 'audit_logs' not in inspector.get_table_names():
+        return
+    existing = {ix['name'] for ix in inspector.get_indexes('audit_logs')}
+    if 'ix_audit_logs_action_created_at' not in existing:
+        op.create_index('ix_audit_logs_action_created_at', 'audit_logs', ['action', 'created_at'])
+
+
+def downgrade() -> None:
+    """Drop the composite audit index."""
+    op.drop_index('ix_audit_logs_action_created_at', table_name='audit_logs')
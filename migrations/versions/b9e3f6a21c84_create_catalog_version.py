@@ -0,0 +1,39 @@
+"""create catalog_version counter
+
+Revision ID: b9e3f6a21c84
+Revises: a4d7e2b95c18
+Create Date: 2026-10-19 12:41:08.503216
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'b9e3f6a21c84'
+down_revision: Union[str, Sequence[str], None] = 'a4d7e2b95c18'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Single-row counter bumped by every exercise catalog write.
+
+    Skipped when app startup (DB_AUTO_CREATE) already built the table.
+    """
+    if 'catalog_version' in sa.inspect(op.get_bind()).get_table_names():
+        return
+    table = op.create_table(
+        'catalog_version',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('version', sa.Integer(), nullable=False),
+        sa.PrimaryKeyConstraint('id')
+    )
+    op.bulk_insert(table, [{'id': 1, 'version': 0}])
+
+
+def downgrade() -> None:
+    """Drop the counter."""
+    op.drop_table('catalog_version')
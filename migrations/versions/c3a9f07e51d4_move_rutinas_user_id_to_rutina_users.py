@@ -0,0 +1,117 @@
+"""move rutinas.user_id assignments to rutina_users
+
+Revision ID: c3a9f07e51d4
+Revises: b7e4c1d92a3f
+Create Date: 2026-10-18 11:03:47.520914
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'c3a9f07e51d4'
+down_revision: Union[str, Sequence[str], None] = 'b7e4c1d92a3f'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Create the tables previously built by create_all on app import and move assignments.
+
+    Routines used to belong to a single user (rutinas.user_id). Assignments now
+    live in rutina_users; copy any that are missing there and drop the old
+    column. Safe to run on databases where app startup already did part of it.
+    """
+    bind = op.get_bind()
+    inspector = sa.inspect(bind)
+    tables = set(inspector.get_table_names())
+
+    if 'rutina_users' not in tables:
+        op.create_table(
+            'rutina_users',
+            sa.Column('id', sa.Integer(), nullable=False),
+            sa.Column('rutina_id', sa.Integer(), nullable=False),
+            sa.Column('user_id', sa.Integer(), nullable=False),
+            sa.Column('is_active', sa.Boolean(), nullable=False, server_default='1'),
+            sa.Column('assigned_at', sa.DateTime(), nullable=True),
+            sa.ForeignKeyConstraint(['rutina_id'], ['rutinas.id'], ),
+            sa.ForeignKeyConstraint(['user_id'], ['users.id'], ),
+            sa.PrimaryKeyConstraint('id'),
+            sa.UniqueConstraint('rutina_id', 'user_id')
+        )
+        op.create_index(op.f('ix_rutina_users_rutina_id'), 'rutina_users', ['rutina_id'], unique=False)
+        op.create_index(op.f('ix_rutina_users_user_id'), 'rutina_users', ['user_id'], unique=False)
+
+    if 'workout_logs' not in tables:
+        op.create_table(
+            'workout_logs',
+            sa.Column('id', sa.Integer(), nullable=False),
+            sa.Column('user_id', sa.Integer(), nullable=False),
+            sa.Column('rutina_ejercicio_id', sa.Integer(), nullable=False),
+            sa.Column('date', sa.Date(), nullable=False),
+            sa.Column('completed', sa.Boolean(), nullable=False, server_default='1'),
+            sa.Column('created_at', sa.DateTime(), nullable=True),
+            sa.ForeignKeyConstraint(['user_id'], ['users.id'], ),
+            sa.ForeignKeyConstraint(['rutina_ejercicio_id'], ['rutina_ejercicios.id'], ),
+            sa.PrimaryKeyConstraint('id'),
+            sa.UniqueConstraint('user_id', 'rutina_ejercicio_id', 'date', name='uq_workout_log')
+        )
+        op.create_index(op.f('ix_workout_logs_user_id'), 'workout_logs', ['user_id'], unique=False)
+        op.create_index(op.f('ix_workout_logs_rutina_ejercicio_id'), 'workout_logs', ['rutina_ejercicio_id'], unique=False)
+        op.create_index(op.f('ix_workout_logs_date'), 'workout_logs', ['date'], unique=False)
+
+    if 'sucursales' not in tables:
+        op.create_table(
+            'sucursales',
+            sa.Column('id', sa.Integer(), nullable=False),
+            sa.Column('name', sa.String(length=120), nullable=False),
+            sa.Column('address', sa.String(length=255), nullable=True),
+            sa.Column('phone', sa.String(length=40), nullable=True),
+            sa.Column('is_active', sa.Boolean(), nullable=False, server_default='1'),
+            sa.Column('created_at', sa.DateTime(), nullable=False, server_default=sa.text('CURRENT_TIMESTAMP')),
+            sa.PrimaryKeyConstraint('id'),
+            sa.UniqueConstraint('name')
+        )
+
+    columns = {col['name'] for col in inspector.get_columns('rutinas')}
+    if 'user_id' not in columns:
+        return
+
+    # Copy assignments that don't already exist in rutina_users (single statement)
+    op.execute("""
+        INSERT INTO rutina_users (rutina_id, user_id, is_active, assigned_at)
+        SELECT r.id, r.user_id, 1, r.created_at
+        FROM rutinas r
+        WHERE r.user_id IS NOT NULL
+          AND NOT EXISTS (
+              SELECT 1 FROM rutina_users ru
+              WHERE ru.rutina_id = r.id AND ru.user_id = r.user_id
+          )
+    """)
+
+    indexes = {ix['name'] for ix in inspector.get_indexes('rutinas')}
+    with op.batch_alter_table('rutinas') as batch_op:
+        if 'ix_rutinas_user_id' in indexes:
+            batch_op.drop_index('ix_rutinas_user_id')
+        for fk in inspector.get_foreign_keys('rutinas'):
+            if fk['constrained_columns'] == ['user_id'] and fk.get('name'):
+                batch_op.drop_constraint(fk['name'], type_='foreignkey')
+        batch_op.drop_column('user_id')
+
+
+def downgrade() -> None:
+    """Restore rutinas.user_id from the first assignment of each routine.
+
+    The new tables are left in place since the application depends on them.
+    """
+    with op.batch_alter_table('rutinas') as batch_op:
+        batch_op.add_column(sa.Column('user_id', sa.Integer(), nullable=True))
+        batch_op.create_index('ix_rutinas_user_id', ['user_id'], unique=False)
+    op.execute("""
+        UPDATE rutinas SET user_id = (
+            SELECT MIN(ru.user_id) FROM rutina_users ru WHERE ru.rutina_id = rutinas.id
+        )
+    """)
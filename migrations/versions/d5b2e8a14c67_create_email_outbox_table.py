@@ -0,0 +1,55 @@
+"""create email_outbox table
+
+Revision ID: d5b2e8a14c67
+Revises: c3a9f07e51d4
+Create Date: 2026-10-18 12:41:09.336102
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'd5b2e8a14c67'
+down_revision: Union[str, Sequence[str], None] = 'c3a9f07e51d4'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Persistent outbox for the background email worker.
+
+    Skipped when app startup (DB_AUTO_CREATE) already built the table.
+    """
+    if 'email_outbox' in sa.inspect(op.get_bind()).get_table_names():
+        return
+    op.create_table(
+        'email_outbox',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('to_email', sa.String(length=191), nullable=False),
+        sa.Column('to_name', sa.String(length=120), nullable=True),
+        sa.Column('from_name', sa.String(length=120), nullable=True),
+        sa.Column('reply_to_email', sa.String(length=191), nullable=True),
+        sa.Column('reply_to_name', sa.String(length=120), nullable=True),
+        sa.Column('subject', sa.String(length=255), nullable=False),
+        sa.Column('html', sa.Text(), nullable=False),
+        sa.Column('kind', sa.String(length=40), nullable=True),
+        sa.Column('status', sa.Enum('pending', 'sending', 'sent', 'failed', name='emailstatus'), nullable=False),
+        sa.Column('attempts', sa.Integer(), nullable=False, server_default='0'),
+        sa.Column('next_attempt_at', sa.DateTime(), nullable=False, server_default=sa.text('CURRENT_TIMESTAMP')),
+        sa.Column('locked_at', sa.DateTime(), nullable=True),
+        sa.Column('last_error', sa.Text(), nullable=True),
+        sa.Column('created_at', sa.DateTime(), nullable=False, server_default=sa.text('CURRENT_TIMESTAMP')),
+        sa.Column('sent_at', sa.DateTime(), nullable=True),
+        sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index('ix_email_outbox_status_next_attempt', 'email_outbox', ['status', 'next_attempt_at'], unique=False)
+
+
+def downgrade() -> None:
+    """Drop the email outbox."""
+    op.drop_index('ix_email_outbox_status_next_attempt', table_name='email_outbox')
+    op.drop_table('email_outbox')
+    op.execute('DROP TYPE IF EXISTS emailstatus')
@@ -0,0 +1,42 @@
+"""create workout_day_summary rollup
+
+Revision ID: e8c61f3a07b9
+Revises: d5b2e8a14c67
+Create Date: 2026-10-18 14:20:51.774018
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'e8c61f3a07b9'
+down_revision: Union[str, Sequence[str], None] = 'd5b2e8a14c67'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Daily per-user completion rollup. Fill it with `python backfill_workout_summary.py`.
+
+    Skipped when app startup (DB_AUTO_CREATE) already built the table.
+    """
+    if 'workout_day_summary' in sa.inspect(op.get_bind()).get_table_names():
+        return
+    op.create_table(
+        'workout_day_summary',
+        sa.Column('user_id', sa.Integer(), nullable=False),
+        sa.Column('date', sa.Date(), nullable=False),
+        sa.Column('completed_count', sa.Integer(), nullable=False, server_default='0'),
+        sa.Column('planned_count', sa.Integer(), nullable=False, server_default='0'),
+        sa.Column('updated_at', sa.DateTime(), nullable=False, server_default=sa.text('CURRENT_TIMESTAMP')),
+        sa.ForeignKeyConstraint(['user_id'], ['users.id'], ),
+        sa.PrimaryKeyConstraint('user_id', 'date')
+    )
+
+
+def downgrade() -> None:
+    """Drop the rollup table."""
+    op.drop_table('workout_day_summary')
@@ -0,0 +1,74 @@
+"""add ejercicios.search_key with full-text index
+
+Revision ID: f1a9c2d47e30
+Revises: e8c61f3a07b9
+Create Date: 2026-10-18 16:05:12.408113
+
+"""
+import re
+import unicodedata
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'f1a9c2d47e30'
+down_revision: Union[str, Sequence[str], None] = 'e8c61f3a07b9'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+SQLITE_FTS = [
+    "CREATE VIRTUAL TABLE ejercicios_fts USING fts5("
+    "search_key, content='ejercicios', content_rowid='id', prefix='2 3')",
+    "CREATE TRIGGER ejercicios_fts_ai AFTER INSERT ON ejercicios BEGIN "
+    "INSERT INTO ejercicios_fts(rowid, search_key) VALUES (new.id, new.search_key); END",
+    "CREATE TRIGGER ejercicios_fts_ad AFTER DELETE ON ejercicios BEGIN "
+    "INSERT INTO ejercicios_fts(ejercicios_fts, rowid, search_key) VALUES ('delete', old.id, old.search_key); END",
+    "CREATE TRIGGER ejercicios_fts_au AFTER UPDATE OF search_key ON ejercicios BEGIN "
+    "INSERT INTO ejercicios_fts(ejercicios_fts, rowid, search_key) VALUES ('delete', old.id, old.search_key); "
+    "INSERT INTO ejercicios_fts(rowid, search_key) VALUES (new.id, new.search_key); END",
+    "INSERT INTO ejercicios_fts(ejercicios_fts) VALUES ('rebuild')",
+]
+
+
+def _fold(text):
+    # Frozen copy of utils.text.fold_text at the time of this migration
+    text = unicodedata.normalize('NFKD', (text or '').lower())
+    text = ''.join(c for c in text if not unicodedata.combining(c))
+    return re.sub(r'[^a-z0-9]+', ' ', text).strip()
+
+
+def upgrade() -> None:
+    """Add the accent-folded search key, backfill it and build the full-text index."""
+    op.add_column('ejercicios', sa.Column('search_key', sa.String(length=255), nullable=False, server_default=''))
+    conn = op.get_bind()
+    rows = conn.execute(sa.text("SELECT id, name FROM ejercicios")).fetchall()
+    if rows:
+        conn.execute(
+            sa.text("UPDATE ejercicios SET search_key = :key WHERE id = :id"),
+            [{'id': row.id, 'key': _fold(row.name)} for row in rows]
+        )
+    op.create_index(op.f('ix_ejercicios_search_key'), 'ejercicios', ['search_key'], unique=False)
+
+    dialect = conn.dialect.name
+    if dialect == 'sqlite':
+        for statement in SQLITE_FTS:
+            op.execute(statement)
+    elif dialect == 'mysql':
+        op.execute("ALTER TABLE ejercicios ADD FULLTEXT INDEX ft_ejercicios_search_key (search_key)")
+
+
+def downgrade() -> None:
+    """Drop the full-text index and the search key column."""
+    dialect = op.get_bind().dialect.name
+    if dialect == 'sqlite':
+        for trigger in ('ejercicios_fts_ai', 'ejercicios_fts_ad', 'ejercicios_fts_au'):
+            op.execute(f"DROP TRIGGER IF EXISTS {trigger}")
+        op.execute("DROP TABLE IF EXISTS ejercicios_fts")
+    elif dialect == 'mysql':
+        op.drop_index('ft_ejercicios_search_key', table_name='ejercicios')
+    op.drop_index(op.f('ix_ejercicios_search_key'), table_name='ejercicios')
+    with op.batch_alter_table('ejercicios') as batch_op:
+        batch_op.drop_column('search_key')
@@ -8,3 +8,6 @@ from .rutina_ejercicio import RutinaEjercicio
 from .rutina_user import RutinaUser
 from .workout_log import WorkoutLog
 from .sucursal import Sucursal
+from .email_outbox import EmailOutbox, EmailStatus
+from .workout_day_summary import WorkoutDaySummary
+from .catalog_version import CatalogVersion
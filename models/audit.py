@@ -1,5 +1,5 @@
 from datetime import datetime
-from sqlalchemy import Column, Integer, String, DateTime, Text, ForeignKey
+from sqlalchemy import Column, Integer, String, DateTime, Text, ForeignKey, Index
 from sqlalchemy.orm import relationship
 from db import Base
 
@@ -14,3 +14,8 @@ class AuditLog(Base):
     created_at = Column(DateTime, default=datetime.utcnow, nullable=False, index=True)
 
     user = relationship('User', backref='audit_logs')
+
+    __table_args__ = (
+        # Keeps the action filter + created_at ordering of /admin/audit index-only
+        Index('ix_audit_logs_action_created_at', 'action', 'created_at'),
+    )
@@ -0,0 +1,46 @@
+from itertools import chain
+from sqlalchemy import Column, Integer, event, insert, update
+from sqlalchemy.orm import Session
+from db import Base
+from .ejercicio import Ejercicio
+
+
+class CatalogVersion(Base):
+    """
+    Contador de versión del catálogo de ejercicios (una sola fila, id=1).
+    Se incrementa en la misma transacción que cada escritura sobre ejercicios;
+    utils/catalog_cache.py lo usa como versión de sus respuestas cacheadas.
+    """
+    __tablename__ = 'catalog_version'
+
+    id = Column(Integer, primary_key=True)
+    version = Column(Integer, nullable=False, default=0)
+
+    def __repr__(self):
+        return f"<CatalogVersion {self.version}>"
+
+
+def bump_catalog_version(conn):
+    """Incrementa el contador sobre ``conn``, dentro de la transacción en curso."""
+    table = CatalogVersion.__table__
+    result = conn.execute(update(table).where(table.c.id == 1).values(version=table.c.version + 1))
+    if result.rowcount == 0:
+        # Fila ausente (create_all sin la migración, o base de tests vaciada)
+        conn.execute(insert(table).values(id=1, version=1))
+
+
+# Registrado junto al modelo para que también los scripts (seed, assign_exercise_images)
+# incrementen la versión; 'catalog_dirty' avisa a utils/catalog_cache.py al hacer commit.
+@event.listens_for(Session, 'after_flush')
+def _bump_on_flush(session, flush_context):
+    if any(isinstance(obj, Ejercicio) for obj in chain(session.new, session.dirty, session.deleted)):
+        bump_catalog_version(session.connection())
+        session.info['catalog_dirty'] = True
+
+
+@event.listens_for(Session, 'do_orm_execute')
+def _bump_on_bulk_write(state):
+    if (state.is_insert or state.is_update or state.is_delete) and \
+            state.bind_mapper is not None and state.bind_mapper.class_ is Ejercicio:
+        bump_catalog_version(state.session.connection())
+        state.session.info['catalog_dirty'] = True
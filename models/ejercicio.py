@@ -1,7 +1,10 @@
 from datetime import datetime
 import enum
-from sqlalchemy import Column, Integer, String, DateTime, Boolean, Enum, Text
+from sqlalchemy import Column, Integer, String, DateTime, Boolean, Enum, Text, DDL, event
+from sqlalchemy.orm import validates
 from db import Base
+from utils.images import image_srcset
+from utils.text import fold_text
 
 class BodySection(enum.Enum):
     """Secciones corporales para categorizar ejercicios (matching gym paper forms)"""
@@ -26,6 +29,10 @@ class ExerciseType(enum.Enum):
     hiit = 'hiit'
     core = 'core'
 
+def _default_search_key(context):
+    # Also covers Core/bulk inserts that bypass the ORM validator
+    return fold_text(context.get_current_parameters().get('name'))
+
 class Ejercicio(Base):
     """
     Catálogo de ejercicios disponibles.
@@ -35,6 +42,7 @@ class Ejercicio(Base):
     
     id = Column(Integer, primary_key=True)
     name = Column(String(120), nullable=False, unique=True, index=True)
+    search_key = Column(String(255), nullable=False, default=_default_search_key, index=True)  # nombre sin acentos para búsqueda
     description = Column(Text, nullable=True)  # instrucciones del ejercicio
     image_url = Column(String(255), nullable=True)  # ruta a imagen del ejercicio
     body_section = Column(Enum(BodySection), nullable=False, index=True)
@@ -43,6 +51,11 @@ class Ejercicio(Base):
     created_at = Column(DateTime, default=datetime.utcnow, nullable=False)
     updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow, nullable=False)
 
+    @validates('name')
+    def _sync_search_key(self, key, value):
+        self.search_key = fold_text(value)
+        return value
+
     def __repr__(self):
         return f"<Ejercicio {self.name} ({self.body_section.value})>"
 
@@ -52,7 +65,33 @@ class Ejercicio(Base):
             'name': self.name,
             'description': self.description,
             'image_url': self.image_url,
+            'image_srcset': image_srcset(self.image_url),
             'body_section': self.body_section.value,
             'exercise_type': self.exercise_type.value,
             'is_active': self.is_active
         }
+
+
+# Índice de texto completo sobre search_key (ver utils/exercise_search.py).
+# SQLite: tabla FTS5 externa sincronizada por triggers; MySQL: índice FULLTEXT.
+SEARCH_INDEX_DDL = {
+    'sqlite': [
+        "CREATE VIRTUAL TABLE ejercicios_fts USING fts5("
+        "search_key, content='ejercicios', content_rowid='id', prefix='2 3')",
+        "CREATE TRIGGER ejercicios_fts_ai AFTER INSERT ON ejercicios BEGIN "
+        "INSERT INTO ejercicios_fts(rowid, search_key) VALUES (new.id, new.search_key); END",
+        "CREATE TRIGGER ejercicios_fts_ad AFTER DELETE ON ejercicios BEGIN "
+        "INSERT INTO ejercicios_fts(ejercicios_fts, rowid, search_key) VALUES ('delete', old.id, old.search_key); END",
+        "CREATE TRIGGER ejercicios_fts_au AFTER UPDATE OF search_key ON ejercicios BEGIN "
+        "INSERT INTO ejercicios_fts(ejercicios_fts, rowid, search_key) VALUES ('delete', old.id, old.search_key); "
+        "INSERT INTO ejercicios_fts(rowid, search_key) VALUES (new.id, new.search_key); END",
+    ],
+    'mysql': [
+        "ALTER TABLE ejercicios ADD FULLTEXT INDEX ft_ejercicios_search_key (search_key)",
+    ],
+}
+
+for _dialect, _statements in SEARCH_INDEX_DDL.items():
+    for _statement in _statements:
+        event.listen(Ejercicio.__table__, 'after_create', DDL(_statement).execute_if(dialect=_dialect))
+event.listen(Ejercicio.__table__, 'before_drop', DDL("DROP TABLE IF EXISTS ejercicios_fts").execute_if(dialect='sqlite'))
@@ -0,0 +1,45 @@
+from datetime import datetime
+import enum
+from sqlalchemy import Column, Integer, String, DateTime, Text, Enum, Index, Boolean
+from db import Base
+
+class EmailStatus(enum.Enum):
+    pending = 'pending'
+    sending = 'sending'
+    accepted = 'accepted'  # taken by MailerSend's bulk endpoint, delivery status not known yet
+    sent = 'sent'
+    failed = 'failed'
+
+class EmailOutbox(Base):
+    """
+    Cola persistente de emails salientes.
+    Las requests solo insertan filas; un worker en segundo plano las envía con reintentos.
+    """
+    __tablename__ = 'email_outbox'
+
+    id = Column(Integer, primary_key=True)
+    to_email = Column(String(191), nullable=False)
+    to_name = Column(String(120))
+    from_name = Column(String(120))  # defaults to config.MAIL_FROM_NAME
+    reply_to_email = Column(String(191))
+    reply_to_name = Column(String(120))
+    subject = Column(String(255), nullable=False)
+    html = Column(Text, nullable=False)
+    kind = Column(String(40))  # invite / reset / contact (for logs and metrics)
+    bulk = Column(Boolean, nullable=False, default=False)  # bulk invitation import: may go out via /bulk-email
+    bulk_email_id = Column(String(64))  # MailerSend bulk request this row went out in
+    status = Column(Enum(EmailStatus), nullable=False, default=EmailStatus.pending)
+    attempts = Column(Integer, nullable=False, default=0)
+    next_attempt_at = Column(DateTime, nullable=False, default=datetime.utcnow)
+    locked_at = Column(DateTime)
+    last_error = Column(Text)
+    created_at = Column(DateTime, default=datetime.utcnow, nullable=False)
+    sent_at = Column(DateTime)
+
+    __table_args__ = (
+        # Worker poll: due pending rows in order
+        Index('ix_email_outbox_status_next_attempt', 'status', 'next_attempt_at'),
+    )
+
+    def __repr__(self):
+        return f"<EmailOutbox {self.id} {self.kind} -> {self.to_email} ({self.status.value})>"
@@ -30,7 +30,7 @@ class Rutina(Base):
 
     # Relationships
     coach = relationship('User', foreign_keys=[created_by_coach_id], backref='rutinas_creadas')
-    ejercicios = relationship('RutinaEjercicio', back_populates='rutina', cascade='all, delete-orphan', order_by='RutinaEjercicio.orden')
+    ejercicios = relationship('RutinaEjercicio', back_populates='rutina', cascade='all, delete-orphan', order_by='[RutinaEjercicio.orden, RutinaEjercicio.id]')
     assigned_users = relationship('RutinaUser', back_populates='rutina', cascade='all, delete-orphan')
 
     def __repr__(self):
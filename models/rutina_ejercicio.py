@@ -2,6 +2,7 @@ from datetime import datetime
 from sqlalchemy import Column, Integer, String, DateTime, ForeignKey, Text
 from sqlalchemy.orm import relationship
 from db import Base
+from utils.images import image_srcset
 
 class RutinaEjercicio(Base):
     """
@@ -40,6 +41,7 @@ class RutinaEjercicio(Base):
             'ejercicio_id': self.ejercicio_id,
             'ejercicio_name': self.ejercicio.name if self.ejercicio else None,
             'ejercicio_image_url': self.ejercicio.image_url if self.ejercicio else None,
+            'ejercicio_image_srcset': image_srcset(self.ejercicio.image_url) if self.ejercicio else '',
             'ejercicio_body_section': self.ejercicio.body_section.value if self.ejercicio else None,
             'series': self.series,
             'repeticiones': self.repeticiones,
@@ -0,0 +1,21 @@
+from datetime import datetime
+from sqlalchemy import Column, Integer, Date, DateTime, ForeignKey
+from db import Base
+
+
+class WorkoutDaySummary(Base):
+    """
+    Resumen diario por usuario (ejercicios completados / planificados).
+    Se actualiza en la misma transacción que cada toggle; planned_count es
+    una foto de la rutina activa ese día.
+    """
+    __tablename__ = 'workout_day_summary'
+
+    user_id = Column(Integer, ForeignKey('users.id'), primary_key=True)
+    date = Column(Date, primary_key=True)
+    completed_count = Column(Integer, nullable=False, default=0)
+    planned_count = Column(Integer, nullable=False, default=0)
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow, nullable=False)
+
+    def __repr__(self):
+        return f"<WorkoutDaySummary user={self.user_id} date={self.date} {self.completed_count}/{self.planned_count}>"
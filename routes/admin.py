@@ -1,8 +1,18 @@
 from flask import Blueprint, request, jsonify, render_template, redirect, send_from_directory
 from db import SessionLocal
 from models import User, UserRole, InvitationToken, InvitationPurpose, Clase, Rutina, Ejercicio, RutinaEjercicio, BodySection, Sucursal, RutinaUser
-from routes.auth import send_invitation_email
-from utils.audit import log_action
+from routes.auth import enqueue_invitation_email
+from utils.audit import log_action, encode_cursor, decode_cursor, older_than, newer_than, cached_count, cached_actions
+from utils.coach_stats import get_coach_stats, EMPTY_STATS
+from utils.user_import import parse_rows, import_users, UserImportError
+from utils.images import image_srcset
+from utils.exercise_search import search_ejercicios, search_query, MAX_LIMIT as MAX_SEARCH_LIMIT
+from utils.catalog_cache import cached_catalog_response
+from utils.ordering import next_orden, routine_order, renumber, move
+from utils.workouts import delete_logs_for
+from utils import slow_queries
+from utils.query_budget import query_budget
+from config import config
 from datetime import datetime
 import secrets
 import os
@@ -10,6 +20,15 @@ import os
 admin_bp = Blueprint('admin', __name__)
 
 
+def ejercicio_counts(db, rutina_ids):
+    """``{rutina_id: number of exercises}`` in one GROUP BY query."""
+    if not rutina_ids:
+        return {}
+    from sqlalchemy import func
+    return dict(db.query(RutinaEjercicio.rutina_id, func.count(RutinaEjercicio.id)).filter(
+        RutinaEjercicio.rutina_id.in_(rutina_ids)
+    ).group_by(RutinaEjercicio.rutina_id).all())
+
 def deactivate_user_routines(db, user_id):
     """Deactivate all active routine assignments for a user."""
     db.query(RutinaUser).filter(
@@ -39,6 +58,7 @@ def require_coach_or_admin(f):
 
 @admin_bp.route('/admin/users', methods=['GET'])
 @require_admin
+@query_budget(1)
 def list_users():
     with SessionLocal() as db:
         users = db.query(User).order_by(User.created_at.desc()).all()
@@ -64,10 +84,30 @@ def create_user():
         invite = InvitationToken(user_id=user.id, token=token, purpose=InvitationPurpose.invite, expires_at=InvitationToken.new_expiry())
         db.add(invite)
         log_action(db, 'create_user', 'user', user.id, {'email': email})
+        enqueue_invitation_email(db, email, token)
         db.commit()
-        send_invitation_email(email, token)
         return jsonify({"success": True, "user_id": user.id})
 
+@admin_bp.route('/admin/users/import', methods=['POST'])
+@require_admin
+def import_users_route():
+    """Bulk-create users from CSV (file upload or text/csv body) or JSON.
+
+    Columns: email (required), name, role, phone. Each created user gets an
+    invitation token and a queued invitation email. Returns a per-row report.
+    """
+    try:
+        rows = parse_rows(request)
+    except UserImportError as e:
+        return jsonify({"success": False, "message": str(e)}), 400
+    send_invites = request.args.get('invite', '1') != '0'
+    with SessionLocal() as db:
+        try:
+            report, summary = import_users(db, rows, created_by_user_id=session.get('uid'), send_invites=send_invites)
+        except UserImportError as e:
+            return jsonify({"success": False, "message": str(e)}), 400
+        return jsonify({"success": True, "summary": summary, "rows": report})
+
 @admin_bp.route('/admin/users/<int:user_id>/update', methods=['PATCH'])
 @require_admin
 def update_user(user_id):
@@ -128,9 +168,10 @@ def delete_user(user_id):
             if admin_count == 1:
                 return jsonify({"success": False, "message": "No se puede eliminar el último admin"}), 400
         # Clean up all related records
-        from models import WorkoutLog, AuditLog, InvitationToken
+        from models import WorkoutLog, WorkoutDaySummary, AuditLog, InvitationToken
         db.query(RutinaUser).filter(RutinaUser.user_id == user_id).delete()
         db.query(WorkoutLog).filter(WorkoutLog.user_id == user_id).delete()
+        db.query(WorkoutDaySummary).filter(WorkoutDaySummary.user_id == user_id).delete()
         db.query(InvitationToken).filter(InvitationToken.user_id == user_id).delete()
         db.query(AuditLog).filter(AuditLog.user_id == user_id).update({'user_id': None})
         # Unassign routines created by this user (if coach)
@@ -144,6 +185,7 @@ def delete_user(user_id):
 
 @admin_bp.route('/admin/users/<int:user_id>', methods=['GET'])
 @require_admin
+@query_budget(5)
 def user_detail(user_id):
     with SessionLocal() as db:
         user = db.query(User).filter(User.id==user_id).first()
@@ -157,8 +199,12 @@ def user_detail(user_id):
         ).first()
         # All available routines for the dropdown
         rutinas = db.query(Rutina).filter(Rutina.is_active == True).order_by(Rutina.name).all()
+        rutina_ids = [r.id for r in rutinas]
+        if active_assignment:
+            rutina_ids.append(active_assignment.rutina_id)
         return render_template('admin_user_detail.html', user=user, sucursales=sucursales,
-                               active_assignment=active_assignment, rutinas=rutinas)
+                               active_assignment=active_assignment, rutinas=rutinas,
+                               ejercicio_counts=ejercicio_counts(db, rutina_ids))
 
 @admin_bp.route('/admin/users/<int:user_id>/assign-rutina', methods=['PATCH'])
 @require_admin
@@ -349,24 +395,20 @@ def delete_sucursal(sucursal_id):
 
 @admin_bp.route('/admin/entrenadores', methods=['GET'])
 @require_admin
+@query_budget(3)
 def admin_entrenadores():
     with SessionLocal() as db:
         coaches = db.query(User).filter(User.role == UserRole.coach).order_by(User.name).all()
-        # Annotate each coach with stats
+        # Annotate each coach with stats (single grouped query for all coaches)
+        stats = get_coach_stats(db, [c.id for c in coaches])
         coach_data = []
         for coach in coaches:
-            rutinas_count = db.query(Rutina).filter(Rutina.created_by_coach_id == coach.id).count()
-            users_count = db.query(RutinaUser.user_id).join(Rutina).filter(
-                Rutina.created_by_coach_id == coach.id,
-                RutinaUser.is_active == True
-            ).distinct().count()
-            coach.rutinas_count = rutinas_count
-            coach.users_count = users_count
+            coach_stats = stats.get(coach.id, EMPTY_STATS)
+            coach.rutinas_count = coach_stats['rutinas_count']
+            coach.users_count = coach_stats['users_count']
             coach_data.append(coach)
 
-        total_rutinas = db.query(Rutina).filter(
-            Rutina.created_by_coach_id.in_([c.id for c in coaches])
-        ).count() if coaches else 0
+        total_rutinas = sum(c.rutinas_count for c in coach_data)
 
         regular_users = db.query(User).filter(User.role == UserRole.user, User.is_active == True).order_by(User.name).all()
 
@@ -412,52 +454,101 @@ def demote_from_coach(user_id):
 
 @admin_bp.route('/admin/audit', methods=['GET'])
 @require_admin
+@query_budget(3)
 def admin_audit():
+    """Audit log with keyset pagination on (created_at, id).
+
+    ``before`` pages towards older entries, ``after`` towards newer ones.
+    """
     from models.audit import AuditLog
-    page = request.args.get('page', 1, type=int)
+    from sqlalchemy.orm import joinedload
     action_filter = request.args.get('action', '').strip()
-    per_page = 50
+    before = decode_cursor(request.args.get('before'))
+    after = decode_cursor(request.args.get('after')) if not before else None
+    per_page = config.AUDIT_PAGE_SIZE
 
     with SessionLocal() as db:
-        query = db.query(AuditLog).order_by(AuditLog.created_at.desc())
+        query = db.query(AuditLog).options(joinedload(AuditLog.user))
 
         if action_filter:
             query = query.filter(AuditLog.action == action_filter)
 
-        total = query.count()
-        total_pages = max(1, (total + per_page - 1) // per_page)
-        page = min(page, total_pages)
-
-        logs = query.offset((page - 1) * per_page).limit(per_page).all()
-
-        # Get distinct actions for filter dropdown
-        actions = [r[0] for r in db.query(AuditLog.action).distinct().order_by(AuditLog.action).all()]
+        if after:
+            # Walk forward in ascending order, then flip back to newest-first
+            logs = query.filter(newer_than(after)).order_by(
+                AuditLog.created_at.asc(), AuditLog.id.asc()
+            ).limit(per_page + 1).all()
+            has_newer = len(logs) > per_page
+            logs = list(reversed(logs[:per_page]))
+            has_older = True
+        else:
+            if before:
+                query = query.filter(older_than(before))
+            logs = query.order_by(
+                AuditLog.created_at.desc(), AuditLog.id.desc()
+            ).limit(per_page + 1).all()
+            has_older = len(logs) > per_page
+            logs = logs[:per_page]
+            has_newer = before is not None
+
+        # Distinct actions for filter dropdown (cached, see utils.audit)
+        actions = cached_actions(db)
 
         return render_template('admin_audit.html',
             logs=logs,
-            page=page,
-            total_pages=total_pages,
+            older_cursor=encode_cursor(logs[-1]) if logs and has_older else None,
+            newer_cursor=encode_cursor(logs[0]) if logs and has_newer else None,
+            total=cached_count(db, action_filter),
             actions=actions,
             current_filter=action_filter
         )
 
+# ============================================================================
+# PERFORMANCE ROUTES
+# ============================================================================
+
+@admin_bp.route('/admin/perf/slow-queries', methods=['GET'])
+@require_admin
+def admin_slow_queries():
+    """Slow statements grouped by fingerprint with p50/p95.
+
+    Reads this worker's buffer by default; ``source=file`` merges the log
+    files of every worker. ``format=json`` returns the rows as JSON.
+    """
+    source = 'file' if request.args.get('source') == 'file' else 'buffer'
+    records = slow_queries.from_file() if source == 'file' else slow_queries.buffered()
+    rows = slow_queries.aggregate(records)
+    if request.args.get('format') == 'json':
+        return jsonify({"success": True, "source": source, "threshold_ms": config.SLOW_QUERY_MS,
+                        "records": len(records), "queries": rows})
+    return render_template('admin_slow_queries.html',
+        rows=rows,
+        source=source,
+        records=len(records),
+        threshold_ms=config.SLOW_QUERY_MS,
+        file_enabled=bool(config.SLOW_QUERY_LOG_FILE)
+    )
+
 # ============================================================================
 # RUTINAS ROUTES
 # ============================================================================
 
 @admin_bp.route('/admin/rutinas', methods=['GET'])
 @require_coach_or_admin
+@query_budget(4)
 def list_rutinas():
     """List all routines with user and coach information"""
     with SessionLocal() as db:
         from sqlalchemy.orm import joinedload
         rutinas = db.query(Rutina).options(
-            joinedload(Rutina.assigned_users).joinedload(RutinaUser.user)
+            joinedload(Rutina.assigned_users).joinedload(RutinaUser.user),
+            joinedload(Rutina.coach)
         ).order_by(Rutina.created_at.desc()).all()
         # Show all users (any role can have a routine assigned)
         users = db.query(User).filter(User.is_active == True).order_by(User.name).all()
         coaches = db.query(User).filter(User.role.in_([UserRole.coach, UserRole.admin])).order_by(User.name).all()
-        return render_template('admin_rutinas.html', rutinas=rutinas, users=users, coaches=coaches)
+        return render_template('admin_rutinas.html', rutinas=rutinas, users=users, coaches=coaches,
+                               ejercicio_counts=ejercicio_counts(db, [r.id for r in rutinas]))
 
 @admin_bp.route('/admin/rutinas/create', methods=['POST'])
 @require_coach_or_admin
@@ -503,10 +594,16 @@ def create_rutina():
 
 @admin_bp.route('/admin/rutinas/<int:rutina_id>', methods=['GET'])
 @require_coach_or_admin
+@query_budget(3)
 def get_rutina(rutina_id):
     """Get routine details with exercises"""
     with SessionLocal() as db:
-        rutina = db.query(Rutina).filter(Rutina.id == rutina_id).first()
+        from sqlalchemy.orm import joinedload, selectinload
+        rutina = db.query(Rutina).options(
+            selectinload(Rutina.assigned_users).joinedload(RutinaUser.user),
+            selectinload(Rutina.ejercicios).joinedload(RutinaEjercicio.ejercicio),
+            joinedload(Rutina.coach)
+        ).filter(Rutina.id == rutina_id).first()
         if not rutina:
             return jsonify({"success": False, "message": "Rutina no existe"}), 404
         return jsonify({"success": True, "rutina": rutina.to_dict(include_ejercicios=True)})
@@ -583,6 +680,8 @@ def delete_rutina(rutina_id):
         if not rutina:
             return jsonify({"success": False, "message": "Rutina no existe"}), 404
         log_action(db, 'delete_rutina', 'rutina', rutina_id)
+        delete_logs_for(db, [row[0] for row in db.query(RutinaEjercicio.id).filter(
+            RutinaEjercicio.rutina_id == rutina_id)])
         db.delete(rutina)
         db.commit()
         return jsonify({"success": True})
@@ -593,22 +692,44 @@ def delete_rutina(rutina_id):
 
 @admin_bp.route('/admin/ejercicios', methods=['GET'])
 @require_coach_or_admin
+@query_budget(2)
 def list_ejercicios():
     """List all exercises, optionally filtered by body section"""
     body_section = request.args.get('body_section')
+    if body_section not in [bs.value for bs in BodySection]:
+        body_section = None
     search = request.args.get('search', '').strip()
 
     with SessionLocal() as db:
-        query = db.query(Ejercicio).filter(Ejercicio.is_active == True)
+        if search:
+            return jsonify(_ejercicios_payload(db, body_section, search))
+        # Unfiltered and per-section lists come from the versioned catalog cache
+        return cached_catalog_response(db, ('list', body_section), lambda db: _ejercicios_payload(db, body_section))
 
-        if body_section and body_section in [bs.value for bs in BodySection]:
-            query = query.filter(Ejercicio.body_section == BodySection(body_section))
+def _ejercicios_payload(db, body_section=None, search=''):
+    # Full-text, accent-insensitive ("biceps" matches "Bíceps"), best match first
+    ejercicios = search_query(db, search, body_section).all()
+    return {"success": True, "ejercicios": [e.to_dict() for e in ejercicios]}
 
-        if search:
-            query = query.filter(Ejercicio.name.ilike(f'%{search}%'))
+@admin_bp.route('/admin/ejercicios/search', methods=['GET'])
+@require_coach_or_admin
+@query_budget(1)
+def search_ejercicios_typeahead():
+    """Ranked, paginated exercise search for the routine editor typeahead"""
+    q = request.args.get('q', '')
+    body_section = request.args.get('body_section') or None
+    limit = min(max(request.args.get('limit', 20, type=int), 1), MAX_SEARCH_LIMIT)
+    offset = max(request.args.get('offset', 0, type=int), 0)
 
-        ejercicios = query.order_by(Ejercicio.name).all()
-        return jsonify({"success": True, "ejercicios": [e.to_dict() for e in ejercicios]})
+    with SessionLocal() as db:
+        ejercicios, has_more = search_ejercicios(db, q, body_section, limit, offset)
+        return jsonify({
+            "success": True,
+            "ejercicios": [e.to_dict() for e in ejercicios],
+            "has_more": has_more,
+            "offset": offset,
+            "limit": limit
+        })
 
 # ============================================================================
 # RUTINA-EJERCICIO (Exercise Assignment) ROUTES
@@ -641,11 +762,6 @@ def add_ejercicio_to_rutina(rutina_id):
         if existing:
             return jsonify({"success": False, "message": "Ejercicio ya está en la rutina"}), 400
 
-        # Get max orden
-        max_orden = db.query(RutinaEjercicio).filter(
-            RutinaEjercicio.rutina_id == rutina_id
-        ).count()
-
         rutina_ejercicio = RutinaEjercicio(
             rutina_id=rutina_id,
             ejercicio_id=ejercicio_id,
@@ -654,7 +770,7 @@ def add_ejercicio_to_rutina(rutina_id):
             peso=data.get('peso'),
             descanso=data.get('descanso'),
             notas=data.get('notas'),
-            orden=max_orden
+            orden=next_orden(db, rutina_id)
         )
         db.add(rutina_ejercicio)
         db.commit()
@@ -703,28 +819,44 @@ def remove_ejercicio_from_rutina(rutina_id, re_id):
         if not re:
             return jsonify({"success": False, "message": "Ejercicio no encontrado"}), 404
 
+        delete_logs_for(db, [re.id])
         db.delete(re)
         db.commit()
         return jsonify({"success": True})
 
 @admin_bp.route('/admin/rutinas/<int:rutina_id>/ejercicios/reorder', methods=['POST'])
 @require_coach_or_admin
+@query_budget(2)
 def reorder_ejercicios(rutina_id):
     """Reorder exercises in a routine"""
     data = request.get_json() or {}
     order = data.get('order', [])  # List of rutina_ejercicio IDs in new order
 
-    if not isinstance(order, list):
-        return jsonify({"success": False, "message": "Order debe ser una lista"}), 400
+    if not isinstance(order, list) or not all(isinstance(i, int) and not isinstance(i, bool) for i in order):
+        return jsonify({"success": False, "message": "Order debe ser una lista de IDs"}), 400
 
     with SessionLocal() as db:
-        for idx, re_id in enumerate(order):
-            re = db.query(RutinaEjercicio).filter(
-                RutinaEjercicio.id == re_id,
-                RutinaEjercicio.rutina_id == rutina_id
-            ).first()
-            if re:
-                re.orden = idx
+        # The order must list every exercise of the routine exactly once
+        current_ids = {row.id for row in routine_order(db, rutina_id)}
+        if len(order) != len(set(order)) or set(order) != current_ids:
+            return jsonify({"success": False, "message": "El orden no coincide con los ejercicios de la rutina"}), 400
+        renumber(db, rutina_id, order)
+        db.commit()
+        return jsonify({"success": True})
+
+@admin_bp.route('/admin/rutinas/<int:rutina_id>/ejercicios/<int:re_id>/move', methods=['POST'])
+@require_coach_or_admin
+@query_budget(3)
+def move_ejercicio(rutina_id, re_id):
+    """Move one exercise right after another (after_id null = first); writes a single row"""
+    data = request.get_json() or {}
+    after_id = data.get('after_id')
+    if after_id is not None and (not isinstance(after_id, int) or isinstance(after_id, bool)):
+        return jsonify({"success": False, "message": "after_id inválido"}), 400
+
+    with SessionLocal() as db:
+        if not move(db, rutina_id, re_id, after_id):
+            return jsonify({"success": False, "message": "Ejercicio no encontrado en rutina"}), 404
         db.commit()
         return jsonify({"success": True})
 
@@ -741,22 +873,27 @@ def image_organizer():
 
 @admin_bp.route('/admin/ejercicios/organized', methods=['GET'])
 @require_admin
+@query_budget(2)
 def get_organized_ejercicios():
     """Get all exercises organized by body section with their images"""
     with SessionLocal() as db:
-        ejercicios = db.query(Ejercicio).filter(Ejercicio.is_active == True).order_by(Ejercicio.id).all()
-
-        # Group by body section
-        organized = {}
-        for ej in ejercicios:
-            section = ej.body_section.value
-            if section not in organized:
-                organized[section] = []
-            organized[section].append({
-                'id': ej.id,
-                'name': ej.name,
-                'image_url': ej.image_url,
-                'body_section': section
-            })
-
-        return jsonify({"success": True, "exercises": organized})
+        return cached_catalog_response(db, ('organized',), _organized_payload)
+
+def _organized_payload(db):
+    ejercicios = db.query(Ejercicio).filter(Ejercicio.is_active == True).order_by(Ejercicio.id).all()
+
+    # Group by body section
+    organized = {}
+    for ej in ejercicios:
+        section = ej.body_section.value
+        if section not in organized:
+            organized[section] = []
+        organized[section].append({
+            'id': ej.id,
+            'name': ej.name,
+            'image_url': ej.image_url,
+            'image_srcset': image_srcset(ej.image_url),
+            'body_section': section
+        })
+
+    return {"success": True, "exercises": organized}
@@ -1,19 +1,25 @@
 from flask import Blueprint, request, jsonify, session, redirect, render_template, render_template_string
 from sqlalchemy.orm import Session
-from passlib.hash import bcrypt
 import secrets
 from datetime import datetime, date
 from functools import wraps
 from db import SessionLocal
-from models import User, UserRole, InvitationToken, InvitationPurpose, Rutina, WorkoutLog, RutinaEjercicio, RutinaUser
+from models import User, UserRole, InvitationToken, InvitationPurpose, Rutina, WorkoutLog, RutinaEjercicio, RutinaUser, WorkoutDaySummary, Ejercicio
 from config import config
-try:
-    from mailersend.emails import NewEmail as Email
-except ImportError:
-    from mailersend import Email
+from utils.rutina_loader import load_member_rutinas
+from utils.mail import render_email
+from utils.passwords import hash_password, verify_password
+from utils.workouts import owned_rutina_ejercicio_ids, mark_completed, unmark_completed
+from utils.mail_queue import enqueue_email
+from flask_limiter.util import get_remote_address
+from utils.rate_limit import limiter, credential_key
+from utils.images import image_srcset
+from utils.query_budget import query_budget
 
 auth_bp = Blueprint('auth', __name__)
 
+MAX_BATCH_TOGGLE = 200  # exercises per /mi-rutina/toggle-batch call
+
 INVITE_TEMPLATE = """
 <!doctype html><title>Set Password</title>
 <h2>Crear contraseña</h2>
@@ -32,6 +38,9 @@ def require_auth(f):
     return wrapper
 
 @auth_bp.route('/login', methods=['GET', 'POST'])
+@limiter.limit(config.RATE_LIMIT_LOGIN, methods=['POST'], key_func=credential_key)
+@limiter.limit(config.RATE_LIMIT_LOGIN_PER_IP, methods=['POST'], key_func=get_remote_address)
+@query_budget(2)
 def login():
     if request.method == 'GET':
         return render_template('login.html')
@@ -45,11 +54,16 @@ def login():
         password = request.form.get('password') or ''
     with SessionLocal() as db:
         user = db.query(User).filter(User.email == email, User.is_active == True).first()
-        if not user or not user.password_hash or not bcrypt.verify(password, user.password_hash):
+        # Always pay for one bcrypt check, even for unknown emails
+        ok, needs_rehash = verify_password(password, user.password_hash if user else None)
+        if not ok:
             if request.is_json:
                 return jsonify({"success": False, "message": "Credenciales inválidas"}), 401
             # form submit -> re-render with message (simplistic)
             return render_template('login.html', error="Credenciales inválidas"), 401
+        if needs_rehash:
+            user.password_hash = hash_password(password)
+            db.commit()
         session['uid'] = user.id
         session['role'] = user.role.value
     if user.role == UserRole.admin:
@@ -86,7 +100,7 @@ def accept_invite(token):
             password = request.form.get('password')
             if not password or len(password) < 8:
                 return "Contraseña inválida", 400
-            user.password_hash = bcrypt.hash(password)
+            user.password_hash = hash_password(password)
             user.is_active = True
             invite.used_at = datetime.utcnow()
             db.commit()
@@ -98,6 +112,8 @@ def accept_invite(token):
 # ============================================================================
 
 @auth_bp.route('/forgot-password', methods=['GET', 'POST'])
+@limiter.limit(config.RATE_LIMIT_FORGOT_PASSWORD, methods=['POST'], key_func=credential_key)
+@limiter.limit(config.RATE_LIMIT_FORGOT_PASSWORD_PER_IP, methods=['POST'], key_func=get_remote_address)
 def forgot_password():
     if request.method == 'GET':
         return render_template('forgot_password.html')
@@ -131,10 +147,9 @@ def forgot_password():
             expires_at=InvitationToken.new_expiry(hours=24)
         )
         db.add(reset_token)
+        enqueue_reset_email(db, email, token)
         db.commit()
 
-        send_reset_email(email, token)
-
     return jsonify({"success": True, "message": "Si el email existe, recibirás un enlace de recuperación."})
 
 @auth_bp.route('/reset-password/<token>', methods=['GET', 'POST'])
@@ -160,7 +175,7 @@ def reset_password(token):
             return jsonify({"success": False, "message": "La contraseña debe tener al menos 8 caracteres"}), 400
 
         user = invite.user
-        user.password_hash = bcrypt.hash(password)
+        user.password_hash = hash_password(password)
         invite.used_at = datetime.utcnow()
         db.commit()
 
@@ -172,21 +187,11 @@ def reset_password(token):
 
 @auth_bp.route('/mi-rutina')
 @require_auth
+@query_budget(1)
 def mi_rutina():
     with SessionLocal() as db:
-        rutinas = db.query(Rutina).join(RutinaUser).filter(
-            RutinaUser.user_id == session['uid'],
-            RutinaUser.is_active == True,
-            Rutina.is_active == True
-        ).order_by(Rutina.created_at.desc()).all()
-
         today = date.today()
-        completed_logs = db.query(WorkoutLog.rutina_ejercicio_id).filter(
-            WorkoutLog.user_id == session['uid'],
-            WorkoutLog.date == today,
-            WorkoutLog.completed == True
-        ).all()
-        completed_ids = {row[0] for row in completed_logs}
+        rutinas, completed_ids = load_member_rutinas(db, session['uid'], today)
 
         return render_template(
             'mi_rutina.html',
@@ -197,6 +202,7 @@ def mi_rutina():
 
 @auth_bp.route('/mi-rutina/toggle', methods=['POST'])
 @require_auth
+@query_budget(5)
 def toggle_exercise():
     data = request.get_json() or {}
     re_id = data.get('rutina_ejercicio_id')
@@ -208,77 +214,92 @@ def toggle_exercise():
 
     with SessionLocal() as db:
         # Verify the exercise belongs to the user's active routine
-        re = db.query(RutinaEjercicio).join(Rutina).join(RutinaUser).filter(
-            RutinaEjercicio.id == re_id,
-            RutinaUser.user_id == uid,
-            RutinaUser.is_active == True,
-            Rutina.is_active == True
-        ).first()
-        if not re:
+        if not owned_rutina_ejercicio_ids(db, uid, {re_id}):
             return jsonify({"success": False, "message": "Ejercicio no encontrado"}), 404
 
-        existing = db.query(WorkoutLog).filter(
+        existing = db.query(WorkoutLog.id).filter(
             WorkoutLog.user_id == uid,
             WorkoutLog.rutina_ejercicio_id == re_id,
             WorkoutLog.date == today
         ).first()
 
         if existing:
-            db.delete(existing)
+            unmark_completed(db, uid, today, {re_id})
             db.commit()
             return jsonify({"success": True, "completed": False})
         else:
-            log = WorkoutLog(
-                user_id=uid,
-                rutina_ejercicio_id=re_id,
-                date=today,
-                completed=True
-            )
-            db.add(log)
+            mark_completed(db, uid, today, {re_id})
             db.commit()
             return jsonify({"success": True, "completed": True})
 
+@auth_bp.route('/mi-rutina/toggle-batch', methods=['POST'])
+@require_auth
+@query_budget(5)
+def toggle_exercises_batch():
+    """Set many exercises of today's routine to the same state in one transaction.
+
+    Body: {"rutina_ejercicio_ids": [...], "completed": true|false}
+    """
+    data = request.get_json() or {}
+    re_ids = data.get('rutina_ejercicio_ids')
+    completed = data.get('completed')
+    if not isinstance(re_ids, list) or not re_ids or not all(isinstance(i, int) for i in re_ids):
+        return jsonify({"success": False, "message": "rutina_ejercicio_ids requerido"}), 400
+    if not isinstance(completed, bool):
+        return jsonify({"success": False, "message": "completed requerido"}), 400
+    if len(re_ids) > MAX_BATCH_TOGGLE:
+        return jsonify({"success": False, "message": "Demasiados ejercicios"}), 400
+
+    today = date.today()
+    uid = session['uid']
+    re_ids = set(re_ids)
+
+    with SessionLocal() as db:
+        if owned_rutina_ejercicio_ids(db, uid, re_ids) != re_ids:
+            return jsonify({"success": False, "message": "Ejercicio no encontrado"}), 404
+        if completed:
+            mark_completed(db, uid, today, re_ids)
+        else:
+            unmark_completed(db, uid, today, re_ids)
+        db.commit()
+        return jsonify({"success": True, "completed": completed, "rutina_ejercicio_ids": sorted(re_ids)})
+
 @auth_bp.route('/mi-rutina/history')
 @require_auth
+@query_budget(1)
 def workout_history():
     uid = session['uid']
     page_size = 30
     offset = request.args.get('offset', 0, type=int)
 
     with SessionLocal() as db:
-        from sqlalchemy import func
-
-        rutinas = db.query(Rutina).join(RutinaUser).filter(
-            RutinaUser.user_id == uid,
-            RutinaUser.is_active == True,
-            Rutina.is_active == True
-        ).all()
-        total_exercises = sum(len(r.ejercicios) for r in rutinas)
-
-        logs = db.query(
-            WorkoutLog.date,
-            func.count(WorkoutLog.id).label('completed')
+        # Indexed range read over the (user_id, date) rollup kept by utils.workouts
+        rows = db.query(
+            WorkoutDaySummary.date,
+            WorkoutDaySummary.completed_count,
+            WorkoutDaySummary.planned_count
         ).filter(
-            WorkoutLog.user_id == uid,
-            WorkoutLog.completed == True
-        ).group_by(WorkoutLog.date).order_by(WorkoutLog.date.desc()).offset(offset).limit(page_size + 1).all()
+            WorkoutDaySummary.user_id == uid,
+            WorkoutDaySummary.completed_count > 0
+        ).order_by(WorkoutDaySummary.date.desc()).offset(offset).limit(page_size + 1).all()
 
-        has_more = len(logs) > page_size
-        logs = logs[:page_size]
+        has_more = len(rows) > page_size
+        rows = rows[:page_size]
 
         history = [
             {
                 "date": row.date.isoformat(),
-                "total": total_exercises,
-                "completed": row.completed
+                "total": row.planned_count,
+                "completed": row.completed_count
             }
-            for row in logs
+            for row in rows
         ]
 
         return jsonify({"history": history, "has_more": has_more, "next_offset": offset + page_size if has_more else None})
 
 @auth_bp.route('/mi-rutina/history/<date_str>')
 @require_auth
+@query_budget(1)
 def workout_history_detail(date_str):
     uid = session['uid']
     try:
@@ -287,25 +308,38 @@ def workout_history_detail(date_str):
         return jsonify({"success": False, "message": "Fecha inválida"}), 400
 
     with SessionLocal() as db:
-        logs = db.query(WorkoutLog).filter(
+        # One joined projection of just the serialized fields (no lazy loads)
+        rows = db.query(
+            Ejercicio.name,
+            Ejercicio.body_section,
+            Ejercicio.image_url,
+            RutinaEjercicio.series,
+            RutinaEjercicio.repeticiones,
+            RutinaEjercicio.peso,
+            RutinaEjercicio.descanso,
+        ).select_from(WorkoutLog).join(
+            RutinaEjercicio, RutinaEjercicio.id == WorkoutLog.rutina_ejercicio_id
+        ).join(
+            Ejercicio, Ejercicio.id == RutinaEjercicio.ejercicio_id
+        ).filter(
             WorkoutLog.user_id == uid,
             WorkoutLog.date == target_date,
             WorkoutLog.completed == True
-        ).all()
+        ).order_by(WorkoutLog.id).all()
 
-        exercises = []
-        for log in logs:
-            re = log.rutina_ejercicio
-            ej = re.ejercicio
-            exercises.append({
-                "name": ej.name,
-                "body_section": ej.body_section.value,
-                "image_url": ej.image_url,
-                "series": re.series,
-                "repeticiones": re.repeticiones,
-                "peso": re.peso,
-                "descanso": re.descanso,
-            })
+        exercises = [
+            {
+                "name": row.name,
+                "body_section": row.body_section.value,
+                "image_url": row.image_url,
+                "image_srcset": image_srcset(row.image_url),
+                "series": row.series,
+                "repeticiones": row.repeticiones,
+                "peso": row.peso,
+                "descanso": row.descanso,
+            }
+            for row in rows
+        ]
 
         return jsonify({"date": date_str, "exercises": exercises})
 
@@ -313,41 +347,12 @@ def workout_history_detail(date_str):
 # EMAIL UTILITIES
 # ============================================================================
 
-def send_invitation_email(email_to: str, token: str):
-    if not config.MAILERSEND_API_KEY:
-        print(f"[INVITE LINK] https://urbanmood.net/invite/{token}")
-        return
-    mailer = Email(config.MAILERSEND_API_KEY)
-    mail_body = {}
-    mail_from = {"name": config.MAIL_FROM_NAME, "email": config.MAIL_FROM_EMAIL}
-    recipients = [{"name": email_to, "email": email_to}]
-    subject = "Invitación UrbanMood"
-    html_content = f"""
-    <p>Te invitamos a crear tu cuenta UrbanMood.</p>
-    <p><a href='https://urbanmood.net/invite/{token}'>Crear contraseña</a> (expira en 72h)</p>
-    """
-    mailer.set_mail_from(mail_from, mail_body)
-    mailer.set_mail_to(recipients, mail_body)
-    mailer.set_subject(subject, mail_body)
-    mailer.set_html_content(html_content, mail_body)
-    mailer.send(mail_body)
-
-def send_reset_email(email_to: str, token: str):
-    if not config.MAILERSEND_API_KEY:
-        print(f"[RESET LINK] https://urbanmood.net/reset-password/{token}")
-        return
-    mailer = Email(config.MAILERSEND_API_KEY)
-    mail_body = {}
-    mail_from = {"name": config.MAIL_FROM_NAME, "email": config.MAIL_FROM_EMAIL}
-    recipients = [{"name": email_to, "email": email_to}]
-    subject = "Restablecer contraseña - UrbanMood"
-    html_content = f"""
-    <p>Recibimos una solicitud para restablecer tu contraseña.</p>
-    <p><a href='https://urbanmood.net/reset-password/{token}'>Restablecer contraseña</a> (expira en 24h)</p>
-    <p>Si no solicitaste este cambio, podés ignorar este email.</p>
-    """
-    mailer.set_mail_from(mail_from, mail_body)
-    mailer.set_mail_to(recipients, mail_body)
-    mailer.set_subject(subject, mail_body)
-    mailer.set_html_content(html_content, mail_body)
-    mailer.send(mail_body)
+def enqueue_invitation_email(db, email_to: str, token: str):
+    """Queue the invitation email in the caller's transaction (sent after commit)."""
+    html_content = render_email('invitation.html', token=token)
+    return enqueue_email(db, email_to, "Invitación UrbanMood", html_content, kind='invite')
+
+def enqueue_reset_email(db, email_to: str, token: str):
+    """Queue the password reset email in the caller's transaction (sent after commit)."""
+    html_content = render_email('reset_password.html', token=token)
+    return enqueue_email(db, email_to, "Restablecer contraseña - UrbanMood", html_content, kind='reset')
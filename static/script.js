@@ -204,16 +204,29 @@ document.addEventListener('DOMContentLoaded', function() {
             });
         });
 
+    // Smallest srcset candidate covering the slide at the device pixel ratio
+    function pickFromSrcset(srcset, targetWidth) {
+        const candidates = srcset.split(',').map(c => {
+            const [url, w] = c.trim().split(/\s+/);
+            return { url, width: parseInt(w, 10) };
+        }).sort((a, b) => a.width - b.width);
+        const match = candidates.find(c => c.width >= targetWidth) || candidates[candidates.length - 1];
+        return match.url;
+    }
+
     if (slides.length > 0) {
         slides.forEach((slide, index) => {
-            if (images[index]) {
-                slide.style.backgroundImage = `url('${images[index]}')`;
+            const src = slide.dataset.srcset
+                ? pickFromSrcset(slide.dataset.srcset, (slide.clientWidth || window.innerWidth) * (window.devicePixelRatio || 1))
+                : images[index];
+            if (src) {
+                slide.style.backgroundImage = `url('${src}')`;
                 
                 // Preload images for better performance
                 const img = new Image();
-                img.src = images[index];
+                img.src = src;
                 img.onerror = function() {
-                    console.error('Failed to load carousel image:', images[index]);
+                    console.error('Failed to load carousel image:', src);
                 };
             }
         });
@@ -0,0 +1,85 @@
+"""Shared fixtures: the app on an in-memory SQLite database.
+
+Settings are environment variables read by ``config`` at import, so they
+are set here before the app is imported.
+"""
+import os
+
+os.environ.update(
+    DATABASE_URL='sqlite://',
+    RATE_LIMIT_ENABLED='0',
+    RATE_LIMIT_STORAGE_URI='memory://',
+    MAIL_WORKER_ENABLED='0',
+    MAIL_TRANSPORT='stub',
+    QUERY_BUDGET_MODE='raise',
+    SLOW_QUERY_LOG_FILE='',
+    BCRYPT_ROUNDS='4',
+)
+
+import pytest
+from app import app as flask_app
+from db import Base, engine, SessionLocal
+from models import User, UserRole, Ejercicio, BodySection, Rutina, RutinaUser, RutinaEjercicio
+from utils.ordering import ORDEN_GAP
+
+
+@pytest.fixture
+def app():
+    flask_app.config['TESTING'] = True
+    yield flask_app
+    SessionLocal.remove()
+    with engine.begin() as conn:
+        for table in reversed(Base.metadata.sorted_tables):
+            conn.execute(table.delete())
+
+
+@pytest.fixture
+def db(app):
+    session = SessionLocal()
+    yield session
+    session.close()
+
+
+@pytest.fixture
+def client_for(app):
+    """``client_for(user)``: a test client logged in as ``user``."""
+    def make(user):
+        client = app.test_client()
+        with client.session_transaction() as sess:
+            sess['uid'] = user.id
+            sess['role'] = user.role.value
+        return client
+    return make
+
+
+@pytest.fixture
+def make_member(db):
+    """``make_member(n_rutinas, n_ejercicios)``: a member with that many active
+    routines of that many exercises each. Returns ``(user, rutina_ejercicios)``."""
+    counter = {'n': 0}
+
+    def make(n_rutinas=1, n_ejercicios=1):
+        counter['n'] += 1
+        n = counter['n']
+        coach = User(email=f'coach{n}@test', name='Coach', role=UserRole.coach, is_active=True)
+        member = User(email=f'member{n}@test', name='Socio', role=UserRole.user, is_active=True)
+        db.add_all([coach, member])
+        db.flush()
+        ejercicios = [Ejercicio(name=f'Ejercicio {n}-{i}', body_section=BodySection.pecho)
+                      for i in range(n_ejercicios)]
+        db.add_all(ejercicios)
+        db.flush()
+        rutina_ejercicios = []
+        for r in range(n_rutinas):
+            rutina = Rutina(name=f'Rutina {r}', created_by_coach_id=coach.id)
+            db.add(rutina)
+            db.flush()
+            db.add(RutinaUser(rutina_id=rutina.id, user_id=member.id, is_active=True))
+            for pos, ejercicio in enumerate(ejercicios):
+                re = RutinaEjercicio(rutina_id=rutina.id, ejercicio_id=ejercicio.id, series=3,
+                                     repeticiones='10', orden=(pos + 1) * ORDEN_GAP)
+                db.add(re)
+                rutina_ejercicios.append(re)
+        db.commit()
+        return member, rutina_ejercicios
+    return make
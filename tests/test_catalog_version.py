@@ -0,0 +1,34 @@
+"""The catalog version must change on every write, however close together."""
+from sqlalchemy import update
+from models import Ejercicio, BodySection, CatalogVersion
+
+
+def _version(db):
+    return db.query(CatalogVersion.version).filter(CatalogVersion.id == 1).scalar()
+
+
+def test_each_write_bumps_the_version(db):
+    ejercicio = Ejercicio(name='Remo con barra', body_section=BodySection.espalda)
+    db.add(ejercicio)
+    db.commit()
+    first = _version(db)
+
+    # Two edits inside the same second: DATETIME stamps could not tell them apart
+    ejercicio.description = 'Espalda recta'
+    db.commit()
+    db.execute(update(Ejercicio), [{'id': ejercicio.id, 'image_url': '/static/remo.png'}])
+    db.commit()
+
+    assert _version(db) == first + 2
+
+
+def test_rolled_back_write_keeps_the_version(db):
+    db.add(Ejercicio(name='Plancha', body_section=BodySection.abdomen))
+    db.commit()
+    before = _version(db)
+
+    db.add(Ejercicio(name='Plancha lateral', body_section=BodySection.abdomen))
+    db.flush()
+    db.rollback()
+
+    assert _version(db) == before
@@ -0,0 +1,34 @@
+"""TimedQueuePool counts pool exhaustion as a timeout, and nothing else."""
+import sqlite3
+import pytest
+from sqlalchemy import exc
+from db import TimedQueuePool, pool_stats
+
+
+def _timeouts():
+    return pool_stats.snapshot()['timeouts']
+
+
+def test_exhausted_pool_counts_a_timeout(tmp_path):
+    pool = TimedQueuePool(lambda: sqlite3.connect(tmp_path / 'pool.db'), pool_size=1, max_overflow=0, timeout=0.01)
+    held = pool.connect()
+    before = _timeouts()
+
+    with pytest.raises(exc.TimeoutError):
+        pool.connect()
+
+    assert _timeouts() == before + 1
+    held.close()
+
+
+def test_failed_connect_is_not_a_timeout():
+    def refuse():
+        raise sqlite3.OperationalError('unable to open database file')
+
+    pool = TimedQueuePool(refuse, pool_size=1, max_overflow=0, timeout=0.01)
+    before = _timeouts()
+
+    with pytest.raises(sqlite3.OperationalError):
+        pool.connect()
+
+    assert _timeouts() == before
@@ -0,0 +1,61 @@
+"""Only a broken bcrypt pool falls back to inline hashing; nothing is hashed twice."""
+from concurrent.futures import Future
+from concurrent.futures.process import BrokenProcessPool
+import pytest
+from utils import passwords
+
+
+class _Pool:
+    """Stands in for the process pool: every task ends with ``error``."""
+
+    def __init__(self, error):
+        self.error = error
+        self.submitted = 0
+
+    def submit(self, fn, *args):
+        self.submitted += 1
+        future = Future()
+        future.set_exception(self.error)
+        return future
+
+    def shutdown(self, **kwargs):
+        pass
+
+
+@pytest.fixture
+def inline_calls(monkeypatch):
+    calls = []
+    original = passwords._verify
+    monkeypatch.setattr(passwords, '_verify', lambda *args: calls.append(args) or original(*args))
+    return calls
+
+
+def _use_pool(monkeypatch, error):
+    pool = _Pool(error)
+    monkeypatch.setattr(passwords, '_get_pool', lambda: pool)
+    return pool
+
+
+def test_broken_pool_hashes_inline(monkeypatch, inline_calls):
+    stored = passwords.hash_password('secreto123')
+    _use_pool(monkeypatch, BrokenProcessPool())
+
+    assert passwords.verify_password('secreto123', stored) == (True, False)
+    assert len(inline_calls) == 1
+
+
+def test_timeout_is_not_retried_inline(monkeypatch, inline_calls):
+    stored = passwords.hash_password('secreto123')
+    _use_pool(monkeypatch, TimeoutError())
+
+    with pytest.raises(TimeoutError):
+        passwords.verify_password('secreto123', stored)
+    assert inline_calls == []
+
+
+def test_malformed_hash_is_checked_once(monkeypatch, inline_calls):
+    pool = _use_pool(monkeypatch, ValueError('not a bcrypt hash'))
+
+    assert passwords.verify_password('secreto123', 'not-a-hash') == (False, False)
+    assert pool.submitted == 1
+    assert inline_calls == []
@@ -0,0 +1,36 @@
+"""Member pages must run a fixed number of statements, whatever the data size."""
+from datetime import date
+from db import engine
+from models import WorkoutLog
+from utils.query_budget import count_queries
+
+
+def _statements(client, path):
+    with count_queries(engine) as queries:
+        response = client.get(path)
+    assert response.status_code == 200
+    return queries.total
+
+
+def test_mi_rutina_query_count_is_constant(make_member, client_for):
+    small, _ = make_member(n_rutinas=1, n_ejercicios=1)
+    large, _ = make_member(n_rutinas=5, n_ejercicios=12)
+
+    assert _statements(client_for(small), '/mi-rutina') == _statements(client_for(large), '/mi-rutina') == 1
+
+
+def test_workout_history_detail_query_count_is_constant(db, make_member, client_for):
+    today = date.today()
+    one, one_exercises = make_member(n_rutinas=1, n_ejercicios=1)
+    fifty, fifty_exercises = make_member(n_rutinas=5, n_ejercicios=10)
+    for user, exercises in ((one, one_exercises), (fifty, fifty_exercises)):
+        db.add_all(WorkoutLog(user_id=user.id, rutina_ejercicio_id=re.id, date=today, completed=True)
+                   for re in exercises)
+    db.commit()
+    assert (len(one_exercises), len(fifty_exercises)) == (1, 50)
+
+    path = f'/mi-rutina/history/{today.isoformat()}'
+    one_client, fifty_client = client_for(one), client_for(fifty)
+    assert len(one_client.get(path).get_json()['exercises']) == 1
+    assert len(fifty_client.get(path).get_json()['exercises']) == 50
+    assert _statements(one_client, path) == _statements(fifty_client, path) == 1
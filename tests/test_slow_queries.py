@@ -0,0 +1,33 @@
+"""Each worker process writes its own slow-query file; from_file merges them."""
+import multiprocessing
+import os
+import pytest
+from config import config
+from utils import slow_queries
+
+
+def _record(sql):
+    slow_queries.record(sql, (1,), False, 0.25)
+
+
+@pytest.fixture
+def log_file(tmp_path, monkeypatch):
+    monkeypatch.setattr(config, 'SLOW_QUERY_LOG_FILE', str(tmp_path / 'slow_queries.log'))
+    yield tmp_path
+    for handler in list(slow_queries._file_logger.handlers):
+        slow_queries._file_logger.removeHandler(handler)
+        handler.close()
+    slow_queries._file_pid = None
+
+
+def test_workers_write_separate_files_merged_by_from_file(log_file):
+    _record('SELECT 1 FROM users')
+    worker = multiprocessing.get_context('fork').Process(target=_record, args=('SELECT 2 FROM rutinas',))
+    worker.start()
+    worker.join()
+    slow_queries._file_logger.handlers[0].flush()
+
+    assert sorted(p.name for p in log_file.iterdir()) == sorted(
+        [f'slow_queries.{worker.pid}.log', os.path.basename(slow_queries.log_path())])
+    assert {entry['sql'] for entry in slow_queries.from_file()} == {
+        'SELECT ? FROM users', 'SELECT ? FROM rutinas'}
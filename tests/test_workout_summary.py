@@ -0,0 +1,39 @@
+"""workout_day_summary must follow the logs when routines or exercises are deleted."""
+from datetime import date, timedelta
+from models import User, UserRole, WorkoutDaySummary
+from utils.workouts import mark_completed
+
+
+def _completed(db, user, day):
+    db.expire_all()
+    return db.get(WorkoutDaySummary, (user.id, day)).completed_count
+
+
+def test_removing_an_exercise_recounts_its_days(db, make_member, client_for):
+    member, exercises = make_member(n_rutinas=1, n_ejercicios=3)
+    coach = db.query(User).filter(User.role == UserRole.coach).first()
+    today, yesterday = date.today(), date.today() - timedelta(days=1)
+    mark_completed(db, member.id, today, {re.id for re in exercises})
+    mark_completed(db, member.id, yesterday, {exercises[0].id})
+    db.commit()
+
+    removed = exercises[0]
+    response = client_for(coach).delete(f'/admin/rutinas/{removed.rutina_id}/ejercicios/{removed.id}')
+
+    assert response.status_code == 200
+    assert _completed(db, member, today) == 2
+    assert _completed(db, member, yesterday) == 0
+
+
+def test_deleting_a_routine_recounts_its_days(db, make_member, client_for):
+    member, exercises = make_member(n_rutinas=2, n_ejercicios=2)
+    coach = db.query(User).filter(User.role == UserRole.coach).first()
+    today = date.today()
+    mark_completed(db, member.id, today, {re.id for re in exercises})
+    db.commit()
+    assert _completed(db, member, today) == 4
+
+    response = client_for(coach).delete(f'/admin/rutinas/{exercises[0].rutina_id}')
+
+    assert response.status_code == 200
+    assert _completed(db, member, today) == 2
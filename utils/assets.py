@@ -0,0 +1,197 @@
+"""Fingerprinted static assets and the in-memory static file server.
+
+``build_assets.py`` writes content-hashed copies of the stylesheet, script and
+images to ``static/dist/`` (plus ``.gz`` / ``.br`` variants where compression
+pays off) and a ``manifest.json`` mapping logical paths to hashed names.
+
+- :func:`asset_url` is the Jinja helper templates use to reference an asset;
+  it returns the hashed URL when the manifest knows the file.
+- :class:`StaticAssetMiddleware` answers static requests straight from memory
+  at the WSGI layer, before Flask routing: precompressed bytes chosen by
+  ``Accept-Encoding``, strong ETags with 304s, and immutable caching for the
+  hashed URLs. Flask's ``after_request`` hooks don't run for these, so the
+  middleware sets ``SECURITY_HEADERS`` itself.
+"""
+import hashlib
+import json
+import mimetypes
+import os
+from collections import namedtuple
+from config import config
+
+STATIC_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'static')
+DIST_DIR = 'dist'  # relative to STATIC_DIR
+FINGERPRINTED_DIRS = ('dist/', 'variants/')  # file names carry a content hash
+MANIFEST_NAME = 'manifest.json'
+IMMUTABLE = 'public, max-age=31536000, immutable'
+# Also set by app.add_security_headers; static responses never reach Flask's hooks
+SECURITY_HEADERS = (
+    ('X-Content-Type-Options', 'nosniff'),
+    ('X-Frame-Options', 'SAMEORIGIN'),
+    ('Referrer-Policy', 'strict-origin-when-cross-origin'),
+)
+TEXT_TYPES = ('text/', 'application/javascript', 'application/json', 'application/xml', 'image/svg+xml')
+
+Asset = namedtuple('Asset', 'content_type body gzip br etag cache_control')
+
+
+def content_hash(data):
+    """Short content digest used in file names and ETags."""
+    return hashlib.sha256(data).hexdigest()[:12]
+
+
+def hashed_name(rel_path, digest):
+    """``images/banner.png`` -> ``images/banner.<digest>.png``."""
+    root, ext = os.path.splitext(rel_path)
+    return f"{root}.{digest}{ext}"
+
+
+def load_manifest(static_dir=STATIC_DIR):
+    """Return ``{logical path: hashed path}`` or ``{}`` if assets were not built."""
+    try:
+        with open(os.path.join(static_dir, DIST_DIR, MANIFEST_NAME), encoding='utf-8') as fh:
+            return json.load(fh)
+    except (OSError, ValueError):
+        return {}
+
+
+_manifest = None
+
+
+def asset_url(path):
+    """URL for a file under ``static/``, fingerprinted when the build ran.
+
+    ``{{ asset_url('style.css') }}`` -> ``/static/dist/style.<hash>.css``
+    """
+    global _manifest
+    if _manifest is None:
+        _manifest = load_manifest()
+    path = path.lstrip('/')
+    if path.startswith('static/'):
+        path = path[len('static/'):]
+    hashed = _manifest.get(path)
+    if hashed:
+        return f"/static/{DIST_DIR}/{hashed}"
+    return f"/static/{path}"
+
+
+def _content_type(path):
+    ctype = mimetypes.guess_type(path)[0] or 'application/octet-stream'
+    if ctype.startswith(TEXT_TYPES):
+        ctype += '; charset=utf-8'
+    return ctype
+
+
+def _read(path):
+    try:
+        with open(path, 'rb') as fh:
+            return fh.read()
+    except OSError:
+        return None
+
+
+def build_index(static_dir=STATIC_DIR, max_bytes=None, max_age=None):
+    """Load every static file up to ``max_bytes`` into ``{rel path: Asset}``.
+
+    Hashed copies share the original's bytes; larger files (videos) are left
+    out and still go through Flask's static route, which handles ranges.
+    """
+    max_bytes = config.STATIC_INDEX_MAX_BYTES if max_bytes is None else max_bytes
+    max_age = config.STATIC_MAX_AGE if max_age is None else max_age
+    dist_dir = os.path.join(static_dir, DIST_DIR)
+    manifest = load_manifest(static_dir)
+    index = {}
+    for root, dirs, files in os.walk(static_dir):
+        if os.path.abspath(root) == os.path.abspath(static_dir) and DIST_DIR in dirs:
+            dirs.remove(DIST_DIR)
+        for name in files:
+            full = os.path.join(root, name)
+            if os.path.getsize(full) > max_bytes:
+                continue
+            rel = os.path.relpath(full, static_dir).replace(os.sep, '/')
+            body = _read(full)
+            if body is None:
+                continue
+            digest = content_hash(body)
+            hashed = manifest.get(rel)
+            gz = br = None
+            if hashed:
+                hashed_path = os.path.join(dist_dir, hashed)
+                gz = _read(hashed_path + '.gz')
+                br = _read(hashed_path + '.br')
+            cache_control = IMMUTABLE if rel.startswith(FINGERPRINTED_DIRS) else f'public, max-age={max_age}'
+            asset = Asset(_content_type(name), body, gz, br, digest, cache_control)
+            index[rel] = asset
+            # Only trust the hashed URL if it still matches what is on disk
+            if hashed and hashed == hashed_name(rel, digest):
+                index[f"{DIST_DIR}/{hashed}"] = asset._replace(cache_control=IMMUTABLE)
+    return index
+
+
+def _accepted_encodings(header):
+    accepted = set()
+    for part in header.split(','):
+        coding, _, params = part.strip().partition(';')
+        q = 1.0
+        params = params.strip()
+        if params.startswith('q='):
+            try:
+                q = float(params[2:])
+            except ValueError:
+                q = 0.0
+        if q > 0:
+            accepted.add(coding.strip().lower())
+    return accepted
+
+
+class StaticAssetMiddleware:
+    """WSGI middleware serving indexed static files without entering Flask.
+
+    Matches ``/static/<path>`` and, like the ``static_files`` catch-all route,
+    ``/<path>`` for files at any level of ``static/``. Anything not in the
+    index (or not a GET/HEAD) is passed to the wrapped application.
+    """
+
+    def __init__(self, app, static_dir=STATIC_DIR, index=None):
+        self.app = app
+        self.index = build_index(static_dir) if index is None else index
+
+    def lookup(self, path):
+        if path.startswith('/static/'):
+            return self.index.get(path[len('/static/'):])
+        return self.index.get(path[1:])
+
+    def __call__(self, environ, start_response):
+        if environ.get('REQUEST_METHOD') in ('GET', 'HEAD'):
+            asset = self.lookup(environ.get('PATH_INFO', ''))
+            if asset is not None:
+                return self.serve(asset, environ, start_response)
+        return self.app(environ, start_response)
+
+    def serve(self, asset, environ, start_response):
+        body, encoding, etag = asset.body, None, asset.etag
+        accepted = _accepted_encodings(environ.get('HTTP_ACCEPT_ENCODING', ''))
+        if asset.br is not None and 'br' in accepted:
+            body, encoding, etag = asset.br, 'br', etag + '-br'
+        elif asset.gzip is not None and ('gzip' in accepted or 'x-gzip' in accepted):
+            body, encoding, etag = asset.gzip, 'gzip', etag + '-gz'
+        etag = f'"{etag}"'
+
+        headers = [('ETag', etag), ('Cache-Control', asset.cache_control), *SECURITY_HEADERS]
+        if asset.gzip is not None or asset.br is not None:
+            headers.append(('Vary', 'Accept-Encoding'))
+
+        if_none_match = environ.get('HTTP_IF_NONE_MATCH')
+        if if_none_match:
+            tags = {t.strip().removeprefix('W/') for t in if_none_match.split(',')}
+            if '*' in tags or etag in tags:
+                start_response('304 Not Modified', headers)
+                return [b'']
+
+        headers += [('Content-Type', asset.content_type), ('Content-Length', str(len(body)))]
+        if encoding:
+            headers.append(('Content-Encoding', encoding))
+        start_response('200 OK', headers)
+        if environ['REQUEST_METHOD'] == 'HEAD':
+            return [b'']
+        return [body]
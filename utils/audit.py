@@ -1,9 +1,16 @@
 import json
+import time
+import threading
+from datetime import datetime
 from flask import session
+from sqlalchemy import event, or_, and_
+from sqlalchemy.orm import Session
 from models.audit import AuditLog
+from config import config
 
 def log_action(db, action, entity=None, entity_id=None, meta=None):
     """Log an admin action. Reads user_id from flask session."""
+    db.info.setdefault('audit_actions', set()).add(action)
     log = AuditLog(
         user_id=session.get('uid'),
         action=action,
@@ -12,3 +19,94 @@ def log_action(db, action, entity=None, entity_id=None, meta=None):
         meta=json.dumps(meta, default=str) if meta else None
     )
     db.add(log)
+
+# ============================================================================
+# KEYSET PAGINATION HELPERS
+# ============================================================================
+
+def encode_cursor(log):
+    """Encode an audit row position as an opaque ``<created_at>_<id>`` cursor."""
+    return f"{log.created_at.isoformat()}_{log.id}"
+
+def decode_cursor(cursor):
+    """Decode a cursor from ``encode_cursor``. Returns ``(created_at, id)`` or None."""
+    if not cursor:
+        return None
+    try:
+        ts, log_id = cursor.rsplit('_', 1)
+        return datetime.fromisoformat(ts), int(log_id)
+    except ValueError:
+        return None
+
+def older_than(position):
+    """Filter for rows strictly after ``position`` in (created_at, id) DESC order."""
+    created_at, log_id = position
+    return or_(AuditLog.created_at < created_at,
+               and_(AuditLog.created_at == created_at, AuditLog.id < log_id))
+
+def newer_than(position):
+    """Filter for rows strictly before ``position`` in (created_at, id) DESC order."""
+    created_at, log_id = position
+    return or_(AuditLog.created_at > created_at,
+               and_(AuditLog.created_at == created_at, AuditLog.id > log_id))
+
+# Cached row totals per action filter ('' = all). A full COUNT(*) over
+# audit_logs is only run once per AUDIT_COUNT_TTL seconds per filter.
+_count_cache = {}
+_count_lock = threading.Lock()
+
+def cached_count(db, action=''):
+    """Return an approximate (cached) number of audit rows for ``action``.
+
+    Returns None when AUDIT_COUNT_TTL is 0 (totals disabled).
+    """
+    ttl = config.AUDIT_COUNT_TTL
+    if ttl <= 0:
+        return None
+    now = time.monotonic()
+    with _count_lock:
+        hit = _count_cache.get(action)
+    if hit and hit[0] > now:
+        return hit[1]
+    query = db.query(AuditLog)
+    if action:
+        query = query.filter(AuditLog.action == action)
+    total = query.count()
+    with _count_lock:
+        _count_cache[action] = (now + ttl, total)
+    return total
+
+# Distinct action names for the /admin/audit filter dropdown. Refreshed from
+# the table at most once per AUDIT_ACTIONS_TTL seconds; actions logged with
+# log_action are added once their transaction commits, so the dropdown never
+# lags behind in this process and never shows a rolled-back action.
+_actions_cache = {'expires': 0.0, 'actions': None}
+_actions_lock = threading.Lock()
+
+def remember_action(action):
+    """Add ``action`` to the cached dropdown list if the cache is loaded."""
+    with _actions_lock:
+        actions = _actions_cache['actions']
+        if actions is not None and action not in actions:
+            _actions_cache['actions'] = sorted(actions + [action])
+
+def cached_actions(db):
+    """Return the sorted distinct audit action names, scanning the table only on expiry."""
+    now = time.monotonic()
+    with _actions_lock:
+        if _actions_cache['actions'] is not None and _actions_cache['expires'] > now:
+            return _actions_cache['actions']
+    actions = [r[0] for r in db.query(AuditLog.action).distinct().order_by(AuditLog.action).all()]
+    with _actions_lock:
+        _actions_cache['actions'] = actions
+        _actions_cache['expires'] = now + config.AUDIT_ACTIONS_TTL
+    return actions
+
+@event.listens_for(Session, 'after_commit')
+def _remember_committed_actions(session):
+    for action in session.info.pop('audit_actions', ()):
+        remember_action(action)
+
+@event.listens_for(Session, 'after_rollback')
+def _forget_rolled_back_actions(session):
+    session.info.pop('audit_actions', None)
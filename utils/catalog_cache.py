@@ -0,0 +1,72 @@
+"""Versioned in-process cache of the serialized exercise catalog.
+
+The catalog endpoints (``/admin/ejercicios``, ``/admin/ejercicios/organized``)
+return the whole active catalog, which changes a few times a week. Each
+worker keeps the JSON bytes per view together with a strong ETag and the
+catalog version they were built from, the ``catalog_version`` counter row.
+
+- Every ORM write to ``Ejercicio`` increments that counter in the same
+  transaction (listeners in ``models/catalog_version.py``): flushed objects
+  and bulk ``insert``/``update``/``delete`` statements such as the ones in
+  ``assign_exercise_images.py``. Writes from other processes therefore show up
+  once the counter is re-read (at most every ``CATALOG_VERSION_TTL`` seconds),
+  however close together they are.
+- Commits in this process that touch ``Ejercicio`` drop the cache immediately.
+"""
+import hashlib
+import threading
+import time
+from flask import current_app, request
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+from models import CatalogVersion
+from config import config
+
+_lock = threading.Lock()
+_entries = {}    # key -> (version, body bytes, etag)
+_version = None  # (stamp, monotonic time it was read)
+
+
+def catalog_version(db):
+    """Return the current catalog stamp, re-read at most every CATALOG_VERSION_TTL seconds."""
+    global _version
+    cached = _version
+    now = time.monotonic()
+    if cached and now - cached[1] < config.CATALOG_VERSION_TTL:
+        return cached[0]
+    stamp = str(db.query(CatalogVersion.version).filter(CatalogVersion.id == 1).scalar() or 0)
+    _version = (stamp, now)
+    return stamp
+
+
+def invalidate_catalog():
+    """Forget every cached view and the cached stamp."""
+    global _version
+    with _lock:
+        _entries.clear()
+        _version = None
+
+
+def cached_catalog_response(db, key, build):
+    """JSON response for the catalog view ``key``, built by ``build(db)`` on a miss.
+
+    Answers ``If-None-Match`` with 304 when the client already has this version.
+    """
+    version = catalog_version(db)
+    entry = _entries.get(key)
+    if entry is None or entry[0] != version:
+        body = current_app.json.dumps(build(db)).encode('utf-8')
+        entry = (version, body, hashlib.sha256(body).hexdigest()[:32])
+        with _lock:
+            _entries[key] = entry
+    _, body, etag = entry
+    response = current_app.response_class(body, mimetype='application/json')
+    response.set_etag(etag)
+    response.headers['Cache-Control'] = 'private, no-cache'  # revalidate, answered with 304
+    return response.make_conditional(request)
+
+
+@event.listens_for(Session, 'after_commit')
+def _invalidate_on_commit(session):
+    if session.info.pop('catalog_dirty', False):
+        invalidate_catalog()
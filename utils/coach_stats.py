@@ -0,0 +1,36 @@
+"""Aggregate per-coach statistics (routines created, distinct active members).
+
+Computed for every coach in a single GROUP BY so admin pages and dashboards
+don't issue two COUNT queries per coach.
+"""
+from sqlalchemy import func, case, distinct
+from models import Rutina, RutinaUser
+
+
+def get_coach_stats(db, coach_ids=None):
+    """Return ``{coach_id: {'rutinas_count': int, 'users_count': int}}``.
+
+    ``users_count`` counts distinct members with an active assignment to any
+    routine created by the coach. Coaches without routines are absent from
+    the result; use ``EMPTY_STATS`` as the default when looking them up.
+    """
+    query = db.query(
+        Rutina.created_by_coach_id,
+        func.count(distinct(Rutina.id)),
+        func.count(distinct(case((RutinaUser.is_active == True, RutinaUser.user_id))))
+    ).outerjoin(
+        RutinaUser, RutinaUser.rutina_id == Rutina.id
+    ).group_by(Rutina.created_by_coach_id)
+
+    if coach_ids is not None:
+        if not coach_ids:
+            return {}
+        query = query.filter(Rutina.created_by_coach_id.in_(list(coach_ids)))
+
+    return {
+        coach_id: {'rutinas_count': rutinas_count, 'users_count': users_count}
+        for coach_id, rutinas_count, users_count in query.all()
+    }
+
+
+EMPTY_STATS = {'rutinas_count': 0, 'users_count': 0}
@@ -0,0 +1,70 @@
+"""Ranked, accent-insensitive search over the exercise catalog.
+
+Queries run against ``Ejercicio.search_key`` (the folded name, see
+``utils.text.fold_text``) through the full-text index created with the table:
+an FTS5 table on SQLite and a FULLTEXT index on MySQL, with every query term
+matched as a word prefix ("press banc" finds "Press de Banca"). On MySQL,
+terms the FULLTEXT index cannot hold (shorter than ``MYSQL_MIN_TOKEN`` or
+stopwords) are left out of the MATCH; short ones are then checked with LIKE
+on the rows it returned. Only a query with no indexable term, and other
+databases, fall back to LIKE on the indexed column.
+"""
+from sqlalchemy import or_, text, table, column
+from models import Ejercicio, BodySection
+from utils.text import fold_text
+
+MAX_LIMIT = 50
+MYSQL_MIN_TOKEN = 3  # innodb_ft_min_token_size
+# InnoDB's default full-text stopword list; these terms never match in a FULLTEXT query
+MYSQL_STOPWORDS = frozenset((
+    'a about an are as at be by com de en for from how i in is it la of on or that the this to was what when '
+    'where who will with und www'
+).split())
+
+ejercicios_fts = table('ejercicios_fts', column('rowid'))
+
+
+def search_query(db, q, body_section=None):
+    """Query for every active exercise matching ``q``, best match first.
+
+    An empty query lists the (optionally section-filtered) catalog by name.
+    """
+    terms = fold_text(q).split()
+    query = db.query(Ejercicio).filter(Ejercicio.is_active == True)
+    if body_section and body_section in BodySection.__members__:
+        query = query.filter(Ejercicio.body_section == BodySection(body_section))
+
+    dialect = db.get_bind().dialect.name
+    indexed = [t for t in terms if len(t) >= MYSQL_MIN_TOKEN and t not in MYSQL_STOPWORDS]
+    if not terms:
+        return query.order_by(Ejercicio.name)
+    if dialect == 'sqlite':
+        return query.join(ejercicios_fts, ejercicios_fts.c.rowid == Ejercicio.id).filter(
+            text("ejercicios_fts MATCH :match")
+        ).params(match=' '.join(f'"{t}"*' for t in terms)).order_by(
+            text("bm25(ejercicios_fts)"), Ejercicio.name
+        )
+    if dialect == 'mysql' and indexed:
+        query = query.filter(
+            text("MATCH(ejercicios.search_key) AGAINST (:against IN BOOLEAN MODE)")
+        ).params(against=' '.join(f'+{t}*' for t in indexed))
+        # Short terms can't go in the FULLTEXT query; check them on the rows it found
+        for t in terms:
+            if t not in indexed and t not in MYSQL_STOPWORDS:
+                query = query.filter(_prefix_match(t))
+        return query.order_by(
+            text("MATCH(ejercicios.search_key) AGAINST (:against IN BOOLEAN MODE) DESC"), Ejercicio.name
+        )
+    for t in terms:
+        query = query.filter(_prefix_match(t))
+    return query.order_by(Ejercicio.search_key.like(f'{terms[0]}%').desc(), Ejercicio.name)
+
+
+def _prefix_match(term):
+    return or_(Ejercicio.search_key.like(f'{term}%'), Ejercicio.search_key.like(f'% {term}%'))
+
+
+def search_ejercicios(db, q, body_section=None, limit=20, offset=0):
+    """Return ``(ejercicios, has_more)`` for one page of ``search_query`` results."""
+    rows = search_query(db, q, body_section).offset(offset).limit(limit + 1).all()
+    return rows[:limit], len(rows) > limit
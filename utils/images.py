@@ -0,0 +1,52 @@
+"""Responsive image variants built by ``build_images.py``.
+
+Exercise and carousel images are resized to a few WebP widths under
+``static/variants/``; ``manifest.json`` there maps each source (path relative
+to ``static/``) to its variants. :func:`image_srcset` turns an ``image_url``
+into a ``srcset`` string, or ``''`` when no variants exist so callers can
+keep the plain ``src``.
+"""
+import json
+import os
+from utils.assets import STATIC_DIR
+
+VARIANTS_DIR = 'variants'  # relative to STATIC_DIR
+MANIFEST_NAME = 'manifest.json'
+
+
+def load_image_manifest(static_dir=STATIC_DIR):
+    """Return ``{source path: {'hash', 'width', 'height', 'variants'}}``."""
+    try:
+        with open(os.path.join(static_dir, VARIANTS_DIR, MANIFEST_NAME), encoding='utf-8') as fh:
+            return json.load(fh)
+    except (OSError, ValueError):
+        return {}
+
+
+_manifest = None
+
+
+def _static_path(url):
+    """``/static/images/x.png`` -> ``images/x.png``; None for external URLs."""
+    if not url or '://' in url or url.startswith('data:'):
+        return None
+    path = url.split('?', 1)[0].lstrip('/')
+    if path.startswith('static/'):
+        path = path[len('static/'):]
+    return path
+
+
+def image_variants(url):
+    """``[(width, url), ...]`` ascending by width, empty if not built."""
+    global _manifest
+    if _manifest is None:
+        _manifest = load_image_manifest()
+    entry = _manifest.get(_static_path(url))
+    if not entry:
+        return []
+    return [(width, f"/static/{path}") for width, path in entry['variants']]
+
+
+def image_srcset(url):
+    """``srcset`` value for ``url`` (``'/static/variants/...96w.webp 96w, ...'``)."""
+    return ', '.join(f"{variant} {width}w" for width, variant in image_variants(url))
@@ -0,0 +1,131 @@
+"""MailerSend client and email templates, shared by every email path.
+
+One ``MailService`` per worker process keeps a pooled ``requests.Session``
+(keep-alive connections to the MailerSend API) instead of building a new
+client per message. Bodies are rendered from ``templates/email/``, compiled
+once at import into a standalone Jinja environment so the delivery worker
+can render without a Flask app context.
+"""
+import json
+import os
+import re
+import threading
+import requests
+from requests.adapters import HTTPAdapter
+from jinja2 import Environment, FileSystemLoader, select_autoescape
+from config import config
+from utils.request_timing import timed
+
+MAILERSEND_API_URL = config.MAILERSEND_API_URL
+BULK_CHUNK_SIZE = 500  # MailerSend bulk-email limit per request
+
+TEMPLATE_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'templates', 'email')
+
+_env = Environment(
+    loader=FileSystemLoader(TEMPLATE_DIR),
+    autoescape=select_autoescape(['html']),
+    auto_reload=False,
+)
+# Compile every template up front; get_template afterwards is a dict lookup
+_templates = {name: _env.get_template(name) for name in _env.list_templates(extensions=['html'])}
+
+
+class MailDeliveryError(Exception):
+    """Raised when MailerSend rejects a message or cannot be reached."""
+
+
+def render_email(template_name, **context):
+    """Render ``templates/email/<template_name>`` with ``context``."""
+    context.setdefault('base_url', config.APP_BASE_URL)
+    template = _templates.get(template_name) or _env.get_template(template_name)
+    return template.render(**context)
+
+
+def build_message(to_email, subject, html, to_name=None, reply_to=None, from_name=None):
+    """Build a MailerSend email payload."""
+    payload = {
+        'from': {'email': config.MAIL_FROM_EMAIL, 'name': from_name or config.MAIL_FROM_NAME},
+        'to': [{'email': to_email, 'name': to_name or to_email}],
+        'subject': subject,
+        'html': html,
+    }
+    if reply_to and reply_to.get('email'):
+        payload['reply_to'] = {'email': reply_to['email'], 'name': reply_to.get('name') or reply_to['email']}
+    return payload
+
+
+class MailService:
+    def __init__(self, api_key, timeout=None):
+        self.api_key = api_key
+        self.timeout = timeout or config.MAIL_HTTP_TIMEOUT
+        self.session = requests.Session()
+        self.session.headers.update({
+            'Authorization': f'Bearer {api_key}',
+            'Content-Type': 'application/json',
+            'X-Requested-With': 'XMLHttpRequest',
+        })
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=config.MAIL_HTTP_POOL_SIZE)
+        self.session.mount('https://', adapter)
+
+    def _request(self, method, path, body=None):
+        try:
+            with timed('mail'):
+                response = self.session.request(method, f'{MAILERSEND_API_URL}/{path}', json=body,
+                                                timeout=self.timeout)
+        except requests.RequestException as e:
+            raise MailDeliveryError(str(e)) from e
+        if response.status_code not in (200, 202):
+            raise MailDeliveryError(f'{response.status_code}: {response.text[:500]}')
+        return response
+
+    def send(self, payload):
+        """Send one message built with ``build_message`` (transactional ``/email`` endpoint)."""
+        self._request('POST', 'email', payload)
+
+    def send_bulk(self, payloads):
+        """Send up to ``BULK_CHUNK_SIZE`` messages in one ``/bulk-email`` request.
+
+        MailerSend only queues them: returns the ``bulk_email_id`` to check
+        with ``bulk_status`` before treating any of them as delivered.
+        """
+        if len(payloads) > BULK_CHUNK_SIZE:
+            raise ValueError(f'At most {BULK_CHUNK_SIZE} messages per bulk request')
+        response = self._request('POST', 'bulk-email', payloads)
+        try:
+            bulk_email_id = response.json().get('bulk_email_id')
+        except ValueError:
+            bulk_email_id = None
+        if not bulk_email_id:
+            raise MailDeliveryError(f'bulk-email accepted without a bulk_email_id: {response.text[:500]}')
+        return bulk_email_id
+
+    def bulk_status(self, bulk_email_id):
+        """``(state, rejected)`` of a bulk request.
+
+        ``state`` is MailerSend's ``queued`` / ``processing`` / ``completed`` /
+        ``failed``; ``rejected`` maps the position of each message in the
+        request to the reason it was not sent (validation errors and
+        suppressed recipients).
+        """
+        data = self._request('GET', f'bulk-email/{bulk_email_id}').json().get('data') or {}
+        rejected = {}
+        for source in ('validation_errors', 'suppressed_recipients'):
+            for key, detail in (data.get(source) or {}).items():
+                # Keys look like "message.3" or "message.3.to.0.email"
+                match = re.match(r'message\.(\d+)', key)
+                if match:
+                    rejected.setdefault(int(match.group(1)), f'{source}: {json.dumps(detail)[:500]}')
+        return data.get('state'), rejected
+
+_service = None
+_service_pid = None
+_service_lock = threading.Lock()
+
+def get_mail_service():
+    """Process-wide MailService (rebuilt after fork so sessions aren't shared)."""
+    global _service, _service_pid
+    with _service_lock:
+        if _service is None or _service_pid != os.getpid():
+            _service = MailService(config.MAILERSEND_API_KEY)
+            _service_pid = os.getpid()
+        return _service
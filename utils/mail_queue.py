@@ -0,0 +1,413 @@
+"""Table-backed outbound email queue.
+
+Requests only call ``enqueue_email`` inside their own transaction and return.
+A background worker (one daemon thread per process, or a standalone process
+via ``python -m utils.mail_queue``) delivers due rows from ``email_outbox``
+through the configured transport, retrying failures with exponential backoff.
+
+Transports:
+- ``mailersend``: MailerSend API via ``utils.mail`` (default when MAILERSEND_API_KEY is set)
+- ``console``: logs the message instead of sending it (local development)
+- ``stub``: keeps sent messages in memory (tests)
+
+Contact, password-reset and single invitation emails always go one by one
+through the transactional ``/email`` endpoint. Only rows queued by
+``enqueue_many`` (bulk invitation imports) are grouped into ``/bulk-email``
+requests. That endpoint merely queues them: each chunk's rows become
+``accepted`` with its ``bulk_email_id``, and the worker polls the bulk status
+until MailerSend reports it completed, marking each row sent or failed from
+the per-message errors. A chunk that fails to submit only retries its own rows.
+"""
+import os
+import time
+import logging
+import threading
+from datetime import datetime, timedelta
+from sqlalchemy import event, insert, or_, and_
+from sqlalchemy.orm import Session
+from db import SessionLocal
+from models import EmailOutbox, EmailStatus
+from config import config
+from utils.mail import BULK_CHUNK_SIZE, MailDeliveryError, build_message, get_mail_service
+from utils.metrics import EMAIL_SEND_SECONDS, EMAILS_SENT, EMAIL_FAILURES
+
+logger = logging.getLogger("urbanmood.mail")
+
+
+# ============================================================================
+# TRANSPORTS
+# ============================================================================
+
+def _payload(msg):
+    reply_to = {"name": msg.reply_to_name, "email": msg.reply_to_email} if msg.reply_to_email else None
+    return build_message(msg.to_email, msg.subject, msg.html, to_name=msg.to_name,
+                         reply_to=reply_to, from_name=msg.from_name)
+
+
+class MailerSendTransport:
+    def send(self, msg):
+        get_mail_service().send(_payload(msg))
+
+    def send_batch(self, msgs):
+        """Submit one bulk chunk; returns its ``bulk_email_id``."""
+        return get_mail_service().send_bulk([_payload(m) for m in msgs])
+
+    def bulk_status(self, bulk_email_id):
+        return get_mail_service().bulk_status(bulk_email_id)
+
+
+class ConsoleTransport:
+    def send(self, msg):
+        logger.info("[EMAIL] to=%s subject=%r\n%s", msg.to_email, msg.subject, msg.html)
+
+
+class StubTransport:
+    """In-memory transport for tests.
+
+    Set ``fail_next`` to simulate provider errors, and add addresses to
+    ``reject`` to have bulk status checks report them as not delivered.
+    """
+
+    def __init__(self):
+        self.sent = []
+        self.batches = {}
+        self.fail_next = 0
+        self.reject = set()
+        self.pending_states = 0  # status checks answering 'processing' before 'completed'
+
+    def send_batch(self, msgs):
+        if self.fail_next:
+            self.fail_next -= 1
+            raise MailDeliveryError("stub failure")
+        bulk_email_id = f'stub-{len(self.batches) + 1}'
+        self.batches[bulk_email_id] = [m.to_email for m in msgs]
+        for msg in msgs:
+            self._record(msg)
+        return bulk_email_id
+
+    def bulk_status(self, bulk_email_id):
+        if self.pending_states:
+            self.pending_states -= 1
+            return 'processing', {}
+        emails = self.batches[bulk_email_id]
+        return 'completed', {i: 'rejected by stub' for i, email in enumerate(emails) if email in self.reject}
+
+    def send(self, msg):
+        if self.fail_next:
+            self.fail_next -= 1
+            raise MailDeliveryError("stub failure")
+        self._record(msg)
+
+    def _record(self, msg):
+        self.sent.append({
+            'to_email': msg.to_email,
+            'subject': msg.subject,
+            'html': msg.html,
+            'reply_to_email': msg.reply_to_email,
+            'kind': msg.kind,
+        })
+
+
+TRANSPORTS = {
+    'mailersend': MailerSendTransport,
+    'console': ConsoleTransport,
+    'stub': StubTransport,
+}
+
+_transport = None
+
+def get_transport():
+    global _transport
+    if _transport is None:
+        _transport = TRANSPORTS[config.MAIL_TRANSPORT]()
+    return _transport
+
+def set_transport(transport):
+    """Replace the process-wide transport (e.g. with a StubTransport in tests)."""
+    global _transport
+    _transport = transport
+
+# ============================================================================
+# ENQUEUE
+# ============================================================================
+
+def enqueue_email(db, to_email, subject, html, to_name=None, reply_to=None, from_name=None, kind=None):
+    """Add a message to the outbox in the caller's transaction.
+
+    Nothing is sent until the caller commits; the worker is woken up then.
+    ``reply_to`` is an optional ``{"name": ..., "email": ...}`` dict.
+    """
+    msg = EmailOutbox(
+        to_email=to_email,
+        to_name=to_name,
+        from_name=from_name,
+        reply_to_email=(reply_to or {}).get('email'),
+        reply_to_name=(reply_to or {}).get('name'),
+        subject=subject,
+        html=html,
+        kind=kind,
+        status=EmailStatus.pending,
+        next_attempt_at=datetime.utcnow()
+    )
+    db.add(msg)
+    db.info['mail_enqueued'] = True
+    return msg
+
+def enqueue_many(db, messages):
+    """Queue many messages with a single executemany INSERT (bulk invitations).
+
+    ``messages`` are dicts with ``to_email``, ``subject`` and ``html`` plus
+    any of the optional ``enqueue_email`` fields. The rows are marked
+    ``bulk`` so the worker may send them through ``/bulk-email``.
+    """
+    if not messages:
+        return
+    now = datetime.utcnow()
+    db.execute(insert(EmailOutbox), [
+        {
+            'to_email': m['to_email'],
+            'to_name': m.get('to_name'),
+            'from_name': m.get('from_name'),
+            'reply_to_email': (m.get('reply_to') or {}).get('email'),
+            'reply_to_name': (m.get('reply_to') or {}).get('name'),
+            'subject': m['subject'],
+            'html': m['html'],
+            'kind': m.get('kind'),
+            'bulk': True,
+            'status': EmailStatus.pending,
+            'attempts': 0,
+            'next_attempt_at': now,
+            'created_at': now,
+        }
+        for m in messages
+    ])
+    db.info['mail_enqueued'] = True
+
+@event.listens_for(Session, 'after_commit')
+def _wake_worker_after_commit(session):
+    if session.info.pop('mail_enqueued', False):
+        _wakeup.set()
+
+@event.listens_for(Session, 'after_rollback')
+def _forget_enqueued(session):
+    session.info.pop('mail_enqueued', None)
+
+# ============================================================================
+# DELIVERY
+# ============================================================================
+
+def retry_delay(attempts):
+    """Backoff before the next attempt: base * 2^(attempts-1), capped."""
+    delay = config.MAIL_RETRY_BASE_DELAY * (2 ** max(attempts - 1, 0))
+    return timedelta(seconds=min(delay, config.MAIL_RETRY_MAX_DELAY))
+
+def _claim(db, msg_id, now):
+    """Atomically mark a due row as 'sending'. Returns False if another worker got it."""
+    stale = now - timedelta(seconds=config.MAIL_STALE_LOCK)
+    claimed = db.query(EmailOutbox).filter(
+        EmailOutbox.id == msg_id,
+        or_(
+            and_(EmailOutbox.status == EmailStatus.pending, EmailOutbox.next_attempt_at <= now),
+            and_(EmailOutbox.status == EmailStatus.sending, EmailOutbox.locked_at < stale)
+        )
+    ).update({
+        'status': EmailStatus.sending,
+        'locked_at': now,
+        'attempts': EmailOutbox.attempts + 1
+    }, synchronize_session=False)
+    db.commit()
+    return claimed == 1
+
+def _deliver(transport, msgs):
+    """Send ``msgs``; returns ``(errors, accepted)``.
+
+    ``errors`` maps the id of each message sent directly, or of each message
+    in a bulk chunk that could not be submitted, to the exception or None.
+    ``accepted`` maps the ids of bulk rows MailerSend queued to their
+    ``bulk_email_id``. Only ``bulk`` rows use the batch send, one request
+    per ``BULK_CHUNK_SIZE`` chunk; everything else goes one by one.
+    """
+    name = type(transport).__name__
+    errors, accepted = {}, {}
+    bulk = [m for m in msgs if m.bulk]
+    if len(bulk) > 1 and hasattr(transport, 'send_batch'):
+        single = [m for m in msgs if not m.bulk]
+    else:
+        bulk, single = [], msgs
+    for i in range(0, len(bulk), BULK_CHUNK_SIZE):
+        chunk = bulk[i:i + BULK_CHUNK_SIZE]
+        try:
+            with EMAIL_SEND_SECONDS.labels(name).time():
+                bulk_email_id = transport.send_batch(chunk)
+        except Exception as e:
+            EMAIL_FAILURES.labels(name).inc(len(chunk))
+            errors.update({m.id: e for m in chunk})
+            continue
+        accepted.update({m.id: bulk_email_id for m in chunk})
+    for m in single:
+        try:
+            with EMAIL_SEND_SECONDS.labels(name).time():
+                transport.send(m)
+            EMAILS_SENT.labels(name).inc()
+            errors[m.id] = None
+        except Exception as e:
+            EMAIL_FAILURES.labels(name).inc()
+            errors[m.id] = e
+    return errors, accepted
+
+def _mark_sent(msg):
+    msg.status = EmailStatus.sent
+    msg.sent_at = datetime.utcnow()
+    msg.last_error = None
+
+def _mark_failed_attempt(msg, error):
+    """Schedule a retry, or give up once ``MAIL_MAX_ATTEMPTS`` is reached."""
+    msg.last_error = str(error)[:2000]
+    if msg.attempts >= config.MAIL_MAX_ATTEMPTS:
+        msg.status = EmailStatus.failed
+        logger.error("Giving up on email %s (%s) after %d attempts: %s", msg.id, msg.kind, msg.attempts, error)
+    else:
+        msg.status = EmailStatus.pending
+        msg.next_attempt_at = datetime.utcnow() + retry_delay(msg.attempts)
+        logger.warning("Email %s (%s) failed (attempt %d), retrying at %s: %s",
+                       msg.id, msg.kind, msg.attempts, msg.next_attempt_at, error)
+
+def process_due(limit=None):
+    """Deliver up to ``limit`` due messages. Returns the number processed."""
+    limit = limit or config.MAIL_BATCH_SIZE
+    now = datetime.utcnow()
+    stale = now - timedelta(seconds=config.MAIL_STALE_LOCK)
+    transport = get_transport()
+    with SessionLocal() as db:
+        due_ids = [row[0] for row in db.query(EmailOutbox.id).filter(
+            or_(
+                and_(EmailOutbox.status == EmailStatus.pending, EmailOutbox.next_attempt_at <= now),
+                and_(EmailOutbox.status == EmailStatus.sending, EmailOutbox.locked_at < stale)
+            )
+        ).order_by(EmailOutbox.next_attempt_at, EmailOutbox.id).limit(limit).all()]
+
+        claimed_ids = [msg_id for msg_id in due_ids if _claim(db, msg_id, now)]
+        if not claimed_ids:
+            return 0
+        # Ordered by id: a bulk chunk's rows keep the positions MailerSend reports errors by
+        msgs = db.query(EmailOutbox).filter(EmailOutbox.id.in_(claimed_ids)).order_by(
+            EmailOutbox.id).populate_existing().all()
+
+        errors, accepted = _deliver(transport, msgs)
+        for msg in msgs:
+            if msg.id in accepted:
+                msg.status = EmailStatus.accepted
+                msg.bulk_email_id = accepted[msg.id]
+                msg.next_attempt_at = datetime.utcnow() + timedelta(seconds=config.MAIL_BULK_POLL_INTERVAL)
+                msg.last_error = None
+            elif errors.get(msg.id) is not None:
+                _mark_failed_attempt(msg, errors[msg.id])
+            else:
+                _mark_sent(msg)
+            msg.locked_at = None
+        db.commit()
+        return len(msgs)
+
+def check_bulk_status(limit=None):
+    """Resolve ``accepted`` rows whose bulk request is due for a status check.
+
+    Completed requests mark each row sent, or failed (without retry) when
+    MailerSend rejected that recipient; failed requests send their rows back
+    to the retry schedule. Returns the number of rows resolved.
+    """
+    now = datetime.utcnow()
+    transport = get_transport()
+    name = type(transport).__name__
+    resolved = 0
+    with SessionLocal() as db:
+        bulk_ids = [row[0] for row in db.query(EmailOutbox.bulk_email_id).filter(
+            EmailOutbox.status == EmailStatus.accepted, EmailOutbox.next_attempt_at <= now
+        ).distinct().limit(limit or config.MAIL_BATCH_SIZE).all()]
+        for bulk_email_id in bulk_ids:
+            # Push the next check out first, so other workers skip this request
+            claimed = db.query(EmailOutbox).filter(
+                EmailOutbox.bulk_email_id == bulk_email_id,
+                EmailOutbox.status == EmailStatus.accepted,
+                EmailOutbox.next_attempt_at <= now
+            ).update({'next_attempt_at': now + timedelta(seconds=config.MAIL_BULK_POLL_INTERVAL)},
+                     synchronize_session=False)
+            db.commit()
+            if not claimed:
+                continue
+            try:
+                state, rejected = transport.bulk_status(bulk_email_id)
+            except Exception as e:
+                logger.warning("Could not check bulk email %s, will retry: %s", bulk_email_id, e)
+                continue
+            if state not in ('completed', 'failed'):
+                continue  # queued / processing
+            rows = db.query(EmailOutbox).filter(
+                EmailOutbox.bulk_email_id == bulk_email_id, EmailOutbox.status == EmailStatus.accepted
+            ).order_by(EmailOutbox.id).all()
+            for position, msg in enumerate(rows):
+                if state == 'failed':
+                    msg.bulk_email_id = None
+                    _mark_failed_attempt(msg, MailDeliveryError(f"bulk email {bulk_email_id} failed"))
+                elif position in rejected:
+                    msg.status = EmailStatus.failed
+                    msg.last_error = rejected[position][:2000]
+                    EMAIL_FAILURES.labels(name).inc()
+                    logger.error("Email %s (%s) to %s rejected in bulk %s: %s",
+                                 msg.id, msg.kind, msg.to_email, bulk_email_id, rejected[position])
+                else:
+                    _mark_sent(msg)
+                    EMAILS_SENT.labels(name).inc()
+            if state == 'failed':
+                EMAIL_FAILURES.labels(name).inc(len(rows))
+            db.commit()
+            resolved += len(rows)
+    return resolved
+
+def drain(max_rounds=100):
+    """Process due messages and bulk status checks until none are left (tests / CLI).
+
+    Returns the total processed.
+    """
+    total = 0
+    for _ in range(max_rounds):
+        n = process_due() + check_bulk_status()
+        if not n:
+            break
+        total += n
+    return total
+
+# ============================================================================
+# WORKER
+# ============================================================================
+
+_wakeup = threading.Event()
+_worker = None
+_worker_pid = None
+_worker_lock = threading.Lock()
+
+def _run_worker():
+    while True:
+        try:
+            busy = process_due() + check_bulk_status()
+        except Exception:
+            logger.exception("Email worker iteration failed")
+            busy = 0
+        if not busy:
+            _wakeup.wait(config.MAIL_QUEUE_POLL_INTERVAL)
+            _wakeup.clear()
+
+def start_worker():
+    """Start the delivery thread for this process (idempotent, fork-aware)."""
+    global _worker, _worker_pid
+    with _worker_lock:
+        if _worker is not None and _worker.is_alive() and _worker_pid == os.getpid():
+            return _worker
+        _worker = threading.Thread(target=_run_worker, name='mail-worker', daemon=True)
+        _worker_pid = os.getpid()
+        _worker.start()
+        return _worker
+
+if __name__ == '__main__':
+    logging.basicConfig(level=os.getenv("LOG_LEVEL", "INFO"), format='%(asctime)s %(levelname)s %(name)s %(message)s')
+    logger.info("Email worker running (transport=%s)", config.MAIL_TRANSPORT)
+    _run_worker()
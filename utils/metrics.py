@@ -0,0 +1,129 @@
+"""Prometheus metrics for the web workers, served on ``/metrics``.
+
+Under gunicorn every worker process writes its samples to
+``PROMETHEUS_MULTIPROC_DIR`` (see ``gunicorn.conf.py``, which also clears the
+directory on start and drops the files of dead workers), and a scrape of any
+worker aggregates all of them. Without that variable the metrics are those
+of the current process, which is what the development server wants.
+
+Sources:
+- HTTP latency, in-flight requests and DB queries per request: request hooks
+  from ``utils.request_timing``
+- DB statement duration and bcrypt time: ``utils.request_timing`` listeners
+- Pool checkout wait and timeouts: ``db.TimedQueuePool``
+- Email latency and failures: ``utils.mail_queue`` delivery
+- Thread capacity: set per worker by ``gunicorn.conf.py``; saturation is
+  ``urbanmood_http_requests_in_progress / urbanmood_worker_threads``
+
+``/metrics`` answers loopback clients, or others presenting
+``Authorization: Bearer <METRICS_TOKEN>``.
+"""
+import hmac
+import os
+from flask import request, jsonify, Response
+from config import config
+from utils import request_timing
+
+if os.getenv('PROMETHEUS_MULTIPROC_DIR'):
+    os.makedirs(os.environ['PROMETHEUS_MULTIPROC_DIR'], exist_ok=True)
+
+from prometheus_client import (CONTENT_TYPE_LATEST, REGISTRY, CollectorRegistry, Counter, Gauge,
+                               Histogram, generate_latest, multiprocess)
+
+LOCAL_ADDRS = ('127.0.0.1', '::1')
+
+REQUEST_SECONDS = Histogram(
+    'urbanmood_http_request_duration_seconds', 'Request latency by endpoint',
+    ['blueprint', 'endpoint', 'method', 'status'],
+    buckets=(.005, .01, .025, .05, .1, .25, .5, 1, 2.5, 5, 10),
+)
+REQUESTS_IN_PROGRESS = Gauge(
+    'urbanmood_http_requests_in_progress', 'Requests being handled right now', multiprocess_mode='livesum',
+)
+WORKER_THREADS = Gauge(
+    'urbanmood_worker_threads', 'Request threads available across live workers', multiprocess_mode='livesum',
+)
+DB_QUERIES_PER_REQUEST = Histogram(
+    'urbanmood_db_queries_per_request', 'SQL statements executed per request',
+    ['blueprint', 'endpoint'],
+    buckets=(0, 1, 2, 3, 5, 8, 13, 21, 34, 55, 89),
+)
+DB_QUERY_SECONDS = Histogram(
+    'urbanmood_db_query_duration_seconds', 'SQL statement duration',
+    buckets=(.0005, .001, .0025, .005, .01, .025, .05, .1, .25, .5, 1, 2.5),
+)
+DB_POOL_WAIT_SECONDS = Histogram(
+    'urbanmood_db_pool_checkout_wait_seconds', 'Time waiting for a pooled connection',
+    buckets=(.0001, .0005, .001, .005, .01, .05, .1, .5, 1, 2.5, 5, 10),
+)
+DB_POOL_TIMEOUTS = Counter('urbanmood_db_pool_timeouts', 'Pool checkouts that timed out')
+BCRYPT_SECONDS = Histogram(
+    'urbanmood_bcrypt_seconds', 'bcrypt hash / verify time',
+    buckets=(.05, .1, .2, .3, .5, .75, 1, 2, 5),
+)
+EMAIL_SEND_SECONDS = Histogram(
+    'urbanmood_email_send_duration_seconds', 'Email transport call latency (one message or one batch)',
+    ['transport'],
+    buckets=(.05, .1, .25, .5, 1, 2.5, 5, 10, 30),
+)
+EMAILS_SENT = Counter('urbanmood_emails_sent', 'Messages delivered', ['transport'])
+EMAIL_FAILURES = Counter('urbanmood_email_failures', 'Messages whose delivery attempt failed', ['transport'])
+
+
+def _route_labels():
+    return request.blueprint or 'app', request.endpoint or 'unmatched'
+
+
+def _on_sample(category, seconds):
+    if category == 'sql':
+        DB_QUERY_SECONDS.observe(seconds)
+    elif category == 'hash':
+        BCRYPT_SECONDS.observe(seconds)
+
+
+def _on_request_finished(timings, status):
+    blueprint, endpoint = _route_labels()
+    REQUEST_SECONDS.labels(blueprint, endpoint, request.method, str(status)).observe(timings.elapsed())
+    DB_QUERIES_PER_REQUEST.labels(blueprint, endpoint).observe(timings.counts['sql'])
+
+
+def _request_started():
+    REQUESTS_IN_PROGRESS.inc()
+    request.environ['urbanmood.in_progress'] = True
+
+
+def _request_done(exc):
+    if request.environ.pop('urbanmood.in_progress', False):
+        REQUESTS_IN_PROGRESS.dec()
+
+
+def _registry():
+    if os.getenv('PROMETHEUS_MULTIPROC_DIR'):
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+        return registry
+    return REGISTRY
+
+
+def metrics_response():
+    """Exposition of every metric, aggregated across worker processes."""
+    token = config.METRICS_TOKEN
+    supplied = request.headers.get('Authorization', '')
+    authorized = request.remote_addr in LOCAL_ADDRS or (
+        token and hmac.compare_digest(supplied.encode(), f'Bearer {token}'.encode())
+    )
+    if not authorized:
+        return jsonify({"success": False, "message": "No autorizado"}), 403
+    return Response(generate_latest(_registry()), mimetype=CONTENT_TYPE_LATEST)
+
+
+def init_app(app):
+    """Install the request hooks (the ``/metrics`` route itself lives in app.py).
+
+    Relies on ``utils.request_timing.init_app`` for latency and SQL counts;
+    call it right after that so in-flight requests include the other hooks.
+    """
+    app.before_request(_request_started)
+    app.teardown_request(_request_done)
+    request_timing.add_listener(_on_sample)
+    request_timing.on_request_finished(_on_request_finished)
@@ -0,0 +1,57 @@
+"""Fuzzy name matching over a character-trigram inverted index.
+
+Comparing every query with every name through ``SequenceMatcher`` is
+O(queries x names). :class:`NameIndex` only scores names that share trigrams
+with the query, and of those only the ``shortlist`` with the highest overlap,
+so the cost follows the number of plausible candidates instead of the size
+of the catalog. Scores are still ``SequenceMatcher.ratio()``, so existing
+thresholds keep their meaning.
+"""
+from collections import Counter, defaultdict
+from difflib import SequenceMatcher
+
+
+def trigrams(text):
+    """Character trigrams of ``text``, padded so short words still index."""
+    padded = f"  {text} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+class NameIndex:
+    """Inverted trigram index over ``(key, normalized name, group)`` entries."""
+
+    def __init__(self, entries, shortlist=25):
+        self.shortlist = shortlist
+        self.keys, self.names, self.groups, self.sizes = [], [], [], []
+        self.postings = defaultdict(list)
+        for key, name, group in entries:
+            pos = len(self.keys)
+            grams = trigrams(name)
+            self.keys.append(key)
+            self.names.append(name)
+            self.groups.append(group)
+            self.sizes.append(len(grams))
+            for gram in grams:
+                self.postings[gram].append(pos)
+
+    def candidates(self, text, group=None):
+        """Positions of the entries sharing the most trigrams with ``text``."""
+        grams = trigrams(text)
+        shared = Counter()
+        for gram in grams:
+            for pos in self.postings.get(gram, ()):
+                if group is None or self.groups[pos] == group:
+                    shared[pos] += 1
+        # Dice coefficient on trigram sets
+        ranked = sorted(shared, key=lambda pos: 2 * shared[pos] / (len(grams) + self.sizes[pos]), reverse=True)
+        # Score in insertion order so ties resolve like a full scan would
+        return sorted(ranked[:self.shortlist])
+
+    def best(self, text, group=None):
+        """Return ``(key, score)`` of the closest entry, ``(None, 0.0)`` if none."""
+        best_key, best_score = None, 0.0
+        for pos in self.candidates(text, group):
+            score = SequenceMatcher(None, text, self.names[pos]).ratio()
+            if score > best_score:
+                best_key, best_score = self.keys[pos], score
+        return best_key, best_score
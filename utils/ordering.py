@@ -0,0 +1,76 @@
+"""Gap-based ``orden`` for the exercises of a routine.
+
+Positions are spaced ``ORDEN_GAP`` apart, so appending or moving one exercise
+writes a single row: the new value sits between its neighbours. Only when two
+neighbours have no room left (or a full new order is submitted) is the
+routine renumbered, and that is one UPDATE ... CASE scoped to the routine.
+"""
+from sqlalchemy import case, func, update
+from models import RutinaEjercicio
+
+ORDEN_GAP = 1024
+
+
+def next_orden(db, rutina_id):
+    """``orden`` for an exercise appended at the end of the routine."""
+    current = db.query(func.max(RutinaEjercicio.orden)).filter(
+        RutinaEjercicio.rutina_id == rutina_id
+    ).scalar()
+    return ORDEN_GAP if current is None else current + ORDEN_GAP
+
+
+def routine_order(db, rutina_id):
+    """``[(id, orden)]`` of the routine's exercises in display order."""
+    return db.query(RutinaEjercicio.id, RutinaEjercicio.orden).filter(
+        RutinaEjercicio.rutina_id == rutina_id
+    ).order_by(RutinaEjercicio.orden, RutinaEjercicio.id).all()
+
+
+def renumber(db, rutina_id, ordered_ids):
+    """Write gap-spaced positions for ``ordered_ids`` in a single UPDATE."""
+    if not ordered_ids:
+        return
+    positions = {re_id: (idx + 1) * ORDEN_GAP for idx, re_id in enumerate(ordered_ids)}
+    db.execute(
+        update(RutinaEjercicio)
+        .where(RutinaEjercicio.rutina_id == rutina_id, RutinaEjercicio.id.in_(list(positions)))
+        .values(orden=case(positions, value=RutinaEjercicio.id))
+        .execution_options(synchronize_session=False)
+    )
+
+
+def move(db, rutina_id, re_id, after_id=None):
+    """Place ``re_id`` right after ``after_id`` (first when None).
+
+    Returns False if either id is not part of the routine.
+    """
+    rows = routine_order(db, rutina_id)
+    ids = [row.id for row in rows]
+    if re_id not in ids or after_id == re_id or (after_id is not None and after_id not in ids):
+        return False
+    others = [row for row in rows if row.id != re_id]
+    pos = 0 if after_id is None else [row.id for row in others].index(after_id) + 1
+
+    if not others:
+        new_orden = ORDEN_GAP
+    elif pos == 0:
+        new_orden = others[0].orden - ORDEN_GAP
+    elif pos == len(others):
+        new_orden = others[-1].orden + ORDEN_GAP
+    else:
+        lower, upper = others[pos - 1].orden, others[pos].orden
+        if upper - lower < 2:
+            # No room between the neighbours: respace the whole routine once
+            new_ids = [row.id for row in others]
+            new_ids.insert(pos, re_id)
+            renumber(db, rutina_id, new_ids)
+            return True
+        new_orden = (lower + upper) // 2
+
+    db.execute(
+        update(RutinaEjercicio)
+        .where(RutinaEjercicio.id == re_id, RutinaEjercicio.rutina_id == rutina_id)
+        .values(orden=new_orden)
+        .execution_options(synchronize_session=False)
+    )
+    return True
@@ -0,0 +1,115 @@
+"""Password hashing with a configurable bcrypt cost.
+
+- ``BCRYPT_ROUNDS`` selects the cost for new hashes; hashes made with a
+  different cost are transparently upgraded on the next successful login.
+- ``verify_password`` always runs a full bcrypt check, against a dummy hash
+  when the user doesn't exist or has no password yet, so every login costs
+  the same and probing unknown emails isn't free.
+- ``PASSWORD_HASH_POOL_SIZE`` > 0 moves bcrypt into a small process pool so
+  it doesn't occupy the gthread worker threads. Only a pool that can't start
+  or has died falls back to hashing inline; a ``PASSWORD_HASH_TIMEOUT`` or an
+  error from bcrypt itself propagates, so the work is never done twice.
+"""
+import os
+import logging
+import threading
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from passlib.hash import bcrypt
+from config import config
+from utils.request_timing import timed
+
+logger = logging.getLogger("urbanmood.passwords")
+
+_hasher = bcrypt.using(rounds=config.BCRYPT_ROUNDS)
+_dummy_hash = None
+_pool = None
+_pool_pid = None
+_pool_lock = threading.Lock()
+
+
+def _hash(password, rounds):
+    return bcrypt.using(rounds=rounds).hash(password)
+
+def _verify(password, password_hash):
+    return bcrypt.verify(password, password_hash)
+
+
+def _get_pool():
+    """Process pool for bcrypt, created lazily per worker process (None if disabled)."""
+    global _pool, _pool_pid
+    if config.PASSWORD_HASH_POOL_SIZE <= 0:
+        return None
+    with _pool_lock:
+        if _pool is None or _pool_pid != os.getpid():
+            # spawn: never fork a process that is already running threads
+            _pool = ProcessPoolExecutor(max_workers=config.PASSWORD_HASH_POOL_SIZE,
+                                        mp_context=multiprocessing.get_context('spawn'))
+            _pool_pid = os.getpid()
+        return _pool
+
+def _discard_pool(pool):
+    global _pool
+    with _pool_lock:
+        if _pool is pool:
+            _pool = None
+    pool.shutdown(wait=False, cancel_futures=True)
+
+def _run(fn, *args):
+    # Recorded as 'hash' in Server-Timing and urbanmood_bcrypt_seconds
+    with timed('hash'):
+        try:
+            pool = _get_pool()
+            future = pool.submit(fn, *args) if pool is not None else None
+        except (OSError, BrokenProcessPool):
+            # Pool could not start its workers; nothing ran yet
+            logger.exception("bcrypt process pool unavailable, hashing inline")
+            pool = future = None
+        if future is None:
+            return fn(*args)
+        try:
+            return future.result(timeout=config.PASSWORD_HASH_TIMEOUT)
+        except BrokenProcessPool:
+            # A worker died mid-task; the next call starts a fresh pool
+            logger.exception("bcrypt process pool broke, hashing inline")
+            _discard_pool(pool)
+            return fn(*args)
+        except TimeoutError:
+            future.cancel()
+            raise
+
+def _get_dummy_hash():
+    """Hash to verify against when there is no real one, made on first use.
+
+    Not at import: spawn pool children import this module too.
+    """
+    global _dummy_hash
+    if _dummy_hash is None:
+        dummy = hash_password(os.urandom(16).hex())
+        with _pool_lock:
+            if _dummy_hash is None:
+                _dummy_hash = dummy
+    return _dummy_hash
+
+
+def hash_password(password):
+    """Hash ``password`` with the configured bcrypt cost."""
+    return _run(_hash, password, config.BCRYPT_ROUNDS)
+
+def verify_password(password, password_hash):
+    """Check ``password``. Returns ``(ok, needs_rehash)``.
+
+    A missing ``password_hash`` is verified against a dummy hash of the same
+    cost and always fails.
+    """
+    if not password_hash:
+        _run(_verify, password or '', _get_dummy_hash())
+        return False, False
+    try:
+        ok = _run(_verify, password or '', password_hash)
+    except ValueError:
+        # Malformed stored hash
+        logger.warning("Unreadable password hash, treating as mismatch")
+        return False, False
+    return ok, ok and _hasher.needs_update(password_hash)
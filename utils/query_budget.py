@@ -0,0 +1,131 @@
+"""Per-request query budgets and N+1 detection (development and tests).
+
+With ``QUERY_BUDGET_MODE`` set to ``warn`` or ``raise`` every request counts
+its SQL statements by normalized shape (``utils.slow_queries.normalize_sql``).
+After the view returns:
+
+- a shape executed ``N_PLUS_ONE_THRESHOLD`` times or more is reported as a
+  likely N+1, with the caller frame of its first execution;
+- a view decorated with ``@query_budget(n)`` that ran more than ``n``
+  statements is reported as over budget.
+
+``warn`` logs on ``urbanmood.query_budget``; ``raise`` raises
+``QueryBudgetExceeded`` so the test client fails. ``off`` (the default)
+installs nothing.
+
+``count_queries`` exposes the same counter to tests, to assert that a
+route's statement count does not grow with the data it returns.
+"""
+import logging
+import os
+from collections import Counter
+from contextlib import contextmanager
+from contextvars import ContextVar
+from flask import current_app, request
+from sqlalchemy import event
+from config import config
+from utils.slow_queries import normalize_sql, caller_frame
+
+logger = logging.getLogger("urbanmood.query_budget")
+
+MODES = ('off', 'warn', 'raise')
+
+_current = ContextVar('query_budget', default=None)
+_SKIP_FILES = (os.path.abspath(__file__),)
+
+
+class QueryBudgetExceeded(Exception):
+    """Raised in ``raise`` mode when a request breaks its budget or repeats a query."""
+
+
+def query_budget(max_queries):
+    """Declare the most SQL statements the decorated view may run per request."""
+    def decorator(f):
+        f.query_budget = max_queries
+        return f
+    return decorator
+
+
+class _RequestQueries:
+    def __init__(self):
+        self.total = 0
+        self.shapes = Counter()
+        self.first_caller = {}
+
+    def add(self, statement):
+        shape = normalize_sql(statement)
+        self.total += 1
+        self.shapes[shape] += 1
+        if shape not in self.first_caller:
+            self.first_caller[shape] = caller_frame(skip=_SKIP_FILES)
+
+
+def _count_statement(conn, cursor, statement, parameters, context, executemany):
+    queries = _current.get()
+    if queries is not None:
+        queries.add(statement)
+
+
+@contextmanager
+def count_queries(engine):
+    """Count the statements run on ``engine`` inside the block (tests).
+
+    Yields the counter: ``.total`` and ``.shapes`` (per normalized statement).
+    """
+    queries = _RequestQueries()
+
+    def _count(conn, cursor, statement, parameters, context, executemany):
+        queries.add(statement)
+
+    event.listen(engine, 'before_cursor_execute', _count)
+    try:
+        yield queries
+    finally:
+        event.remove(engine, 'before_cursor_execute', _count)
+
+
+def _short(sql, keep=90):
+    # The column list is noise; keep the start and the FROM/WHERE tail
+    return sql if len(sql) <= 2 * keep else f"{sql[:keep]} ... {sql[-keep:]}"
+
+
+def _start_request():
+    request.environ['urbanmood.query_budget_token'] = _current.set(_RequestQueries())
+
+
+def _check_request(response):
+    queries = _current.get()
+    if queries is None:
+        return response
+    problems = []
+    repeated = [(shape, n) for shape, n in queries.shapes.most_common() if n >= config.N_PLUS_ONE_THRESHOLD]
+    for shape, n in repeated:
+        problems.append(f"posible N+1: {n}x {_short(shape)} (desde {queries.first_caller.get(shape)})")
+    view = current_app.view_functions.get(request.endpoint)
+    budget = getattr(view, 'query_budget', None)
+    if budget is not None and queries.total > budget:
+        problems.append(f"{queries.total} consultas, presupuesto {budget}")
+    if problems:
+        message = f"{request.method} {request.path} [{request.endpoint}]: " + '; '.join(problems)
+        if config.QUERY_BUDGET_MODE == 'raise':
+            raise QueryBudgetExceeded(message)
+        logger.warning(message)
+    return response
+
+
+def _finish_request(exc):
+    token = request.environ.pop('urbanmood.query_budget_token', None)
+    if token is not None:
+        _current.reset(token)
+
+
+def init_app(app, engine):
+    """Install the counters when ``QUERY_BUDGET_MODE`` is ``warn`` or ``raise``."""
+    if config.QUERY_BUDGET_MODE not in MODES:
+        raise ValueError(f"QUERY_BUDGET_MODE must be one of {MODES}")
+    if config.QUERY_BUDGET_MODE == 'off':
+        return
+    app.before_request(_start_request)
+    app.after_request(_check_request)
+    app.teardown_request(_finish_request)
+    event.listen(engine, 'before_cursor_execute', _count_statement)
@@ -0,0 +1,151 @@
+"""Request rate limiting (flask-limiter).
+
+Counters have to be shared by every gunicorn worker on the instance, so the
+default store is a small SQLite file (``sqlite:///path`` storage URI, backed by
+:class:`SQLiteStorage` below). Any other ``limits`` storage URI works as well,
+e.g. ``redis://...`` when there is more than one instance, or ``memory://``
+for a single process. If the store errors the limiter falls back to
+per-process memory instead of failing the request.
+
+Limits are evaluated in flask-limiter's ``before_request`` hook, so a denied
+request never reaches the view: no database session and no bcrypt work.
+"""
+import os
+import sqlite3
+import threading
+import time
+from flask import request, session, jsonify
+from flask_limiter import Limiter
+from flask_limiter.util import get_remote_address
+from limits.storage import Storage
+from config import config
+
+PURGE_EVERY = 1000  # incr() calls between sweeps of expired rows
+
+
+class SQLiteStorage(Storage):
+    """Fixed-window counters in a local SQLite file shared by all workers.
+
+    Each increment is a single atomic upsert, so concurrent workers never
+    lose a hit. Connections are per thread and reopened after a fork.
+    """
+
+    STORAGE_SCHEME = ['sqlite']
+
+    def __init__(self, uri, wrap_exceptions=False, **options):
+        super().__init__(uri, wrap_exceptions=wrap_exceptions, **options)
+        # Same layout as SQLAlchemy URLs: sqlite:///relative.db, sqlite:////abs/path.db
+        self.path = uri[len('sqlite:///'):] or ':memory:'
+        self.busy_timeout = float(options.get('busy_timeout', config.SQLITE_BUSY_TIMEOUT / 1000))
+        self._local = threading.local()
+        self._calls = 0
+        self._conn().execute(
+            "CREATE TABLE IF NOT EXISTS rate_limits ("
+            " key TEXT PRIMARY KEY,"
+            " count INTEGER NOT NULL,"
+            " expires_at REAL NOT NULL)"
+        )
+
+    @property
+    def base_exceptions(self):
+        return sqlite3.Error
+
+    def _conn(self):
+        conn = getattr(self._local, 'conn', None)
+        if conn is None or self._local.pid != os.getpid():
+            conn = sqlite3.connect(self.path, timeout=self.busy_timeout,
+                                   isolation_level=None, check_same_thread=False)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+            self._local.pid = os.getpid()
+        return conn
+
+    def incr(self, key, expiry, amount=1):
+        now = time.time()
+        conn = self._conn()
+        row = conn.execute(
+            "INSERT INTO rate_limits (key, count, expires_at) VALUES (?, ?, ?) "
+            "ON CONFLICT(key) DO UPDATE SET "
+            " count = CASE WHEN expires_at <= ? THEN excluded.count ELSE count + excluded.count END,"
+            " expires_at = CASE WHEN expires_at <= ? THEN excluded.expires_at ELSE expires_at END "
+            "RETURNING count",
+            (key, amount, now + expiry, now, now)
+        ).fetchone()
+        self._calls += 1
+        if self._calls % PURGE_EVERY == 0:
+            conn.execute("DELETE FROM rate_limits WHERE expires_at <= ?", (now,))
+        return row[0]
+
+    def get(self, key):
+        row = self._conn().execute(
+            "SELECT count FROM rate_limits WHERE key = ? AND expires_at > ?", (key, time.time())
+        ).fetchone()
+        return row[0] if row else 0
+
+    def get_expiry(self, key):
+        row = self._conn().execute(
+            "SELECT expires_at FROM rate_limits WHERE key = ? AND expires_at > ?", (key, time.time())
+        ).fetchone()
+        return row[0] if row else time.time()
+
+    def check(self):
+        try:
+            self._conn().execute("SELECT 1")
+            return True
+        except sqlite3.Error:
+            return False
+
+    def reset(self):
+        return self._conn().execute("DELETE FROM rate_limits").rowcount
+
+    def clear(self, key):
+        self._conn().execute("DELETE FROM rate_limits WHERE key = ?", (key,))
+
+
+def rate_limit_key():
+    """Logged-in users are limited per account (members share the gym's IP),
+    everyone else per client address."""
+    uid = session.get('uid')
+    if uid:
+        return f"user:{uid}"
+    return get_remote_address()
+
+
+def credential_key():
+    """Client address plus the submitted email, for login / password reset.
+
+    Keying on the address alone would let a class arriving behind the gym's
+    NAT lock each other out; the address-only ceiling is a separate limit.
+    """
+    data = request.get_json(silent=True) if request.is_json else request.form
+    email = ((data or {}).get('email') or '').strip().lower()
+    return f"{get_remote_address()}|{email}"
+
+
+def default_limit():
+    """Default limit for routes without their own: per account for logged-in
+    users (typeahead search and drag-to-reorder fire many requests), per
+    address otherwise."""
+    return config.RATE_LIMIT_AUTHENTICATED if session.get('uid') else config.RATE_LIMIT_GLOBAL
+
+
+limiter = Limiter(
+    key_func=rate_limit_key,
+    default_limits=[default_limit],
+    storage_uri=config.RATE_LIMIT_STORAGE_URI,
+    strategy='fixed-window',
+    headers_enabled=True,
+    swallow_errors=True,
+    in_memory_fallback_enabled=True,
+    key_prefix='urbanmood',
+    enabled=config.RATE_LIMIT_ENABLED,
+)
+
+
+def rate_limit_exceeded(e):
+    """429 handler: JSON for the fetch()-based forms, plain text otherwise."""
+    message = "Demasiados intentos. Espera unos minutos y vuelve a intentarlo."
+    if request.is_json or request.accept_mimetypes.best == 'application/json':
+        return jsonify({"success": False, "message": message}), 429
+    return message, 429
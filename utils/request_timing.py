@@ -0,0 +1,178 @@
+"""Per-request timing breakdown: SQL, templates, outbound email and bcrypt.
+
+While a request is active, time spent in each category is added to a
+``RequestTimings`` bound to the current context:
+
+- ``sql``: every cursor execute on the engine from ``db.py``
+- ``tpl``: ``render_template`` calls (Flask template signals)
+- ``mail``: MailerSend API calls (``utils.mail.MailService``)
+- ``hash``: bcrypt hashing and verification (``utils.passwords``)
+
+Each response carries a ``Server-Timing`` header (visible in the browser's
+network panel) and one JSON log line on ``urbanmood.timing`` is written per
+request with the endpoint, status, counts and milliseconds per category.
+Work outside a request (mail worker thread, scripts) only reaches the
+listeners registered with ``add_listener`` (``utils.metrics`` uses them).
+"""
+import json
+import logging
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from flask import request, template_rendered, before_render_template
+from sqlalchemy import event
+from config import config
+
+logger = logging.getLogger("urbanmood.timing")
+
+CATEGORIES = ('sql', 'tpl', 'mail', 'hash')
+
+_current = ContextVar('request_timings', default=None)
+_listeners = []       # fn(category, seconds) for every sample
+_finish_hooks = []    # fn(timings, status) after every request
+
+
+class RequestTimings:
+    """Counts and seconds per category for one request."""
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.counts = dict.fromkeys(CATEGORIES, 0)
+        self.seconds = dict.fromkeys(CATEGORIES, 0.0)
+        self.render_starts = []
+
+    def add(self, category, seconds):
+        self.counts[category] = self.counts.get(category, 0) + 1
+        self.seconds[category] = self.seconds.get(category, 0.0) + seconds
+
+    def elapsed(self):
+        return time.perf_counter() - self.started
+
+    def server_timing(self):
+        """``Server-Timing`` header value (durations in milliseconds)."""
+        parts = [
+            f'{name};desc="{self.counts[name]}x";dur={self.seconds[name] * 1000:.1f}'
+            for name in self.seconds if self.counts[name]
+        ]
+        parts.append(f'total;dur={self.elapsed() * 1000:.1f}')
+        return ', '.join(parts)
+
+
+def current_timings():
+    """The ``RequestTimings`` of the active request, or None."""
+    return _current.get()
+
+
+def add_listener(fn):
+    """Call ``fn(category, seconds)`` for every sample, inside a request or not."""
+    _listeners.append(fn)
+
+
+def on_request_finished(fn):
+    """Call ``fn(timings, status)`` at the end of every timed request."""
+    _finish_hooks.append(fn)
+
+
+def record(category, seconds):
+    """Add ``seconds`` to ``category`` for the active request, if any."""
+    for fn in _listeners:
+        fn(category, seconds)
+    timings = _current.get()
+    if timings is not None:
+        timings.add(category, seconds)
+
+
+@contextmanager
+def timed(category):
+    """Time the enclosed block into ``category`` (no-op when nobody is listening)."""
+    if _current.get() is None and not _listeners:
+        yield
+        return
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        record(category, time.perf_counter() - start)
+
+
+def _start_request():
+    request.environ['urbanmood.timing_token'] = _current.set(RequestTimings())
+
+
+def _add_header(response):
+    timings = _current.get()
+    if timings is not None and config.REQUEST_TIMING_ENABLED and config.SERVER_TIMING_HEADER:
+        response.headers['Server-Timing'] = timings.server_timing()
+    # Kept for the log line written at teardown
+    request.environ['urbanmood.status'] = response.status_code
+    return response
+
+
+def _finish_request(exc):
+    token = request.environ.pop('urbanmood.timing_token', None)
+    timings = _current.get()
+    if token is None or timings is None:
+        return
+    _current.reset(token)
+    status = 500 if exc is not None else request.environ.get('urbanmood.status')
+    for fn in _finish_hooks:
+        fn(timings, status)
+    if not config.REQUEST_TIMING_ENABLED:
+        return
+    entry = {
+        'endpoint': request.endpoint,
+        'method': request.method,
+        'path': request.path,
+        'status': status,
+        'total_ms': round(timings.elapsed() * 1000, 1),
+    }
+    for name in timings.seconds:
+        entry[f'{name}_count'] = timings.counts[name]
+        entry[f'{name}_ms'] = round(timings.seconds[name] * 1000, 1)
+    logger.info(json.dumps(entry))
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault('timing_query_start', []).append(time.perf_counter())
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    stack = conn.info.get('timing_query_start')
+    if stack:
+        record('sql', time.perf_counter() - stack.pop())
+
+
+def _on_sql_error(exception_context):
+    # after_cursor_execute does not run for failed statements
+    conn = exception_context.connection
+    stack = conn.info.get('timing_query_start') if conn is not None else None
+    if stack:
+        record('sql', time.perf_counter() - stack.pop())
+
+
+def _before_render(sender, template, context, **extra):
+    timings = _current.get()
+    if timings is not None:
+        timings.render_starts.append(time.perf_counter())
+
+
+def _after_render(sender, template, context, **extra):
+    timings = _current.get()
+    if timings is not None and timings.render_starts:
+        record('tpl', time.perf_counter() - timings.render_starts.pop())
+
+
+def init_app(app, engine):
+    """Install the request hooks on ``app`` and the SQL listeners on ``engine``.
+
+    Call before other extensions register ``before_request`` hooks so their
+    time is part of the total.
+    """
+    app.before_request(_start_request)
+    app.after_request(_add_header)
+    app.teardown_request(_finish_request)
+    event.listen(engine, 'before_cursor_execute', _before_cursor_execute)
+    event.listen(engine, 'after_cursor_execute', _after_cursor_execute)
+    event.listen(engine, 'handle_error', _on_sql_error)
+    before_render_template.connect(_before_render, app)
+    template_rendered.connect(_after_render, app)
@@ -0,0 +1,90 @@
+"""Flat, single-query loader for the member routine page (/mi-rutina).
+
+Walking ``rutina.ejercicios`` -> ``RutinaEjercicio.ejercicio`` lazily from the
+template fires one SELECT per routine and per exercise. Instead we project
+every column the page renders in one joined query (routines, their exercises,
+the catalog entry and today's completion flag) and rebuild light-weight
+objects that keep the attribute shape the template already uses.
+"""
+from types import SimpleNamespace
+from sqlalchemy import and_
+from models import Rutina, RutinaUser, RutinaEjercicio, Ejercicio, WorkoutLog
+
+
+def load_member_rutinas(db, user_id, day):
+    """Return ``(rutinas, completed_ids)`` for a member's active routines on ``day``.
+
+    Always a single SELECT, regardless of how many routines or exercises
+    the member has.
+    """
+    rows = db.query(
+        Rutina.id.label('rutina_id'),
+        Rutina.name.label('rutina_name'),
+        Rutina.description,
+        Rutina.start_date,
+        Rutina.end_date,
+        RutinaEjercicio.id.label('re_id'),
+        RutinaEjercicio.series,
+        RutinaEjercicio.repeticiones,
+        RutinaEjercicio.peso,
+        RutinaEjercicio.descanso,
+        RutinaEjercicio.notas,
+        RutinaEjercicio.orden,
+        Ejercicio.name.label('ejercicio_name'),
+        Ejercicio.image_url,
+        Ejercicio.body_section,
+        WorkoutLog.id.label('log_id'),
+    ).select_from(Rutina).join(
+        RutinaUser, RutinaUser.rutina_id == Rutina.id
+    ).outerjoin(
+        RutinaEjercicio, RutinaEjercicio.rutina_id == Rutina.id
+    ).outerjoin(
+        Ejercicio, Ejercicio.id == RutinaEjercicio.ejercicio_id
+    ).outerjoin(
+        WorkoutLog, and_(
+            WorkoutLog.rutina_ejercicio_id == RutinaEjercicio.id,
+            WorkoutLog.user_id == user_id,
+            WorkoutLog.date == day,
+            WorkoutLog.completed == True
+        )
+    ).filter(
+        RutinaUser.user_id == user_id,
+        RutinaUser.is_active == True,
+        Rutina.is_active == True
+    ).order_by(Rutina.created_at.desc(), Rutina.id, RutinaEjercicio.orden, RutinaEjercicio.id).all()
+
+    rutinas = []
+    by_id = {}
+    completed_ids = set()
+    for row in rows:
+        rutina = by_id.get(row.rutina_id)
+        if rutina is None:
+            rutina = SimpleNamespace(
+                id=row.rutina_id,
+                name=row.rutina_name,
+                description=row.description,
+                start_date=row.start_date,
+                end_date=row.end_date,
+                ejercicios=[]
+            )
+            by_id[row.rutina_id] = rutina
+            rutinas.append(rutina)
+        if row.re_id is None:
+            continue
+        rutina.ejercicios.append(SimpleNamespace(
+            id=row.re_id,
+            series=row.series,
+            repeticiones=row.repeticiones,
+            peso=row.peso,
+            descanso=row.descanso,
+            notas=row.notas,
+            orden=row.orden,
+            ejercicio=SimpleNamespace(
+                name=row.ejercicio_name,
+                image_url=row.image_url,
+                body_section=row.body_section
+            )
+        ))
+        if row.log_id is not None:
+            completed_ids.add(row.re_id)
+    return rutinas, completed_ids
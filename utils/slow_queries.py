@@ -0,0 +1,186 @@
+"""Slow-query log: statements above ``SLOW_QUERY_MS``, grouped by fingerprint.
+
+``db.py`` times every cursor execute and hands the slow ones to ``record``.
+Each record keeps the normalized SQL (literals and bound values replaced by
+``?``), the shape of the bound parameters, the duration, the Flask endpoint
+(or thread name outside a request) and the first caller frame in our own
+code. Records go to an in-memory ring buffer of this worker and, when
+``SLOW_QUERY_LOG_FILE`` is set, to a rotating JSON-lines file per worker
+process (``slow_queries.<pid>.log``): rotation is not safe across processes,
+so no two workers write the same file. ``from_file`` merges them.
+``/admin/perf/slow-queries`` aggregates either source with ``aggregate``.
+"""
+import glob
+import hashlib
+import json
+import logging
+import os
+import re
+import sys
+import threading
+from collections import Counter, deque
+from datetime import datetime, timezone
+from logging.handlers import RotatingFileHandler
+from flask import has_request_context, request
+from config import config
+
+PROJECT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+# Frames from these files are plumbing, not the code that issued the query
+_SKIP_FILES = (os.path.join(PROJECT_DIR, 'db.py'), os.path.abspath(__file__))
+
+_buffer = deque(maxlen=config.SLOW_QUERY_BUFFER)
+_lock = threading.Lock()
+
+_file_logger = logging.getLogger("urbanmood.slow_sql")
+_file_logger.propagate = False
+_file_logger.setLevel(logging.INFO)
+_file_pid = None  # process the handler on _file_logger belongs to
+
+_STRING = re.compile(r"'(?:[^']|'')*'")
+_NUMBER = re.compile(r"\b\d+(?:\.\d+)?\b")
+_PARAM = re.compile(r"%\(\w+\)s|%s|:\w+|\?")
+_IN_LIST = re.compile(r"\(\s*\?(?:\s*,\s*\?)+\s*\)")
+_SPACE = re.compile(r"\s+")
+
+
+def normalize_sql(statement):
+    """SQL with literals and placeholders as ``?`` and IN lists collapsed."""
+    sql = _STRING.sub('?', statement)
+    sql = _NUMBER.sub('?', sql)
+    sql = _PARAM.sub('?', sql)
+    sql = _IN_LIST.sub('(?...)', sql)
+    return _SPACE.sub(' ', sql).strip()
+
+
+def fingerprint(normalized):
+    return hashlib.sha1(normalized.encode('utf-8')).hexdigest()[:12]
+
+
+def param_shape(parameters, executemany=False):
+    """Types of the bound values without the values, e.g. ``(int, str)``."""
+    if executemany:
+        rows = list(parameters or [])
+        return f"{len(rows)}x {param_shape(rows[0]) if rows else '()'}"
+    if isinstance(parameters, dict):
+        return '{' + ', '.join(f'{k}: {type(v).__name__}' for k, v in sorted(parameters.items())) + '}'
+    if isinstance(parameters, (list, tuple)):
+        return '(' + ', '.join(type(v).__name__ for v in parameters) + ')'
+    return type(parameters).__name__
+
+
+def caller_frame(skip=()):
+    """``file:line in function`` of the innermost frame in the project's code.
+
+    Frames from ``db.py``, this module and the files in ``skip`` are ignored.
+    """
+    frame = sys._getframe(1)
+    while frame is not None:
+        filename = frame.f_code.co_filename
+        if (filename.startswith(PROJECT_DIR) and filename not in _SKIP_FILES and filename not in skip
+                and 'site-packages' not in filename):
+            template = frame.f_globals.get('__jinja_template__')
+            if template is not None:
+                # Compiled template code: report the template line, not the generated one
+                return f"templates/{template.name}:{template.get_corresponding_lineno(frame.f_lineno)}"
+            return f"{os.path.relpath(filename, PROJECT_DIR)}:{frame.f_lineno} in {frame.f_code.co_name}"
+        frame = frame.f_back
+    return None
+
+
+def log_path(pid=None):
+    """This worker's log file: ``SLOW_QUERY_LOG_FILE`` with the process id before the extension."""
+    root, ext = os.path.splitext(config.SLOW_QUERY_LOG_FILE)
+    return f"{root}.{pid or os.getpid()}{ext}"
+
+
+def _write(line):
+    global _file_pid
+    pid = os.getpid()
+    if _file_pid != pid:
+        with _lock:
+            if _file_pid != pid:
+                # A handler inherited through fork points at the parent's file
+                for handler in list(_file_logger.handlers):
+                    _file_logger.removeHandler(handler)
+                handler = RotatingFileHandler(log_path(pid), maxBytes=config.SLOW_QUERY_LOG_MAX_BYTES,
+                                              backupCount=3, encoding='utf-8', delay=True)
+                handler.setFormatter(logging.Formatter('%(message)s'))
+                _file_logger.addHandler(handler)
+                _file_pid = pid
+    _file_logger.info(line)
+
+
+def record(statement, parameters, executemany, seconds):
+    """Store one slow statement in the buffer and the log file."""
+    normalized = normalize_sql(statement)
+    entry = {
+        'at': datetime.now(timezone.utc).isoformat(timespec='seconds'),
+        'fingerprint': fingerprint(normalized),
+        'sql': normalized,
+        'params': param_shape(parameters, executemany),
+        'ms': round(seconds * 1000, 2),
+        'endpoint': request.endpoint if has_request_context() else f'thread:{threading.current_thread().name}',
+        'caller': caller_frame(),
+    }
+    with _lock:
+        _buffer.append(entry)
+    if config.SLOW_QUERY_LOG_FILE:
+        _write(json.dumps(entry))
+
+
+def buffered():
+    """Records of this worker, oldest first."""
+    with _lock:
+        return list(_buffer)
+
+
+def from_file(limit=5000):
+    """The last ``limit`` records across the current log files of all workers."""
+    if not config.SLOW_QUERY_LOG_FILE:
+        return []
+    root, ext = os.path.splitext(config.SLOW_QUERY_LOG_FILE)
+    own_file = re.compile(re.escape(os.path.basename(root)) + r'\.\d+' + re.escape(ext) + '$')
+    records = []
+    for path in glob.glob(f"{glob.escape(root)}.*{ext}"):
+        if not own_file.match(os.path.basename(path)):
+            continue
+        with open(path, encoding='utf-8') as fh:
+            lines = deque(fh, maxlen=limit)
+        for line in lines:
+            try:
+                records.append(json.loads(line))
+            except ValueError:
+                continue  # partially written line
+    records.sort(key=lambda entry: entry['at'])
+    return records[-limit:]
+
+
+def _percentile(sorted_values, pct):
+    # Nearest-rank percentile
+    index = max(0, -(-len(sorted_values) * pct // 100) - 1)
+    return sorted_values[int(index)]
+
+
+def aggregate(records):
+    """One row per fingerprint, slowest total time first."""
+    groups = {}
+    for entry in records:
+        groups.setdefault(entry['fingerprint'], []).append(entry)
+    rows = []
+    for fp, entries in groups.items():
+        durations = sorted(e['ms'] for e in entries)
+        rows.append({
+            'fingerprint': fp,
+            'sql': entries[-1]['sql'],
+            'count': len(entries),
+            'p50_ms': _percentile(durations, 50),
+            'p95_ms': _percentile(durations, 95),
+            'max_ms': durations[-1],
+            'total_ms': round(sum(durations), 2),
+            'last_at': max(e['at'] for e in entries),
+            'endpoints': Counter(e['endpoint'] for e in entries).most_common(3),
+            'callers': Counter(e['caller'] for e in entries if e['caller']).most_common(3),
+            'params': Counter(e['params'] for e in entries).most_common(1)[0][0],
+        })
+    rows.sort(key=lambda r: r['total_ms'], reverse=True)
+    return rows
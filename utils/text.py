@@ -0,0 +1,12 @@
+"""Text normalization shared by search and matching code."""
+import re
+import unicodedata
+
+
+def fold_text(text):
+    """Lowercase, strip accents and punctuation: ``'Bíceps - Curl'`` -> ``'biceps curl'``."""
+    if not text:
+        return ''
+    text = unicodedata.normalize('NFKD', text.lower())
+    text = ''.join(c for c in text if not unicodedata.combining(c))
+    return re.sub(r'[^a-z0-9]+', ' ', text).strip()
@@ -0,0 +1,140 @@
+"""Bulk user import for /admin/users/import.
+
+Rows come from CSV or JSON. Existing emails are looked up with one IN query
+per chunk, and users, invitation tokens and queued invitation emails are
+inserted with executemany in batches of IMPORT_BATCH_SIZE (one commit per
+batch). The result is a per-row report.
+"""
+import csv
+import io
+import re
+import secrets
+from datetime import datetime
+from sqlalchemy import insert
+from sqlalchemy.exc import IntegrityError
+from models import User, UserRole, InvitationToken, InvitationPurpose
+from utils.mail import render_email
+from utils.mail_queue import enqueue_many
+from utils.audit import log_action
+from config import config
+
+EMAIL_RE = re.compile(r'^[^@\s]+@[^@\s]+\.[^@\s]+$')
+ROLE_VALUES = {r.value for r in UserRole}
+IN_CHUNK = 1000
+
+
+class UserImportError(ValueError):
+    """Raised when the uploaded payload can't be parsed at all."""
+
+
+def parse_rows(request):
+    """Return a list of row dicts from a CSV upload, a CSV body or a JSON body."""
+    upload = request.files.get('file')
+    if upload is not None:
+        return _parse_csv(upload.read().decode('utf-8-sig'))
+    if request.is_json:
+        data = request.get_json(silent=True)
+        if isinstance(data, dict):
+            data = data.get('users')
+        if not isinstance(data, list) or not all(isinstance(r, dict) for r in data):
+            raise UserImportError("JSON debe ser una lista de usuarios o {\"users\": [...]}")
+        return data
+    if (request.content_type or '').startswith('text/csv'):
+        return _parse_csv(request.get_data(as_text=True))
+    raise UserImportError("Formato no soportado (CSV o JSON)")
+
+
+def _parse_csv(text):
+    reader = csv.DictReader(io.StringIO(text))
+    if not reader.fieldnames or 'email' not in [f.strip().lower() for f in reader.fieldnames]:
+        raise UserImportError("El CSV debe tener una columna 'email'")
+    return [{(k or '').strip().lower(): (v or '').strip() for k, v in row.items()} for row in reader]
+
+
+def _existing_emails(db, emails):
+    found = set()
+    emails = list(emails)
+    for i in range(0, len(emails), IN_CHUNK):
+        chunk = emails[i:i + IN_CHUNK]
+        found.update(r[0] for r in db.query(User.email).filter(User.email.in_(chunk)).all())
+    return found
+
+
+def import_users(db, rows, created_by_user_id=None, send_invites=True):
+    """Validate, dedupe and insert ``rows``. Returns ``(report, summary)``."""
+    if len(rows) > config.IMPORT_MAX_ROWS:
+        raise UserImportError(f"Máximo {config.IMPORT_MAX_ROWS} filas por importación")
+
+    report = []
+    candidates = []
+    seen = set()
+    for idx, row in enumerate(rows, start=1):
+        email = str(row.get('email') or '').strip().lower()
+        entry = {'row': idx, 'email': email}
+        report.append(entry)
+        role = str(row.get('role') or 'user').strip().lower()
+        if not EMAIL_RE.match(email) or len(email) > 191:
+            entry.update(status='invalid', message='Email inválido')
+        elif role not in ROLE_VALUES:
+            entry.update(status='invalid', message='Rol inválido')
+        elif email in seen:
+            entry.update(status='duplicate', message='Repetido en el archivo')
+        else:
+            seen.add(email)
+            name = str(row.get('name') or '').strip()[:120] or email.split('@')[0]
+            phone = str(row.get('phone') or '').strip()[:40] or None
+            candidates.append((entry, {'email': email, 'name': name, 'phone': phone, 'role': UserRole(role)}))
+
+    existing = _existing_emails(db, [values['email'] for _, values in candidates])
+    to_create = []
+    for entry, values in candidates:
+        if values['email'] in existing:
+            entry.update(status='exists', message='Usuario ya existe')
+        else:
+            to_create.append((entry, values))
+
+    batch_size = config.IMPORT_BATCH_SIZE
+    for i in range(0, len(to_create), batch_size):
+        _insert_batch(db, to_create[i:i + batch_size], created_by_user_id, send_invites)
+
+    summary = {}
+    for entry in report:
+        summary[entry['status']] = summary.get(entry['status'], 0) + 1
+    if summary.get('created'):
+        log_action(db, 'import_users', 'user', None, summary)
+        db.commit()
+    return report, summary
+
+
+def _insert_batch(db, batch, created_by_user_id, send_invites):
+    now = datetime.utcnow()
+    try:
+        db.execute(insert(User), [
+            dict(values, is_active=False, created_by_user_id=created_by_user_id, created_at=now, updated_at=now)
+            for _, values in batch
+        ])
+        emails = [values['email'] for _, values in batch]
+        ids = dict(db.query(User.email, User.id).filter(User.email.in_(emails)).all())
+
+        tokens = {email: secrets.token_urlsafe(32) for email in emails}
+        expires_at = InvitationToken.new_expiry()
+        db.execute(insert(InvitationToken), [
+            {'user_id': ids[email], 'token': tokens[email], 'purpose': InvitationPurpose.invite,
+             'expires_at': expires_at, 'created_at': now, 'invalidated': False}
+            for email in emails
+        ])
+        if send_invites:
+            enqueue_many(db, [
+                {'to_email': email, 'subject': "Invitación UrbanMood",
+                 'html': render_email('invitation.html', token=tokens[email]), 'kind': 'invite'}
+                for email in emails
+            ])
+        db.commit()
+    except IntegrityError:
+        # Someone created one of these emails concurrently; report the batch, keep going
+        db.rollback()
+        for entry, _ in batch:
+            entry.update(status='error', message='Conflicto al insertar, reintentar')
+        return
+    for entry, values in batch:
+        entry.update(status='created', user_id=ids[values['email']])
@@ -0,0 +1,152 @@
+"""Workout log writes shared by the single and batch toggle endpoints.
+
+Ownership of many exercises is checked with one IN query, and completions
+are written as one idempotent multi-row upsert (or one DELETE), so the
+caller can apply a whole routine in a single transaction. Every write also
+refreshes the user's ``workout_day_summary`` row in that same transaction,
+including the logs dropped when a routine or one of its exercises is
+deleted (``delete_logs_for``).
+"""
+from datetime import datetime
+from sqlalchemy import insert, select, update, func
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.dialects.mysql import insert as mysql_insert
+from models import Rutina, RutinaUser, RutinaEjercicio, WorkoutLog, WorkoutDaySummary
+
+
+def owned_rutina_ejercicio_ids(db, user_id, re_ids):
+    """Subset of ``re_ids`` that belong to one of the user's active routines."""
+    if not re_ids:
+        return set()
+    rows = db.query(RutinaEjercicio.id).join(Rutina).join(RutinaUser).filter(
+        RutinaEjercicio.id.in_(list(re_ids)),
+        RutinaUser.user_id == user_id,
+        RutinaUser.is_active == True,
+        Rutina.is_active == True
+    ).all()
+    return {row[0] for row in rows}
+
+
+def _insert_ignore(db, rows):
+    """INSERT rows into workout_logs, skipping those that hit uq_workout_log."""
+    dialect = db.get_bind().dialect.name
+    if dialect == 'sqlite':
+        stmt = sqlite_insert(WorkoutLog).on_conflict_do_nothing(
+            index_elements=['user_id', 'rutina_ejercicio_id', 'date'])
+    elif dialect == 'mysql':
+        stmt = mysql_insert(WorkoutLog).prefix_with('IGNORE')
+    else:
+        existing = {row[0] for row in db.query(WorkoutLog.rutina_ejercicio_id).filter(
+            WorkoutLog.user_id == rows[0]['user_id'],
+            WorkoutLog.date == rows[0]['date'],
+            WorkoutLog.rutina_ejercicio_id.in_([r['rutina_ejercicio_id'] for r in rows])
+        ).all()}
+        rows = [r for r in rows if r['rutina_ejercicio_id'] not in existing]
+        if not rows:
+            return
+        stmt = insert(WorkoutLog)
+    db.execute(stmt, rows)
+
+
+def mark_completed(db, user_id, day, re_ids):
+    """Record ``re_ids`` as completed on ``day`` (no-op for ones already logged)."""
+    if not re_ids:
+        return
+    now = datetime.utcnow()
+    _insert_ignore(db, [
+        {'user_id': user_id, 'rutina_ejercicio_id': re_id, 'date': day, 'completed': True, 'created_at': now}
+        for re_id in sorted(re_ids)
+    ])
+    refresh_day_summary(db, user_id, day)
+
+
+def unmark_completed(db, user_id, day, re_ids):
+    """Delete the completion logs of ``re_ids`` on ``day``."""
+    if not re_ids:
+        return
+    db.query(WorkoutLog).filter(
+        WorkoutLog.user_id == user_id,
+        WorkoutLog.date == day,
+        WorkoutLog.rutina_ejercicio_id.in_(list(re_ids))
+    ).delete(synchronize_session=False)
+    refresh_day_summary(db, user_id, day)
+
+
+def delete_logs_for(db, re_ids):
+    """Delete every workout log of the rutina_ejercicios in ``re_ids`` (before
+    deleting them) and recount the summaries of the days those logs were on.
+
+    Two statements whatever the number of affected days: one correlated
+    UPDATE of the summaries, then the DELETE.
+    """
+    re_ids = list(re_ids)
+    if not re_ids:
+        return
+    remaining = select(func.count(WorkoutLog.id)).where(
+        WorkoutLog.user_id == WorkoutDaySummary.user_id,
+        WorkoutLog.date == WorkoutDaySummary.date,
+        WorkoutLog.completed == True,
+        WorkoutLog.rutina_ejercicio_id.not_in(re_ids)
+    ).scalar_subquery()
+    affected = select(WorkoutLog.id).where(
+        WorkoutLog.user_id == WorkoutDaySummary.user_id,
+        WorkoutLog.date == WorkoutDaySummary.date,
+        WorkoutLog.rutina_ejercicio_id.in_(re_ids)
+    ).exists()
+    db.execute(
+        update(WorkoutDaySummary).where(affected).values(completed_count=remaining, updated_at=datetime.utcnow()),
+        execution_options={'synchronize_session': False}
+    )
+    db.query(WorkoutLog).filter(WorkoutLog.rutina_ejercicio_id.in_(re_ids)).delete(synchronize_session=False)
+
+
+def planned_count_query(user_id):
+    """Scalar subquery: exercises in the user's active routines right now."""
+    return select(func.count(RutinaEjercicio.id)).join(
+        Rutina, Rutina.id == RutinaEjercicio.rutina_id
+    ).join(
+        RutinaUser, RutinaUser.rutina_id == Rutina.id
+    ).where(
+        RutinaUser.user_id == user_id,
+        RutinaUser.is_active == True,
+        Rutina.is_active == True
+    ).scalar_subquery()
+
+
+def refresh_day_summary(db, user_id, day):
+    """Upsert the (user, day) summary row in one statement.
+
+    completed_count is recounted from workout_logs; planned_count snapshots
+    the active routine size, so past days keep the total they had.
+    """
+    completed = select(func.count(WorkoutLog.id)).where(
+        WorkoutLog.user_id == user_id,
+        WorkoutLog.date == day,
+        WorkoutLog.completed == True
+    ).scalar_subquery()
+    values = {
+        'user_id': user_id,
+        'date': day,
+        'completed_count': completed,
+        'planned_count': planned_count_query(user_id),
+        'updated_at': datetime.utcnow(),
+    }
+    dialect = db.get_bind().dialect.name
+    if dialect == 'sqlite':
+        stmt = sqlite_insert(WorkoutDaySummary).values(**values)
+        stmt = stmt.on_conflict_do_update(
+            index_elements=['user_id', 'date'],
+            set_={c: stmt.excluded[c] for c in ('completed_count', 'planned_count', 'updated_at')})
+        db.execute(stmt)
+    elif dialect == 'mysql':
+        stmt = mysql_insert(WorkoutDaySummary).values(**values)
+        stmt = stmt.on_duplicate_key_update(
+            {c: stmt.inserted[c] for c in ('completed_count', 'planned_count', 'updated_at')})
+        db.execute(stmt)
+    else:
+        row = db.get(WorkoutDaySummary, (user_id, day))
+        if row is None:
+            row = WorkoutDaySummary(user_id=user_id, date=day)
+            db.add(row)
+        row.completed_count = db.execute(select(completed)).scalar()
+        row.planned_count = db.execute(select(planned_count_query(user_id))).scalar()